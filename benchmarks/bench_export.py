@@ -0,0 +1,80 @@
+# python benchmarks/bench_export.py --posts 200000 — сравнение форматов выгрузки публикаций
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+import pandas as pd
+
+from fake_vk import make_posts, ts
+from post_export import open_post_writer
+from post_store import PostStore
+
+
+def export_streaming(store, path, batch_size):
+    with open_post_writer(path) as writer:
+        for batch in store.iter_dataframes(batch_size):
+            writer.write(batch)
+
+
+def export_pandas_excel(store, path, batch_size):
+    # Прежний путь save_to_excel: одна таблица целиком через openpyxl
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        store.to_dataframe().to_excel(writer, sheet_name='Публикации', index=False)
+
+
+def measure(func, store, path, batch_size):
+    # Время и пик памяти меряются отдельными запусками: tracemalloc заметно замедляет код
+    start_time = time.perf_counter()
+    func(store, path, batch_size)
+    elapsed = time.perf_counter() - start_time
+    os.remove(path)
+
+    tracemalloc.start()
+    func(store, path, batch_size)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк выгрузки публикаций: CSV, Parquet и Excel')
+    parser.add_argument('--posts', type=int, default=100000, help='Количество синтетических публикаций')
+    parser.add_argument('--batch-size', type=int, default=50000, help='Размер порции потоковой выгрузки')
+    parser.add_argument('--skip-pandas-excel', action='store_true', help='Не запускать прежний путь pandas.to_excel')
+    args = parser.parse_args()
+
+    store = PostStore()
+    store.append_posts("СПбГУ", make_posts("СПбГУ", args.posts, ts(2024, 1, 1), ts(2024, 12, 31), seed=1))
+
+    formats = [
+        ('csv', export_streaming),
+        ('csv.gz', export_streaming),
+        ('parquet', export_streaming),
+        ('xlsx', export_streaming),
+    ]
+    if not args.skip_pandas_excel:
+        formats.append(('pandas.xlsx', export_pandas_excel))
+
+    print(f"{'Формат':<14} {'время, с':>10} {'пик памяти, МБ':>16} {'размер, МБ':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension, func in formats:
+            path = os.path.join(tmp, f"posts.{extension.replace('pandas.', '')}")
+            try:
+                elapsed, peak = measure(func, store, path, args.batch_size)
+            except ImportError as e:
+                print(f"{extension:<14} пропущен: {e}")
+                continue
+            size_mb = os.path.getsize(path) / 2 ** 20
+            print(f"{extension:<14} {elapsed:>10.2f} {peak / 2 ** 20:>16.1f} {size_mb:>12.2f}")
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# python benchmarks/bench_html.py --repeat 5 — сравнение скорости извлечения текста из HTML
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parser import Parser
+
+
+def bench(func, file_path: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func(file_path)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк извлечения текста из HTML: потоковый путь против BeautifulSoup')
+    parser.add_argument('--docs', type=str, default='docs', help='Папка с HTML-файлами')
+    parser.add_argument('--repeat', type=int, default=5, help='Количество повторов (берется лучшее время)')
+    args = parser.parse_args()
+
+    doc_parser = Parser(args.docs)
+    files = sorted(f for f in os.listdir(args.docs) if f.lower().endswith('.html'))
+
+    print(f"{'Файл':<40} {'KB':>8} {'bs4, с':>10} {'fast, с':>10} {'ускорение':>10} {'совпадает':>10}")
+    for filename in files:
+        file_path = os.path.join(args.docs, filename)
+        slow = bench(lambda path: doc_parser.extract_text_from_html(path, fast=False), file_path, args.repeat)
+        fast = bench(doc_parser.extract_text_from_html, file_path, args.repeat)
+        same = doc_parser.extract_text_from_html(file_path) == doc_parser.extract_text_from_html(file_path, fast=False)
+        size_kb = os.path.getsize(file_path) / 1024
+        print(f"{filename:<40} {size_kb:>8.1f} {slow:>10.4f} {fast:>10.4f} {slow / fast:>9.1f}x {str(same):>10}")
+
+
+if __name__ == '__main__':
+    main()
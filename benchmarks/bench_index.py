@@ -0,0 +1,193 @@
+# python benchmarks/bench_index.py --sizes 10k 100k 1m --json bench.json — масштабирование индекса на синтетическом корпусе
+
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+try:
+    import resource
+except ImportError:  # Windows: пик памяти не измеряется
+    resource = None
+
+from fake_corpus import UNIVERSITIES, make_corpus, make_vocabulary, vocabulary_size
+from index import IndexBuilder, IndexReader
+from index.builder import BITMAP_DENSITY
+from profiling import METRICS
+
+# Кодек списков -> bitmap_density: больше 1 - все списки кодами Элиаса-дельта
+CODECS = {
+    'elias-delta': 2.0,
+    'roaring': BITMAP_DENSITY,
+}
+SIZE_SUFFIXES = {'k': 10 ** 3, 'm': 10 ** 6}
+# Запросы быстрее этого слишком шумные, чтобы сообщать о регрессии по отношению времен
+MIN_LATENCY_MS = 1.0
+
+
+def parse_size(value: str) -> int:
+    """'10k' -> 10000, '1m' -> 1000000."""
+    value = value.strip().lower()
+    if value[-1:] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def make_queries(vocabulary) -> dict:
+    """Запросы разной сложности по словарю корпуса (слова выбраны по рангу частоты)."""
+    rare = vocabulary[min(len(vocabulary) - 1, 5000)]
+    medium = vocabulary[min(len(vocabulary) - 1, 300)]
+    return {
+        'frequent': {'query': 'и'},
+        'medium': {'query': medium},
+        'rare': {'query': rare},
+        'and': {'query': f'университет ректор {medium}'},
+        'prefix': {'query': f'{medium[:3]}*'},
+        'fuzzy': {'query': 'униврситет~'},
+        'filtered': {'query': 'студенты', 'university': UNIVERSITIES[1],
+                     'start': datetime(2024, 3, 1), 'end': datetime(2024, 3, 31, 23, 59)},
+    }
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss в килобайтах на Linux и в байтах на macOS
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def latency_ms(reader: IndexReader, query: dict, compressed: bool, repeat: int) -> float:
+    params = dict(query)
+    text = params.pop('query')
+    reader.search(text, compressed=compressed, **params)
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        reader.search(text, compressed=compressed, **params)
+        times.append(time.perf_counter() - start_time)
+    return statistics.median(times) * 1000
+
+
+def run_case(documents: int, codec: str, seed: int, repeat: int) -> dict:
+    """Генерация корпуса, построение индекса и замеры поиска (запускается в отдельном процессе)."""
+    start_time = time.perf_counter()
+    corpus = make_corpus(documents, seed)
+    generate_sec = time.perf_counter() - start_time
+
+    METRICS.reset()
+    METRICS.enable()
+    builder = IndexBuilder(bitmap_density=CODECS[codec])
+    # Корпус передается напрямую: load_data размножает маленькие наборы данных
+    builder.data = corpus
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index.idx')
+        start_time = time.perf_counter()
+        builder.save(path)
+        build_sec = time.perf_counter() - start_time
+        METRICS.disable()
+        stages = {name: timer['total_sec'] for name, timer in METRICS.report()['timers'].items()}
+        del builder, corpus
+
+        queries = make_queries(make_vocabulary(vocabulary_size(documents), seed))
+        with IndexReader(path) as reader:
+            sizes = reader.sizes()
+            latencies = {
+                name: {
+                    'count': reader.search(query['query'], **{k: v for k, v in query.items() if k != 'query'})['count'],
+                    'compressed_ms': latency_ms(reader, query, True, repeat),
+                    'cached_ms': latency_ms(reader, query, False, repeat),
+                }
+                for name, query in queries.items()
+            }
+            index_mb = os.path.getsize(path) / 2 ** 20
+    return {
+        'documents': documents,
+        'codec': codec,
+        'generate_sec': generate_sec,
+        'build_sec': build_sec,
+        'stages_sec': stages,
+        'peak_rss_mb': peak_rss_mb(),
+        'index_mb': index_mb,
+        'postings_mb': sizes['compressed_bytes'] / 2 ** 20,
+        'queries': latencies,
+    }
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Описания метрик, выросших по сравнению с baseline больше чем в tolerance раз."""
+    previous = {(case['documents'], case['codec']): case for case in baseline}
+    regressions = []
+    for case in results:
+        old = previous.get((case['documents'], case['codec']))
+        if old is None:
+            continue
+        metrics = [('build_sec', case['build_sec'], old['build_sec'], 0),
+                   ('index_mb', case['index_mb'], old['index_mb'], 0),
+                   ('peak_rss_mb', case['peak_rss_mb'], old['peak_rss_mb'], 0)]
+        metrics += [(f'{name}.compressed_ms', query['compressed_ms'], old['queries'][name]['compressed_ms'],
+                     MIN_LATENCY_MS)
+                    for name, query in case['queries'].items() if name in old['queries']]
+        for name, new_value, old_value, floor in metrics:
+            if new_value and old_value and new_value > max(old_value, floor) * tolerance:
+                regressions.append(f"{case['documents']} {case['codec']} {name}: "
+                                   f"{old_value:.3f} -> {new_value:.3f} ({new_value / old_value:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк построения индекса и поиска на синтетическом корпусе')
+    parser.add_argument('--sizes', nargs='+', default=['10k', '100k'],
+                        help='Размеры корпуса в документах: 10k 100k 1m 10m')
+    parser.add_argument('--codecs', nargs='+', choices=sorted(CODECS), default=sorted(CODECS),
+                        help='Кодеки списков документов')
+    parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора корпуса')
+    parser.add_argument('--repeat', type=int, default=20, help='Повторов каждого запроса (берется медиана)')
+    parser.add_argument('--json', type=str, default=None, help='Сохранить результаты в JSON')
+    parser.add_argument('--compare', type=str, default=None, help='JSON предыдущего запуска для поиска регрессий')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='Во сколько раз метрика может вырасти без сообщения о регрессии')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'Документов':>11} {'кодек':<12} {'корпус, с':>10} {'индекс, с':>10} {'RSS, МБ':>9} "
+          f"{'файл, МБ':>9} {'списки, МБ':>11}")
+    for documents in map(parse_size, args.sizes):
+        for codec in args.codecs:
+            # Каждый замер - в новом процессе: пик памяти не зависит от предыдущих
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                case = pool.submit(run_case, documents, codec, args.seed, args.repeat).result()
+            results.append(case)
+            rss = f"{case['peak_rss_mb']:>9.0f}" if case['peak_rss_mb'] is not None else f"{'-':>9}"
+            print(f"{documents:>11} {codec:<12} {case['generate_sec']:>10.2f} {case['build_sec']:>10.2f} {rss} "
+                  f"{case['index_mb']:>9.2f} {case['postings_mb']:>11.2f}")
+
+    print(f"\n{'Документов':>11} {'кодек':<12} {'запрос':<9} {'найдено':>9} {'сжатый, мс':>11} {'кэш, мс':>9}")
+    for case in results:
+        for name, query in case['queries'].items():
+            print(f"{case['documents']:>11} {case['codec']:<12} {name:<9} {query['count']:>9} "
+                  f"{query['compressed_ms']:>11.3f} {query['cached_ms']:>9.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"Регрессия: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
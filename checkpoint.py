@@ -0,0 +1,206 @@
+import json
+import sqlite3
+import threading
+
+
+class CollectionCheckpoint:
+    """
+    Хранилище прогресса сбора публикаций в локальной базе SQLite.
+
+    Хранит уже загруженные публикации, план временных окон с отметкой о
+    завершении и курсоры next_from незавершенной пагинации. После сбоя сбор
+    продолжается с места остановки, а максимальная дата сохраненных публикаций
+    служит отметкой для режима --since-last-run.
+
+    Окна и отметка у vk.py (последние дни) и web.py (год) разные, поэтому у
+    каждого сборщика свой файл: имя сборщика записывается в файл при первом
+    открытии, и чужой файл не открывается.
+    """
+
+    def __init__(self, path='collection_checkpoint.sqlite', collector=None):
+        """
+        :param path: Путь к файлу базы данных (создается при первом запуске)
+        :param collector: Имя сборщика (например, 'vk' или 'web'); файл другого сборщика - ValueError
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    university TEXT NOT NULL,
+                    owner_id INTEGER NOT NULL,
+                    post_id INTEGER NOT NULL,
+                    date INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (university, owner_id, post_id)
+                );
+                CREATE INDEX IF NOT EXISTS posts_by_date ON posts (university, date);
+                CREATE TABLE IF NOT EXISTS windows (
+                    university TEXT NOT NULL,
+                    period_start INTEGER NOT NULL,
+                    period_end INTEGER NOT NULL,
+                    start_time INTEGER NOT NULL,
+                    end_time INTEGER NOT NULL,
+                    total_count INTEGER NOT NULL DEFAULT 0,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (university, period_start, period_end, start_time, end_time)
+                );
+                CREATE TABLE IF NOT EXISTS cursors (
+                    university TEXT NOT NULL,
+                    start_time INTEGER NOT NULL,
+                    end_time INTEGER NOT NULL,
+                    next_from TEXT NOT NULL,
+                    PRIMARY KEY (university, start_time, end_time)
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+            """)
+        if collector is not None:
+            self._check_collector(collector)
+
+    def _check_collector(self, collector):
+        self._execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('collector', ?)", (collector,))
+        owner = self._execute("SELECT value FROM meta WHERE key = 'collector'")[0][0]
+        if owner != collector:
+            self.close()
+            raise ValueError(f"Файл {self.path} хранит прогресс сборщика {owner}, а не {collector}; "
+                             f"укажите другой --checkpoint")
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._connection:
+            return self._connection.execute(sql, params).fetchall()
+
+    def _insert_posts(self, university, posts):
+        # Вызывается под self._lock внутри транзакции
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO posts (university, owner_id, post_id, date, data) VALUES (?, ?, ?, ?, ?)",
+            [
+                (university, post.get('owner_id', 0), post.get('id', 0), post.get('date', 0),
+                 json.dumps(post, ensure_ascii=False))
+                for post in posts
+            ]
+        )
+
+    def save_posts(self, university, posts):
+        """
+        Сохранение публикаций (сырые ответы API); повторы игнорируются
+        :param university: Университет (поисковый запрос)
+        :param posts: Список публикаций из ответа newsfeed.search
+        """
+        with self._lock, self._connection:
+            self._insert_posts(university, posts)
+
+    def load_posts(self, university, start_time=None, end_time=None):
+        """
+        Загрузка сохраненных публикаций за период (в порядке убывания даты, как отдает API)
+        :return: Список публикаций
+        """
+        rows = self._execute(
+            "SELECT data FROM posts WHERE university = ? AND date >= ? AND date <= ? "
+            "ORDER BY date DESC, owner_id, post_id",
+            (university, start_time if start_time is not None else -2 ** 63,
+             end_time if end_time is not None else 2 ** 63 - 1)
+        )
+        return [json.loads(data) for data, in rows]
+
+    def high_water_mark(self, university):
+        """
+        :return: Дата самой свежей сохраненной публикации (unix time) или None
+        """
+        rows = self._execute("SELECT MAX(date) FROM posts WHERE university = ?", (university,))
+        return rows[0][0]
+
+    def save_plan(self, university, period_start, period_end, windows):
+        """
+        Сохранение плана временных окон, на которые разбит период сбора;
+        total_count уже сохраненного незавершенного окна обновляется
+        :param period_start: Начало всего периода
+        :param period_end: Конец всего периода
+        :param windows: Список кортежей (начало окна, конец окна, total_count)
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO windows (university, period_start, period_end, start_time, end_time, total_count) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (university, period_start, period_end, start_time, end_time) "
+                "DO UPDATE SET total_count = excluded.total_count WHERE done = 0",
+                [(university, period_start, period_end, start, end, total_count) for start, end, total_count in windows]
+            )
+
+    def load_plan(self, university, period_start, period_end):
+        """
+        :return: Список кортежей (начало, конец, total_count, done) окон периода
+        """
+        return self._execute(
+            "SELECT start_time, end_time, total_count, done FROM windows "
+            "WHERE university = ? AND period_start = ? AND period_end = ? ORDER BY start_time",
+            (university, period_start, period_end)
+        )
+
+    def unfinished_periods(self, university):
+        """
+        :return: Список периодов (начало, конец), в плане которых остались незавершенные окна
+        """
+        return self._execute(
+            "SELECT DISTINCT period_start, period_end FROM windows "
+            "WHERE university = ? AND done = 0 ORDER BY period_start",
+            (university,)
+        )
+
+    def mark_window_done(self, university, start_time, end_time, posts=(), period=None):
+        """
+        Атомарное сохранение публикаций окна и отметки о его завершении
+        :param period: Период (начало, конец), в план которого входит окно; по умолчанию - само окно
+        """
+        period_start, period_end = period or (start_time, end_time)
+        with self._lock, self._connection:
+            self._insert_posts(university, posts)
+            self._connection.execute(
+                "INSERT INTO windows (university, period_start, period_end, start_time, end_time, done) "
+                "VALUES (?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT (university, period_start, period_end, start_time, end_time) DO UPDATE SET done = 1",
+                (university, period_start, period_end, start_time, end_time)
+            )
+            self._connection.execute(
+                "DELETE FROM cursors WHERE university = ? AND start_time = ? AND end_time = ?",
+                (university, start_time, end_time)
+            )
+
+    def is_window_done(self, university, start_time, end_time):
+        rows = self._execute(
+            "SELECT done FROM windows WHERE university = ? AND start_time = ? AND end_time = ? AND done = 1",
+            (university, start_time, end_time)
+        )
+        return bool(rows)
+
+    def save_cursor(self, university, start_time, end_time, next_from, posts=()):
+        """
+        Атомарное сохранение страницы публикаций и курсора next_from следующей страницы
+        """
+        with self._lock, self._connection:
+            self._insert_posts(university, posts)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO cursors (university, start_time, end_time, next_from) VALUES (?, ?, ?, ?)",
+                (university, start_time, end_time, next_from)
+            )
+
+    def pending_cursors(self, university):
+        """
+        :return: Список кортежей (начало, конец, next_from) незавершенных окон
+        """
+        return self._execute(
+            "SELECT start_time, end_time, next_from FROM cursors WHERE university = ? ORDER BY start_time",
+            (university,)
+        )
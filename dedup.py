@@ -0,0 +1,192 @@
+import hashlib
+import re
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Простое число больше 2^32 для универсального хеширования (a * x + b) mod p
+MINHASH_PRIME = 4294967311
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def normalize_text(text: str) -> str:
+    """
+    Нормализация текста для сравнения: нижний регистр, только слова, одиночные пробелы.
+
+    Аргументы:
+        text: Исходный текст публикации
+
+    Возвращает:
+        Нормализованный текст
+    """
+    return ' '.join(WORD_PATTERN.findall(text.lower()))
+
+
+def text_hash(text: str) -> bytes:
+    """Хеш нормализованного текста для поиска точных дубликатов."""
+    return hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=16).digest()
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """
+    Словесные шинглы нормализованного текста.
+
+    Аргументы:
+        text: Текст публикации
+        size: Количество слов в шингле
+
+    Возвращает:
+        Список шинглов; текст короче size слов дает один шингл из всего текста
+    """
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        return [' '.join(words)] if words else []
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+class MinHasher:
+    """
+    MinHash-сигнатуры множеств шинглов.
+
+    Доля совпадающих позиций двух сигнатур оценивает коэффициент Жаккара
+    исходных множеств. Все перестановки считаются одной векторной операцией NumPy.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # a < 2^31 и x < 2^32, поэтому a * x + b помещается в uint64
+        self._a = rng.integers(1, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Аргументы:
+            text: Текст публикации
+
+        Возвращает:
+            Массив uint64 длиной num_perm (для пустого текста - все значения равны MINHASH_PRIME)
+        """
+        values = np.array(
+            [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+             for shingle in shingles(text, self.shingle_size)],
+            dtype=np.uint64
+        )
+        if not len(values):
+            return np.full(self.num_perm, MINHASH_PRIME, dtype=np.uint64)
+        hashed = (np.outer(values, self._a) + self._b) % np.uint64(MINHASH_PRIME)
+        return hashed.min(axis=0)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Оценка коэффициента Жаккара по двум сигнатурам."""
+        return float(np.mean(first == second))
+
+
+class Deduplicator:
+    """
+    Потоковое удаление точных дубликатов и группировка почти-дубликатов.
+
+    Точные дубликаты определяются по хешу нормализованного текста. Для
+    остальных текстов MinHash-сигнатура делится на bands полос (LSH): тексты,
+    совпавшие хотя бы в одной полосе, становятся кандидатами и объединяются в
+    кластер, если оценка сходства не ниже threshold. Номер кластера - порядковый
+    номер (с нуля) его первого текста, представителя, среди всех вызовов add.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 16,
+                 shingle_size: int = 3, near_duplicates: bool = True):
+        """
+        Аргументы:
+            threshold: Минимальная оценка коэффициента Жаккара для почти-дубликатов
+            num_perm: Длина MinHash-сигнатуры
+            bands: Количество полос LSH (num_perm должно делиться на bands); порог, после
+                которого тексты почти наверняка становятся кандидатами, - около (1 / bands) ** (bands / num_perm)
+            shingle_size: Количество слов в шингле
+            near_duplicates: Искать почти-дубликаты (False - только точные)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm должно делиться на bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.near_duplicates = near_duplicates
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self._exact: Dict[bytes, int] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        # Сигнатуры (строки матрицы) и кластеры текстов, не являющихся точными дубликатами
+        self._signatures = np.empty((1024, num_perm), dtype=np.uint64)
+        self._clusters: List[int] = []
+        self._count = 0
+
+    def add(self, text: str) -> Tuple[int, bool]:
+        """
+        Учет очередного текста.
+
+        Аргументы:
+            text: Текст публикации
+
+        Возвращает:
+            Кортеж (номер кластера, является ли текст дубликатом уже виденного)
+        """
+        number = self._count
+        self._count += 1
+        digest = text_hash(text)
+        exact = self._exact.get(digest)
+        if exact is not None:
+            return exact, True
+
+        cluster = number
+        if self.near_duplicates:
+            slot = len(self._clusters)
+            signature = self.hasher.signature(text)
+            keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                    for band in range(self.bands)]
+            cluster = self._find_cluster(signature, keys, number)
+            for key in keys:
+                self._buckets.setdefault(key, []).append(slot)
+            if slot == len(self._signatures):
+                self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+            self._signatures[slot] = signature
+            self._clusters.append(cluster)
+
+        self._exact[digest] = cluster
+        return cluster, cluster != number
+
+    def _find_cluster(self, signature: np.ndarray, keys: Sequence[Tuple[int, bytes]], default: int) -> int:
+        candidates = sorted({slot for key in keys for slot in self._buckets.get(key, ())})
+        if not candidates:
+            return default
+        # Сходство со всеми кандидатами одной векторной операцией
+        similarity = np.mean(self._signatures[candidates] == signature, axis=1)
+        matches = np.flatnonzero(similarity >= self.threshold)
+        return self._clusters[candidates[matches[0]]] if len(matches) else default
+
+
+def deduplicate(records: Iterable[dict], text_field: str = 'text', threshold: float = 0.8,
+                near_duplicates: bool = True) -> Tuple[List[dict], np.ndarray]:
+    """
+    Удаление дубликатов из набора записей.
+
+    Аргументы:
+        records: Записи со строковым полем text_field (например, публикации)
+        text_field: Имя поля с текстом
+        threshold: Порог сходства почти-дубликатов
+        near_duplicates: Объединять почти-дубликаты (False - только точные)
+
+    Возвращает:
+        Кортеж (уникальные записи - представители кластеров, номера кластеров всех
+        исходных записей как индексы в списке уникальных записей)
+    """
+    deduplicator = Deduplicator(threshold=threshold, near_duplicates=near_duplicates)
+    unique: List[dict] = []
+    unique_position: Dict[int, int] = {}
+    clusters = []
+    for record in records:
+        cluster, duplicate = deduplicator.add(record.get(text_field, '') or '')
+        if not duplicate:
+            unique_position[cluster] = len(unique)
+            unique.append(record)
+        clusters.append(unique_position[cluster])
+    return unique, np.array(clusters, dtype=np.int64)
@@ -0,0 +1,15 @@
+"""
+Инвертированный индекс: построение (builder), чтение (reader) и сжатие списков
+документов (codec). Используется create_index.py, inverted_index.py,
+search_index.py и pipeline.py.
+"""
+
+from index.builder import IndexBuilder, build_postings, serialize_index, write_index
+from index.codec import decode_postings, elias_delta_encode, elias_gamma_encode, encode_postings
+from index.reader import IndexReader
+
+__all__ = [
+    'IndexBuilder', 'IndexReader',
+    'build_postings', 'serialize_index', 'write_index',
+    'encode_postings', 'decode_postings', 'elias_gamma_encode', 'elias_delta_encode',
+]
@@ -0,0 +1,271 @@
+"""
+Сжатые битовые множества номеров документов в духе Roaring bitmap.
+
+Номер документа (uint32) делится на старшие 16 бит - ключ контейнера - и
+младшие 16 бит, которые хранит контейнер одного из трех видов:
+
+    array  - отсортированный массив uint16 (до ARRAY_MAX_SIZE элементов)
+    bitmap - 1024 слова uint64, по биту на каждое из 65536 значений
+    run    - пары uint16 (начало, длина - 1) для последовательных участков
+
+Вид выбирается по наименьшему размеру. Пересечение и объединение выполняются
+поконтейнерно операциями NumPy над целыми массивами, без циклов по документам.
+"""
+
+import struct
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+ARRAY = 0
+BITMAP = 1
+RUN = 2
+
+ARRAY_MAX_SIZE = 4096
+BITMAP_WORDS = 1024
+BITMAP_BYTES = BITMAP_WORDS * 8
+
+# Количество контейнеров и резерв; затем keys uint16[n], kinds uint8[n], offsets и counts uint32[n]
+_HEADER = struct.Struct('<II')
+
+
+def _align(offset: int) -> int:
+    return offset + (-offset % 8)
+
+
+def _run_count(values: np.ndarray) -> int:
+    return 1 + int(np.count_nonzero(np.diff(values.astype(np.int32)) != 1)) if len(values) else 0
+
+
+def _values_to_runs(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.int32)
+    breaks = np.flatnonzero(np.diff(values) != 1) + 1
+    starts = values[np.concatenate(([0], breaks))]
+    ends = values[np.concatenate((breaks - 1, [len(values) - 1]))]
+    return np.column_stack((starts, ends - starts)).astype(np.uint16).ravel()
+
+
+def _runs_to_values(runs: np.ndarray) -> np.ndarray:
+    starts = runs[0::2].astype(np.int64)
+    counts = runs[1::2].astype(np.int64) + 1
+    # Для каждого значения: начало его участка + смещение внутри участка
+    offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    return (np.repeat(starts, counts) + offsets).astype(np.uint16)
+
+
+def _values_to_words(values: np.ndarray) -> np.ndarray:
+    bits = np.zeros(1 << 16, dtype=bool)
+    bits[values] = True
+    return np.packbits(bits, bitorder='little').view('<u8')
+
+
+def _words_to_values(words: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder='little')).astype(np.uint16)
+
+
+def _container(values: np.ndarray) -> Tuple[int, np.ndarray]:
+    """Самый компактный контейнер для отсортированных значений uint16."""
+    runs = _run_count(values)
+    sizes = {ARRAY: 2 * len(values), BITMAP: BITMAP_BYTES, RUN: 4 * runs}
+    kind = min(sizes, key=lambda k: (sizes[k], k))
+    if kind == ARRAY and len(values) > ARRAY_MAX_SIZE:
+        kind = BITMAP
+    if kind == ARRAY:
+        return ARRAY, values.astype(np.uint16)
+    if kind == RUN:
+        return RUN, _values_to_runs(values)
+    return BITMAP, _values_to_words(values)
+
+
+def _values(kind: int, data: np.ndarray) -> np.ndarray:
+    if kind == ARRAY:
+        return data
+    if kind == RUN:
+        return _runs_to_values(data)
+    return _words_to_values(data)
+
+
+def _words(kind: int, data: np.ndarray) -> np.ndarray:
+    return data if kind == BITMAP else _values_to_words(_values(kind, data))
+
+
+def _contains(kind: int, data: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Маска: какие из значений uint16 есть в контейнере."""
+    if kind == ARRAY:
+        return np.isin(values, data, assume_unique=True)
+    if kind == RUN:
+        starts = data[0::2]
+        i = np.searchsorted(starts, values, side='right') - 1
+        valid = i >= 0
+        i = np.maximum(i, 0)
+        return valid & (values.astype(np.int32) <= starts[i].astype(np.int32) + data[1::2][i])
+    values = values.astype(np.uint64)
+    return ((data[values >> np.uint64(6)] >> (values & np.uint64(63))) & np.uint64(1)).astype(bool)
+
+
+def _and(kind_a: int, a: np.ndarray, kind_b: int, b: np.ndarray) -> np.ndarray:
+    if kind_a == BITMAP and kind_b == BITMAP:
+        return _words_to_values(a & b)
+    if kind_b == ARRAY and kind_a != ARRAY:
+        kind_a, a, kind_b, b = kind_b, b, kind_a, a
+    if kind_a == ARRAY:
+        return a[_contains(kind_b, b, a)]
+    return np.intersect1d(_values(kind_a, a), _values(kind_b, b), assume_unique=True)
+
+
+def _or(kind_a: int, a: np.ndarray, kind_b: int, b: np.ndarray) -> np.ndarray:
+    if kind_a == ARRAY and kind_b == ARRAY and len(a) + len(b) <= ARRAY_MAX_SIZE:
+        return np.union1d(a, b)
+    return _words_to_values(_words(kind_a, a) | _words(kind_b, b))
+
+
+class RoaringBitmap:
+    """
+    Множество номеров документов из контейнеров array/bitmap/run.
+
+    Создается из отсортированного массива (from_array) или из сериализованных
+    байтов (frombuffer - контейнеры становятся представлениями поверх буфера).
+    Операции & и | возвращают новое множество.
+    """
+
+    def __init__(self, keys: Sequence[int] = (), kinds: Sequence[int] = (), containers: Sequence[np.ndarray] = ()):
+        self.keys = np.asarray(keys, dtype=np.uint16)
+        self.kinds = np.asarray(kinds, dtype=np.uint8)
+        self.containers: List[np.ndarray] = list(containers)
+
+    @classmethod
+    def from_array(cls, doc_ids: Sequence[int]) -> 'RoaringBitmap':
+        """
+        Аргументы:
+            doc_ids: Номера документов в порядке возрастания, без повторов
+
+        Возвращает:
+            Битовое множество
+        """
+        doc_ids = np.asarray(doc_ids, dtype=np.uint32)
+        high = (doc_ids >> 16).astype(np.uint16)
+        low = (doc_ids & 0xFFFF).astype(np.uint16)
+        keys, starts = np.unique(high, return_index=True)
+        bounds = np.append(starts, len(doc_ids))
+        kinds, containers = [], []
+        for i in range(len(keys)):
+            kind, data = _container(low[bounds[i]:bounds[i + 1]])
+            kinds.append(kind)
+            containers.append(data)
+        return cls(keys, kinds, containers)
+
+    @classmethod
+    def from_range(cls, start: int, stop: int) -> 'RoaringBitmap':
+        """Номера документов start, ..., stop - 1 (контейнеры-участки)."""
+        if stop <= start:
+            return cls()
+        keys = np.arange(start >> 16, ((stop - 1) >> 16) + 1)
+        low = np.maximum(start - (keys << 16), 0)
+        high = np.minimum(stop - (keys << 16), 1 << 16)
+        containers = [np.array([first, last - first - 1], dtype=np.uint16) for first, last in zip(low, high)]
+        return cls(keys, [RUN] * len(keys), containers)
+
+    @classmethod
+    def _from_values(cls, keys: List[int], values: List[np.ndarray]) -> 'RoaringBitmap':
+        kinds, containers, kept = [], [], []
+        for key, container_values in zip(keys, values):
+            if len(container_values):
+                kind, data = _container(container_values)
+                kept.append(key)
+                kinds.append(kind)
+                containers.append(data)
+        return cls(kept, kinds, containers)
+
+    def to_array(self) -> np.ndarray:
+        """Номера документов в порядке возрастания (uint32)."""
+        if not len(self.keys):
+            return np.empty(0, dtype=np.uint32)
+        return np.concatenate([
+            (np.uint32(key) << np.uint32(16)) | _values(kind, data).astype(np.uint32)
+            for key, kind, data in zip(self.keys, self.kinds, self.containers)
+        ])
+
+    def __len__(self) -> int:
+        total = 0
+        for kind, data in zip(self.kinds, self.containers):
+            if kind == ARRAY:
+                total += len(data)
+            elif kind == RUN:
+                total += int(data[1::2].sum(dtype=np.int64)) + len(data) // 2
+            else:
+                total += int(np.unpackbits(data.view(np.uint8)).sum(dtype=np.int64))
+        return total
+
+    def first(self) -> int:
+        """Наименьший номер документа (множество не должно быть пустым)."""
+        return (int(self.keys[0]) << 16) | int(_values(self.kinds[0], self.containers[0])[0])
+
+    def last(self) -> int:
+        """Наибольший номер документа (множество не должно быть пустым)."""
+        return (int(self.keys[-1]) << 16) | int(_values(self.kinds[-1], self.containers[-1])[-1])
+
+    def __contains__(self, doc_id: int) -> bool:
+        i = np.searchsorted(self.keys, doc_id >> 16)
+        if i == len(self.keys) or self.keys[i] != doc_id >> 16:
+            return False
+        return bool(_contains(self.kinds[i], self.containers[i], np.array([doc_id & 0xFFFF], dtype=np.uint16))[0])
+
+    def __and__(self, other: 'RoaringBitmap') -> 'RoaringBitmap':
+        keys, left, right = np.intersect1d(self.keys, other.keys, assume_unique=True, return_indices=True)
+        return self._from_values(keys.tolist(), [
+            _and(self.kinds[i], self.containers[i], other.kinds[j], other.containers[j])
+            for i, j in zip(left, right)
+        ])
+
+    def __or__(self, other: 'RoaringBitmap') -> 'RoaringBitmap':
+        keys = np.union1d(self.keys, other.keys)
+        own = dict(zip(self.keys.tolist(), range(len(self.keys))))
+        others = dict(zip(other.keys.tolist(), range(len(other.keys))))
+        values = []
+        for key in keys.tolist():
+            i, j = own.get(key), others.get(key)
+            if i is None:
+                values.append(_values(other.kinds[j], other.containers[j]))
+            elif j is None:
+                values.append(_values(self.kinds[i], self.containers[i]))
+            else:
+                values.append(_or(self.kinds[i], self.containers[i], other.kinds[j], other.containers[j]))
+        return self._from_values(keys.tolist(), values)
+
+    def to_bytes(self) -> bytes:
+        """
+        Сериализация: заголовок, ключи и виды контейнеров, смещения (от начала
+        данных) и количества элементов контейнеров, затем сами контейнеры,
+        каждый выровнен по 8 байт.
+        """
+        n = len(self.keys)
+        table = np.zeros((2, n), dtype='<u4')
+        chunks = []
+        position = 0
+        for i, data in enumerate(self.containers):
+            raw = data.astype(data.dtype.newbyteorder('<'), copy=False).tobytes()
+            chunks.append(raw + b'\0' * (_align(len(raw)) - len(raw)))
+            table[:, i] = (position, len(data))
+            position += _align(len(raw))
+        head = _HEADER.pack(n, 0) + self.keys.astype('<u2').tobytes() + self.kinds.tobytes()
+        head += b'\0' * (_align(len(head)) - len(head))
+        table = table.tobytes()
+        table += b'\0' * (_align(len(table)) - len(table))
+        return head + table + b''.join(chunks)
+
+    @classmethod
+    def frombuffer(cls, buffer) -> 'RoaringBitmap':
+        """Чтение to_bytes() без копирования контейнеров (буфер должен быть выровнен по 8 байт)."""
+        n, _ = _HEADER.unpack_from(buffer)
+        position = _HEADER.size
+        keys = np.frombuffer(buffer, dtype='<u2', count=n, offset=position)
+        kinds = np.frombuffer(buffer, dtype=np.uint8, count=n, offset=position + 2 * n)
+        position = _align(position + 3 * n)
+        offsets, counts = np.frombuffer(buffer, dtype='<u4', count=2 * n, offset=position).reshape(2, n)
+        data_start = _align(position + 8 * n)
+        containers = [
+            np.frombuffer(buffer, dtype='<u8' if kind == BITMAP else '<u2',
+                          count=int(count), offset=data_start + int(offset))
+            for kind, offset, count in zip(kinds, offsets, counts)
+        ]
+        return cls(keys, kinds, containers)
@@ -0,0 +1,311 @@
+import json
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from dedup import deduplicate
+from profiling import count, timer
+from index import codec
+from index.bitmap import RoaringBitmap
+from index.docstore import BLOCK_SIZE, build_store
+from index.documents import document_columns, remap_clusters
+from index.format import DOC_COLUMNS, HEADER, MAGIC, POSTING_BITMAP, POSTING_LIST, SECTIONS, TERM_DTYPE, VERSION, align
+from index.lexicon import build_kgram_index
+from index.reorder import ORDERS, document_order
+from index.tokens import DEFAULT_TOKENIZER, get_tokenizer
+
+# Доля документов, начиная с которой термин хранится битовым множеством:
+# коды Элиаса-дельта разностей ~1/16 занимают около 9 бит на документ, как и
+# битовый контейнер, а пересечение битовых множеств быстрее распаковки списков
+BITMAP_DENSITY = 1 / 16
+# Списки документов: словарь термин -> список или поток пар (термин, список) по возрастанию терминов
+Postings = Union[Dict[str, Sequence[int]], Iterable[Tuple[str, Sequence[int]]]]
+# Документов в порции build_postings: токенизация и добавление в списки замеряются порциями
+POSTINGS_BATCH = 4096
+
+
+def build_postings(records: Iterable[dict], tokenize: Callable[[str], List[str]] = str.split,
+                   text_field: str = 'text') -> Dict[str, List[int]]:
+    """
+    Построение инвертированного индекса в памяти.
+
+    Аргументы:
+        records: Записи с текстом; номер документа - позиция записи
+        tokenize: Функция разбиения текста на термины
+        text_field: Имя поля с текстом
+
+    Возвращает:
+        Словарь термин -> возрастающий список номеров документов
+    """
+    postings: Dict[str, List[int]] = {}
+    records = iter(records)
+    doc_id = 0
+    while True:
+        with timer('build.tokenize'):
+            batch = [tokenize(record[text_field]) for record in islice(records, POSTINGS_BATCH)]
+        if not batch:
+            break
+        with timer('build.postings'):
+            for words in batch:
+                for word in words:
+                    doc_ids = postings.setdefault(word, [])
+                    if not doc_ids or doc_ids[-1] != doc_id:
+                        doc_ids.append(doc_id)
+                doc_id += 1
+        count('build.documents', len(batch))
+        count('build.tokens', sum(len(words) for words in batch))
+    return postings
+
+
+def _string_offsets(items: Iterable) -> np.ndarray:
+    lengths = [len(item) for item in items]
+    offsets = np.zeros(len(lengths) + 1, dtype='<u8')
+    offsets[1:] = np.cumsum(lengths)
+    return offsets
+
+
+def _university_bitmaps(codes: np.ndarray, count: int) -> List[bytes]:
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(count + 1))
+    return [RoaringBitmap.from_array(order[bounds[i]:bounds[i + 1]]).to_bytes() for i in range(count)]
+
+
+def serialize_index(postings: Postings, doc_count: Optional[int] = None,
+                    metadata: Optional[dict] = None, bitmap_density: float = BITMAP_DENSITY,
+                    columns: Optional[Dict[str, np.ndarray]] = None, universities: Sequence[str] = (),
+                    doc_order: str = 'date', source_ids: Optional[np.ndarray] = None,
+                    texts: Optional[Iterable[str]] = None, store_block_size: int = BLOCK_SIZE) -> bytes:
+    """
+    Запись индекса в двоичный формат index.format.
+
+    Аргументы:
+        postings: Словарь термин -> возрастающий список номеров документов или поток
+            пар (термин, список) по возрастанию байтов UTF-8 терминов (например, слияние
+            сегментов в pipeline.py): в памяти не держатся все списки сразу
+        doc_count: Количество документов (по умолчанию - максимальный номер + 1;
+            для потока пар обязательно)
+        metadata: Дополнительные данные, сериализуемые в JSON
+        bitmap_density: Доля документов, начиная с которой список термина
+            хранится битовым множеством RoaringBitmap (больше 1 - никогда)
+        columns: Колонки DOC_COLUMNS по номерам документов (см. index.documents);
+            при doc_order='date' даты должны не убывать. None - без метаданных документов
+        universities: Названия университетов в порядке кодов колонки university
+        doc_order: Порядок нумерации документов (см. index.reorder.ORDERS)
+        source_ids: Номер исходной записи (например, в vk_array.npy) для каждого документа
+        texts: Тексты документов в порядке номеров для хранилища index.docstore
+            (None - без текстов); читаются один раз, можно передать генератор
+        store_block_size: Размер блока текстов до сжатия в байтах
+
+    Возвращает:
+        Содержимое файла индекса
+    """
+    if doc_order not in ORDERS:
+        raise ValueError(f"Неизвестный порядок документов: {doc_order}")
+    if isinstance(postings, dict):
+        if doc_count is None:
+            doc_count = max((doc_ids[-1] for doc_ids in postings.values() if doc_ids), default=-1) + 1
+        items = ((term, postings[term]) for term in sorted(postings, key=lambda term: term.encode('utf-8')))
+    elif doc_count is None:
+        raise ValueError("Для потока терминов нужно количество документов")
+    else:
+        items = postings
+
+    with timer('build.encode'):
+        terms = []
+        encoded_terms = []
+        rows = []
+        compressed_lists = []
+        bitmaps = []
+        comp_offset = bitmap_offset = 0
+        for term, doc_ids in items:
+            encoded = term.encode('utf-8')
+            if encoded_terms and encoded <= encoded_terms[-1]:
+                raise ValueError("Термины должны идти по возрастанию байтов UTF-8 без повторов")
+            terms.append(term)
+            encoded_terms.append(encoded)
+            if doc_count and len(doc_ids) >= bitmap_density * doc_count:
+                packed = RoaringBitmap.from_array(doc_ids).to_bytes()
+                rows.append((len(doc_ids), POSTING_BITMAP, bitmap_offset, len(packed)))
+                bitmaps.append(packed)
+                bitmap_offset += len(packed)
+            else:
+                packed = codec.encode_postings(doc_ids)
+                rows.append((len(doc_ids), POSTING_LIST, comp_offset, len(packed)))
+                compressed_lists.append(packed)
+                comp_offset += len(packed)
+        term_offsets = _string_offsets(encoded_terms)
+        table = np.array(rows, dtype=TERM_DTYPE).reshape(-1)
+    count('build.terms', len(terms))
+    count('build.postings_written', int(table['df'].sum(dtype=np.int64)))
+    count('build.bytes_encoded', comp_offset + bitmap_offset)
+
+    with timer('build.kgrams'):
+        kgram_index = build_kgram_index(terms)
+        kgrams = sorted(kgram_index, key=lambda kgram: kgram.encode('utf-8'))
+        encoded_kgrams = [kgram.encode('utf-8') for kgram in kgrams]
+        kgram_list_offsets = _string_offsets(kgram_index[kgram] for kgram in kgrams)
+        kgram_lists = np.fromiter((term_id for kgram in kgrams for term_id in kgram_index[kgram]),
+                                  dtype='<u4', count=int(kgram_list_offsets[-1]))
+
+    if source_ids is not None and len(source_ids) != doc_count:
+        raise ValueError("Таблица исходных номеров должна описывать все документы")
+    with timer('build.store'):
+        store_table, store_blocks = build_store(texts or (), store_block_size)
+    count('build.store_bytes', sum(len(block) for block in store_blocks))
+    if texts is not None and len(store_table) != doc_count:
+        raise ValueError("Тексты должны описывать все документы")
+
+    doc_columns = {}
+    university_bitmaps: List[bytes] = []
+    if columns is not None:
+        dates = np.asarray(columns['date'])
+        if len(dates) != doc_count:
+            raise ValueError("Колонки метаданных должны описывать все документы")
+        if doc_order == 'date' and np.any(np.diff(dates) < 0):
+            raise ValueError("Документы должны быть пронумерованы по возрастанию даты")
+        doc_columns = {name: np.asarray(columns[name], dtype=dtype) for name, dtype in DOC_COLUMNS}
+        university_bitmaps = _university_bitmaps(doc_columns['university'], len(universities))
+        metadata = dict(metadata or {}, universities=list(universities))
+    if doc_order != 'date':
+        metadata = dict(metadata or {}, doc_order=doc_order)
+
+    sections = {
+        'terms': b''.join(encoded_terms),
+        'term_offsets': term_offsets.tobytes(),
+        'term_table': table.tobytes(),
+        'compressed': b''.join(compressed_lists),
+        'bitmaps': b''.join(bitmaps),
+        'kgrams': b''.join(encoded_kgrams),
+        'kgram_offsets': _string_offsets(encoded_kgrams).tobytes(),
+        'kgram_list_offsets': kgram_list_offsets.tobytes(),
+        'kgram_lists': kgram_lists.tobytes(),
+        **{f'doc_{name}': doc_columns[name].tobytes() if doc_columns else b'' for name, _ in DOC_COLUMNS},
+        'doc_sources': np.asarray(source_ids, dtype='<u8').tobytes() if source_ids is not None else b'',
+        'university_bitmaps': b''.join(university_bitmaps),
+        'university_bitmap_offsets': _string_offsets(university_bitmaps).tobytes() if university_bitmaps else b'',
+        'store_table': store_table.tobytes(),
+        'store_block_offsets': _string_offsets(store_blocks).tobytes() if store_blocks else b'',
+        'store_blocks': b''.join(store_blocks),
+        'metadata': json.dumps(metadata or {}, ensure_ascii=False).encode('utf-8'),
+    }
+
+    chunks = []
+    layout = []
+    position = HEADER.size
+    for name in SECTIONS:
+        data = sections[name]
+        aligned = align(position)
+        chunks.append(b'\0' * (aligned - position))
+        chunks.append(data)
+        layout.extend((aligned, len(data)))
+        position = aligned + len(data)
+    header = HEADER.pack(MAGIC, VERSION, doc_count, len(terms), *layout)
+    return header + b''.join(chunks)
+
+
+def write_index(path: str, postings: Postings, doc_count: Optional[int] = None,
+                metadata: Optional[dict] = None, bitmap_density: float = BITMAP_DENSITY,
+                columns: Optional[Dict[str, np.ndarray]] = None, universities: Sequence[str] = (),
+                doc_order: str = 'date', source_ids: Optional[np.ndarray] = None,
+                texts: Optional[Iterable[str]] = None, store_block_size: int = BLOCK_SIZE):
+    """Сохранение индекса в файл (см. serialize_index)."""
+    with open(path, 'wb') as f:
+        f.write(serialize_index(postings, doc_count, metadata, bitmap_density, columns, universities,
+                                doc_order, source_ids, texts, store_block_size))
+
+
+class IndexBuilder:
+    """
+    Построение инвертированного индекса по массиву записей (vk_array.npy) и
+    сохранение в двоичный формат, который читает index.reader.IndexReader.
+    """
+
+    elias_gamma_encode = staticmethod(codec.elias_gamma_encode)
+    elias_delta_encode = staticmethod(codec.elias_delta_encode)
+
+    def __init__(self, data_file: str = 'vk_array.npy', dedupe: bool = False, dedupe_threshold: float = 0.8,
+                 bitmap_density: float = BITMAP_DENSITY, order: str = 'date', store_block_size: int = BLOCK_SIZE,
+                 tokenizer: str = DEFAULT_TOKENIZER):
+        self.data_file = data_file
+        self.bitmap_density = bitmap_density
+        # Порядок нумерации документов (см. index.reorder.ORDERS)
+        self.order = order
+        # Размер блока хранилища текстов (0 - тексты в индекс не пишутся)
+        self.store_block_size = store_block_size
+        # Способ разбиения текстов на термины (см. index.tokens.TOKENIZERS), пишется в метаданные
+        self.tokenizer = tokenizer
+        self.dedupe = dedupe
+        self.dedupe_threshold = dedupe_threshold
+        self.data = None
+        # Номер уникального документа для каждой исходной записи (заполняется при dedupe)
+        self.cluster_ids = None
+        # Номер исходной записи для каждого документа индекса
+        self.source_ids = None
+        self.inverted_index = None
+        self.inverted_index_compressed = None
+
+    def load_data(self) -> np.ndarray:
+        with timer('build.load_data'):
+            data = np.load(self.data_file, allow_pickle=True)
+            self.data = np.repeat(data, 6) if len(data) < 40000 else data
+        count('build.records', len(self.data))
+        if self.dedupe:
+            # Точные дубликаты и перепосты с мелкими правками индексируются один раз
+            with timer('build.dedupe'):
+                unique, self.cluster_ids = deduplicate(self.data, threshold=self.dedupe_threshold)
+            self.data = np.empty(len(unique), dtype=object)
+            self.data[:] = unique
+            # Документ кластера - первая запись кластера
+            self.source_ids = np.unique(self.cluster_ids, return_index=True)[1]
+        else:
+            self.source_ids = np.arange(len(self.data))
+        return self.data
+
+    def create_inverted_index(self) -> Dict[str, List[int]]:
+        if self.data is None:
+            self.load_data()
+        if self.source_ids is None:
+            self.source_ids = np.arange(len(self.data))
+        # По умолчанию номера идут по возрастанию даты: интервал времени - диапазон номеров
+        with timer('build.reorder'):
+            order = document_order(self.data, self.order)
+        if np.any(order != np.arange(len(order))):
+            self.data = np.asarray(self.data)[order]
+            self.cluster_ids = remap_clusters(self.cluster_ids, order)
+            self.source_ids = self.source_ids[order]
+        self.inverted_index = build_postings(self.data, get_tokenizer(self.tokenizer))
+        return self.inverted_index
+
+    def compress_index(self) -> Dict[str, List[str]]:
+        """
+        Коды Элиаса-дельта номеров документов строками из '0' и '1'
+        (наглядное представление; в файл пишутся упакованные байты)
+        """
+        if self.inverted_index is None:
+            self.create_inverted_index()
+        self.inverted_index_compressed = {
+            word: [self.elias_delta_encode(doc_id) for doc_id in doc_ids]
+            for word, doc_ids in self.inverted_index.items()
+        }
+        return self.inverted_index_compressed
+
+    def metadata(self) -> dict:
+        metadata = {'tokenizer': self.tokenizer}
+        if self.cluster_ids is not None:
+            metadata['clusters'] = self.cluster_ids.tolist()
+        return metadata
+
+    def to_bytes(self) -> bytes:
+        if self.inverted_index is None:
+            self.create_inverted_index()
+        columns, universities = document_columns(self.data)
+        texts = [record['text'] for record in self.data] if self.store_block_size > 0 else None
+        return serialize_index(self.inverted_index, len(self.data), self.metadata(), self.bitmap_density,
+                               columns, universities, self.order, self.source_ids, texts, self.store_block_size)
+
+    def save(self, output_file: str = 'index.idx'):
+        data = self.to_bytes()
+        with timer('build.write'), open(output_file, 'wb') as f:
+            f.write(data)
+        count('build.bytes_written', len(data))
@@ -0,0 +1,91 @@
+"""
+Кодирование списков документов (posting lists) кодом Элиаса-дельта.
+
+Строковые функции elias_gamma_encode / elias_delta_encode возвращают код
+числа строкой из '0' и '1' (наглядное представление, используется в отчетах
+о сжатии). encode_postings / decode_postings работают с упакованными байтами:
+список номеров документов хранится разностями соседних номеров (d-gaps),
+каждая разность - кодом Элиаса-дельта, биты упакованы в байты.
+"""
+
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+
+def elias_gamma_encode(number: int) -> str:
+    if number == 0:
+        return '0'
+    n = 1 + int(np.log2(number))
+    binary = bin(number)[2:]
+    return ('0' * (n - 1)) + binary
+
+
+def elias_delta_encode(number: int) -> str:
+    if number == 0:
+        return '0'
+    binary = bin(number)[2:]
+    gamma = elias_gamma_encode(len(binary))
+    return gamma + binary[1:]
+
+
+def _gaps(doc_ids: Iterable[int]) -> Iterable[int]:
+    # Первая разность - номер документа + 1, чтобы все кодируемые числа были >= 1
+    previous = -1
+    for doc_id in doc_ids:
+        yield doc_id - previous
+        previous = doc_id
+
+
+def encode_postings(doc_ids: Sequence[int]) -> bytes:
+    """
+    Упаковка возрастающего списка номеров документов.
+
+    Аргументы:
+        doc_ids: Номера документов в порядке возрастания, без повторов
+
+    Возвращает:
+        Байты с кодами Элиаса-дельта разностей (последний байт дополнен нулями)
+    """
+    bits = ''.join(elias_delta_encode(gap) for gap in _gaps(doc_ids))
+    if not bits:
+        return b''
+    padding = -len(bits) % 8
+    return int(bits + '0' * padding, 2).to_bytes((len(bits) + padding) // 8, 'big')
+
+
+def decode_postings(data: bytes, count: int, stop: Optional[int] = None) -> np.ndarray:
+    """
+    Распаковка списка, упакованного encode_postings.
+
+    Аргументы:
+        data: Байты (bytes, memoryview или срез mmap)
+        count: Количество номеров документов в списке
+        stop: Остановить распаковку на первом номере >= stop (None - весь список)
+
+    Возвращает:
+        Массив uint32 номеров документов (при stop - только меньших stop)
+    """
+    result = np.empty(count, dtype=np.uint32)
+    if not count:
+        return result
+    bits = bin(int.from_bytes(data, 'big'))[2:].zfill(len(data) * 8)
+    position = 0
+    previous = -1
+    for i in range(count):
+        # Код Элиаса-гамма длины числа: zeros нулей, затем zeros + 1 бит
+        zeros = bits.index('1', position) - position
+        length = int(bits[position + zeros:position + 2 * zeros + 1], 2)
+        position += 2 * zeros + 1
+        gap = int('1' + bits[position:position + length - 1], 2)
+        position += length - 1
+        previous += gap
+        if stop is not None and previous >= stop:
+            return result[:i]
+        result[i] = previous
+    return result
+
+
+def encoded_bits(doc_ids: Iterable[int]) -> int:
+    """Количество бит, которое займет список после encode_postings (без выравнивания)."""
+    return sum(len(elias_delta_encode(gap)) for gap in _gaps(doc_ids))
@@ -0,0 +1,198 @@
+"""
+Хранилище текстов документов в файле индекса.
+
+Тексты в порядке номеров документов собираются в блоки примерно по
+BLOCK_SIZE байт UTF-8 (документ не делится между блоками), и каждый блок
+сжимается zlib. Таблица STORE_DTYPE хранит для документа номер блока, смещение
+и длину текста в распакованном блоке, поэтому любой документ читается одной
+распаковкой блока. Последние распакованные блоки держатся в LRU-кэше: соседние
+документы (например, результаты поиска в интервале дат) обычно лежат в одном блоке.
+
+Здесь же - подсветка терминов запроса и фрагменты текста вокруг совпадений.
+"""
+
+import re
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from dedup import WORD_PATTERN
+from index.format import STORE_DTYPE
+from profiling import count
+
+# Размер блока до сжатия: больше - лучше сжатие, меньше - быстрее чтение одного документа
+BLOCK_SIZE = 16 * 1024
+COMPRESSION_LEVEL = 6
+BLOCK_CACHE_SIZE = 32
+# Количество слов во фрагменте текста
+SNIPPET_WINDOW = 30
+HIGHLIGHT = ('<b>', '</b>')
+
+_TOKEN_PATTERN = re.compile(r'\S+')
+
+
+def build_store(texts: Iterable[str], block_size: int = BLOCK_SIZE,
+                level: int = COMPRESSION_LEVEL) -> Tuple[np.ndarray, List[bytes]]:
+    """
+    Аргументы:
+        texts: Тексты документов в порядке номеров (None - пустой текст)
+        block_size: Размер блока до сжатия в байтах
+        level: Уровень сжатия zlib
+
+    Возвращает:
+        Кортеж (таблица STORE_DTYPE по документам, сжатые блоки)
+    """
+    rows = []
+    blocks: List[bytes] = []
+    pending: List[bytes] = []
+    size = 0
+    for text in texts:
+        encoded = (text or '').encode('utf-8')
+        rows.append((len(blocks), size, len(encoded)))
+        pending.append(encoded)
+        size += len(encoded)
+        if size >= block_size:
+            blocks.append(zlib.compress(b''.join(pending), level))
+            pending, size = [], 0
+    if pending:
+        blocks.append(zlib.compress(b''.join(pending), level))
+    return np.array(rows, dtype=STORE_DTYPE).reshape(-1), blocks
+
+
+class DocumentStore:
+    """
+    Чтение текстов документов из секций store_* (см. build_store) с LRU-кэшем
+    не более чем на cache_size распакованных блоков.
+    """
+
+    def __init__(self, table: np.ndarray, block_offsets: np.ndarray, blocks: memoryview,
+                 cache_size: int = BLOCK_CACHE_SIZE):
+        self.table = table
+        self.block_offsets = block_offsets
+        self._blocks = blocks
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[int, bytes]' = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def block(self, i: int) -> bytes:
+        """Распакованный блок i (через LRU-кэш)."""
+        data = self._cache.get(i)
+        if data is not None:
+            self.cache_hits += 1
+            self._cache.move_to_end(i)
+            return data
+        self.cache_misses += 1
+        count('store.blocks_decoded')
+        data = zlib.decompress(self._blocks[int(self.block_offsets[i]):int(self.block_offsets[i + 1])])
+        if self.cache_size > 0:
+            self._cache[i] = data
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return data
+
+    def document(self, doc_id: int) -> str:
+        """Текст документа: одна распаковка блока или обращение к кэшу."""
+        if not 0 <= doc_id < len(self.table):
+            raise IndexError(f"Нет документа с номером {doc_id}")
+        block, offset, length = self.table[doc_id].tolist()
+        return self.block(block)[offset:offset + length].decode('utf-8')
+
+    def cache_info(self) -> Dict[str, int]:
+        """Статистика кэша распакованных блоков."""
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'size': len(self._cache),
+            'max_size': self.cache_size
+        }
+
+    def clear(self):
+        self._cache.clear()
+        self.table = self.block_offsets = self._blocks = None
+
+
+def match_spans(text: str, terms: Iterable[str]) -> List[Tuple[int, int, int]]:
+    """
+    Совпадения терминов в тексте. Слово совпадает целиком (как при разбиении
+    по пробелам в IndexBuilder) или своими частями без знаков препинания в нижнем
+    регистре (как после dedup.normalize_text в pipeline.py).
+
+    Аргументы:
+        text: Текст документа
+        terms: Термины запроса (например, search(...)['terms'])
+
+    Возвращает:
+        Список (начало, конец, номер слова) в порядке следования
+    """
+    terms = set(terms)
+    spans = []
+    for position, token in enumerate(_TOKEN_PATTERN.finditer(text)):
+        if token.group() in terms:
+            spans.append((token.start(), token.end(), position))
+            continue
+        for word in WORD_PATTERN.finditer(token.group()):
+            if word.group().lower() in terms:
+                spans.append((token.start() + word.start(), token.start() + word.end(), position))
+    return spans
+
+
+def _mark(text: str, spans: Sequence[Tuple[int, int, int]], start: int, end: int,
+          marks: Tuple[str, str]) -> str:
+    parts = []
+    position = start
+    for first, last, _ in spans:
+        if first < start or last > end:
+            continue
+        parts.extend((text[position:first], marks[0], text[first:last], marks[1]))
+        position = last
+    parts.append(text[position:end])
+    return ''.join(parts)
+
+
+def highlight(text: str, terms: Iterable[str], marks: Tuple[str, str] = HIGHLIGHT) -> str:
+    """Текст с терминами запроса между marks[0] и marks[1]."""
+    return _mark(text, match_spans(text, terms), 0, len(text), marks)
+
+
+def snippet(text: str, terms: Iterable[str], window: int = SNIPPET_WINDOW,
+            marks: Tuple[str, str] = HIGHLIGHT, ellipsis: str = '...') -> str:
+    """
+    Фрагмент текста из window слов с наибольшим числом совпадений
+    (при равенстве - самый ранний), с подсветкой терминов.
+
+    Аргументы:
+        text: Текст документа
+        terms: Термины запроса
+        window: Длина фрагмента в словах
+        marks: Разметка начала и конца совпадения
+        ellipsis: Знак пропуска текста до и после фрагмента
+
+    Возвращает:
+        Фрагмент; без совпадений - начало текста
+    """
+    tokens = [(token.start(), token.end()) for token in _TOKEN_PATTERN.finditer(text)]
+    if not tokens:
+        return ''
+    spans = match_spans(text, terms)
+    first = 0
+    if spans and len(tokens) > window:
+        hits = np.zeros(len(tokens) + 1, dtype=np.int64)
+        np.add.at(hits, np.array([position for _, _, position in spans]) + 1, 1)
+        hits = np.cumsum(hits)
+        # Совпадения в окне [i, i + window) для каждого допустимого начала i
+        counts = hits[window:] - hits[:len(tokens) - window + 1]
+        first = int(np.argmax(counts))
+    last = min(first + window, len(tokens)) - 1
+    fragment = _mark(text, spans, tokens[first][0], tokens[last][1], marks)
+    if first > 0:
+        fragment = ellipsis + fragment
+    if last < len(tokens) - 1:
+        fragment += ellipsis
+    return fragment
+
@@ -0,0 +1,91 @@
+"""
+Метаданные документов индекса: колонки DOC_COLUMNS, выровненные по номерам
+документов, и нумерация документов по возрастанию даты, при которой интервал
+времени соответствует непрерывному диапазону номеров.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from index.format import DOC_COLUMNS
+
+Timestamp = Union[int, float, datetime, None]
+
+
+def to_timestamp(value: Timestamp) -> int:
+    """Unix time для числа, datetime или pandas.Timestamp (None - 0)."""
+    if value is None:
+        return 0
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def counter_value(value) -> int:
+    # В ответах VK API счетчики - словари {'count': N}, в PostStore.record - числа
+    if isinstance(value, dict):
+        return int(value.get('count', 0))
+    return int(value or 0)
+
+
+def date_order(records: Sequence[dict]) -> np.ndarray:
+    """
+    Аргументы:
+        records: Записи с полем date (unix time или datetime); записи без даты считаются датой 0
+
+    Возвращает:
+        Перестановка записей по возрастанию даты (устойчивая: равные даты сохраняют порядок)
+    """
+    dates = np.fromiter((to_timestamp(record.get('date')) for record in records), dtype=np.int64, count=len(records))
+    return np.argsort(dates, kind='stable')
+
+
+def document_columns(records: Iterable[dict]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+    """
+    Колонки метаданных в порядке записей.
+
+    Аргументы:
+        records: Записи с полями date, university, likes, views (отсутствующие - нули)
+
+    Возвращает:
+        Кортеж (словарь колонка -> массив, названия университетов в порядке кодов)
+    """
+    universities: List[str] = []
+    codes: Dict[str, int] = {}
+    rows = []
+    for record in records:
+        university = record.get('university') or ''
+        if university not in codes:
+            codes[university] = len(universities)
+            universities.append(university)
+        rows.append((to_timestamp(record.get('date')), codes[university],
+                     counter_value(record.get('likes')), counter_value(record.get('views'))))
+    table = np.array(rows, dtype=list(DOC_COLUMNS)).reshape(-1)
+    return {name: np.ascontiguousarray(table[name]) for name, _ in DOC_COLUMNS}, universities
+
+
+def reorder_postings(postings: Dict[str, List[int]], order: np.ndarray) -> Dict[str, List[int]]:
+    """
+    Перенумерация документов в списках.
+
+    Аргументы:
+        postings: Словарь термин -> список старых номеров документов
+        order: Перестановка: новый документ i - это старый документ order[i]
+
+    Возвращает:
+        Словарь термин -> возрастающий список новых номеров
+    """
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return {term: np.sort(rank[np.asarray(doc_ids, dtype=np.int64)]).tolist() for term, doc_ids in postings.items()}
+
+
+def remap_clusters(cluster_ids: Optional[np.ndarray], order: np.ndarray) -> Optional[np.ndarray]:
+    """Номера уникальных документов в cluster_ids после перестановки order."""
+    if cluster_ids is None:
+        return None
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return rank[cluster_ids]
@@ -0,0 +1,75 @@
+"""
+Двоичный формат файла индекса.
+
+Файл состоит из заголовка фиксированного размера и секций, выровненных по 8 байт:
+
+    terms        - термины в UTF-8, отсортированные по байтам, подряд
+    term_offsets - uint64[term_count + 1], границы терминов в секции terms
+    term_table   - TERM_DTYPE[term_count]: частота, вид и смещение списка термина
+    compressed   - редкие термины: списки, упакованные codec.encode_postings, подряд
+    bitmaps      - частые термины: RoaringBitmap.to_bytes(), каждый выровнен по 8 байт
+    kgrams, kgram_offsets - k-граммы терминов (см. index.lexicon), как terms и term_offsets
+    kgram_list_offsets    - uint64[kgram_count + 1], границы списков в kgram_lists
+    kgram_lists           - uint32 номера терминов для каждой k-граммы подряд
+    doc_<колонка> - колонки DOC_COLUMNS по документам (номер документа - индекс);
+                    по умолчанию документы пронумерованы по возрастанию даты
+    doc_sources  - uint64[doc_count], номер исходной записи каждого документа
+                   (пусто, если не сохранен; см. index.reorder)
+    university_bitmaps, university_bitmap_offsets - RoaringBitmap документов
+                    каждого университета и uint64[universities + 1] их границы
+    store_table  - STORE_DTYPE[doc_count]: блок, смещение и длина текста документа
+    store_block_offsets - uint64[block_count + 1], границы блоков в store_blocks
+    store_blocks - сжатые zlib блоки текстов документов (см. index.docstore)
+    metadata     - JSON с дополнительными данными (документы, кластеры дубликатов,
+                   названия университетов в порядке кодов doc_university,
+                   порядок нумерации документов doc_order)
+
+Заголовок хранит смещение и длину каждой секции, поэтому читатель отображает
+файл в память и получает массивы NumPy прямо поверх mmap, ничего не копируя.
+Несжатые списки в файле не хранятся: читатель распаковывает их по запросу.
+"""
+
+import struct
+
+import numpy as np
+
+MAGIC = b'BLKIDX\x00\x01'
+VERSION = 7
+
+# Колонки метаданных документов: дата (unix time), код университета, лайки, просмотры
+DOC_COLUMNS = (
+    ('date', '<i8'),
+    ('university', '<u2'),
+    ('likes', '<i8'),
+    ('views', '<i8'),
+)
+
+SECTIONS = ('terms', 'term_offsets', 'term_table', 'compressed', 'bitmaps',
+            'kgrams', 'kgram_offsets', 'kgram_list_offsets', 'kgram_lists') + \
+    tuple(f'doc_{name}' for name, _ in DOC_COLUMNS) + \
+    ('doc_sources', 'university_bitmaps', 'university_bitmap_offsets',
+     'store_table', 'store_block_offsets', 'store_blocks', 'metadata')
+
+# Вид списка документов термина
+POSTING_LIST = 0
+POSTING_BITMAP = 1
+
+# magic, version, doc_count, term_count, затем (offset, length) каждой секции
+HEADER = struct.Struct('<8sIQQ' + 'QQ' * len(SECTIONS))
+
+TERM_DTYPE = np.dtype([
+    ('df', '<u4'),            # количество документов с термином
+    ('kind', 'u1'),           # POSTING_LIST или POSTING_BITMAP
+    ('comp_offset', '<u8'),   # смещение в байтах в секции compressed или bitmaps
+    ('comp_length', '<u4'),   # длина упакованного списка в байтах
+])
+
+STORE_DTYPE = np.dtype([
+    ('block', '<u4'),         # номер блока в store_blocks
+    ('offset', '<u4'),        # смещение текста в распакованном блоке, байты
+    ('length', '<u4'),        # длина текста в UTF-8, байты
+])
+
+
+def align(offset: int, boundary: int = 8) -> int:
+    return offset + (-offset % boundary)
@@ -0,0 +1,247 @@
+"""
+Поиск по словарю терминов: точный, по префиксу, по шаблону и нечеткий.
+
+Словарь - отсортированные по байтам UTF-8 термины в секции terms, поэтому
+термины с общим префиксом занимают непрерывный диапазон номеров и находятся
+двоичным поиском. Для шаблонов с '*' и '?' в файле хранится индекс k-грамм
+(k = KGRAM_SIZE, границы термина помечены '$'): для каждой k-граммы - список
+номеров терминов. Нечеткий поиск обходит отсортированный словарь как префиксное
+дерево, достраивая строки таблицы расстояния Левенштейна только для новых
+символов (автомат Левенштейна) и пропуская целые диапазоны терминов, префикс
+которых уже дальше max_distance от запроса. Для достаточно длинных запросов
+обход не нужен: каждая правка затрагивает не больше KGRAM_SIZE k-грамм, поэтому
+близкий термин делит с запросом не меньше (число k-грамм - KGRAM_SIZE * max_distance)
+k-грамм, и кандидаты отбираются подсчетом по индексу k-грамм.
+"""
+
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+KGRAM_SIZE = 3
+# Сколько терминов может породить один элемент запроса
+MAX_EXPANSIONS = 50
+MAX_DISTANCE = 2
+WILDCARDS = '*?'
+# 0xFF не встречается в UTF-8: prefix + b'\xff' больше любого термина с этим префиксом
+_PREFIX_END = b'\xff'
+
+
+def term_kgrams(term: str, size: int = KGRAM_SIZE) -> List[str]:
+    """K-граммы термина с границами '$' (без повторов, в порядке появления)."""
+    marked = f'${term}$'
+    return list(dict.fromkeys(marked[i:i + size] for i in range(max(len(marked) - size + 1, 1))))
+
+
+def build_kgram_index(terms: Sequence[str], size: int = KGRAM_SIZE) -> Dict[str, List[int]]:
+    """
+    Аргументы:
+        terms: Отсортированный словарь
+        size: Длина k-граммы
+
+    Возвращает:
+        Словарь k-грамма -> возрастающий список номеров терминов
+    """
+    kgrams: Dict[str, List[int]] = {}
+    for term_id, term in enumerate(terms):
+        for kgram in term_kgrams(term, size):
+            kgrams.setdefault(kgram, []).append(term_id)
+    return kgrams
+
+
+def levenshtein(first: str, second: str) -> int:
+    """Расстояние Левенштейна (вставки, удаления и замены символов)."""
+    row = list(range(len(second) + 1))
+    for i, char in enumerate(first, 1):
+        previous, row[0] = row[0], i
+        for j, other in enumerate(second, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (char != other))
+    return row[-1]
+
+
+def auto_distance(term: str) -> int:
+    """
+    Допустимое число опечаток по длине термина: в коротких словах одна-две правки
+    дают слишком много совпадений (0 для 1-2 символов, 1 для 3-5, иначе MAX_DISTANCE).
+    """
+    if len(term) <= 2:
+        return 0
+    return 1 if len(term) <= 5 else MAX_DISTANCE
+
+
+def is_pattern(token: str) -> bool:
+    return any(char in token for char in WILDCARDS)
+
+
+class SortedStrings:
+    """Последовательность строк-байтов поверх блоба и массива границ (для bisect)."""
+
+    def __init__(self, blob: memoryview, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+    def find(self, key: bytes) -> int:
+        i = bisect_left(self, key)
+        return i if i < len(self) and self[i] == key else -1
+
+
+class Lexicon:
+    """
+    Словарь терминов индекса поверх секций файла (без копирования).
+    Методы расширения возвращают не более limit терминов, самые частые первыми.
+    """
+
+    def __init__(self, terms: SortedStrings, df: np.ndarray, kgrams: SortedStrings,
+                 kgram_offsets: np.ndarray, kgram_postings: np.ndarray):
+        self.terms = terms
+        self.df = df
+        self._kgrams = kgrams
+        self._kgram_offsets = kgram_offsets
+        self._kgram_postings = kgram_postings
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def term(self, term_id: int) -> str:
+        return self.terms[term_id].decode('utf-8')
+
+    def find(self, term: str) -> int:
+        """Номер термина или -1."""
+        return self.terms.find(term.encode('utf-8'))
+
+    def _top(self, term_ids: Iterable[int], limit: int) -> List[str]:
+        term_ids = np.fromiter(term_ids, dtype=np.int64)
+        # Устойчивая сортировка: при равной частоте термины остаются в порядке словаря
+        order = np.argsort(-self.df[term_ids].astype(np.int64), kind='stable')[:limit]
+        return [self.term(int(term_id)) for term_id in term_ids[order]]
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """Диапазон [начало, конец) номеров терминов с префиксом."""
+        key = prefix.encode('utf-8')
+        return bisect_left(self.terms, key), bisect_left(self.terms, key + _PREFIX_END)
+
+    def prefix(self, prefix: str, limit: int = MAX_EXPANSIONS) -> List[str]:
+        """
+        Аргументы:
+            prefix: Начало термина
+            limit: Максимальное количество терминов
+
+        Возвращает:
+            Термины с префиксом, самые частые первыми
+        """
+        start, end = self.prefix_range(prefix)
+        return self._top(range(start, end), limit)
+
+    def _kgram_terms(self, kgram: str) -> np.ndarray:
+        i = self._kgrams.find(kgram.encode('utf-8'))
+        if i < 0:
+            return np.empty(0, dtype=np.uint32)
+        return self._kgram_postings[self._kgram_offsets[i]:self._kgram_offsets[i + 1]]
+
+    def wildcard(self, pattern: str, limit: int = MAX_EXPANSIONS) -> List[str]:
+        """
+        Термины по шаблону: '*' - любая последовательность символов, '?' - один символ.
+
+        Кандидаты - пересечение списков k-грамм из неизменяемых частей шаблона в
+        диапазоне префикса до первого подстановочного символа; затем каждый
+        кандидат проверяется регулярным выражением (k-граммы дают ложные совпадения).
+
+        Аргументы:
+            pattern: Шаблон, например 'спбгу*' или 'у*верс?тет'
+            limit: Максимальное количество терминов
+
+        Возвращает:
+            Подходящие термины, самые частые первыми; шаблон без обычных символов ничего не находит
+        """
+        if not is_pattern(pattern):
+            return [pattern] if self.find(pattern) >= 0 else []
+        if not pattern.strip(WILDCARDS):
+            return []
+        first = min(pattern.index(char) for char in WILDCARDS if char in pattern)
+        start, end = self.prefix_range(pattern[:first])
+        candidates: Optional[np.ndarray] = None
+        for part in re.split('[*?]', f'${pattern}$'):
+            for i in range(len(part) - KGRAM_SIZE + 1):
+                found = self._kgram_terms(part[i:i + KGRAM_SIZE])
+                candidates = found if candidates is None else np.intersect1d(candidates, found, assume_unique=True)
+        if candidates is None:
+            candidates = np.arange(start, end)
+        else:
+            candidates = candidates[(candidates >= start) & (candidates < end)]
+        regex = re.compile(''.join('.*' if char == '*' else '.' if char == '?' else re.escape(char) for char in pattern))
+        return self._top((int(term_id) for term_id in candidates if regex.fullmatch(self.term(int(term_id)))), limit)
+
+    def fuzzy(self, term: str, max_distance: int = MAX_DISTANCE, limit: int = MAX_EXPANSIONS) -> List[Tuple[str, int]]:
+        """
+        Термины на расстоянии Левенштейна не больше max_distance.
+
+        Аргументы:
+            term: Термин запроса (возможно, с опечаткой)
+            max_distance: Максимальное количество вставок, удалений и замен
+            limit: Максимальное количество терминов
+
+        Возвращает:
+            Пары (термин, расстояние): сначала ближайшие, при равном расстоянии - более частые
+        """
+        kgrams = term_kgrams(term)
+        threshold = len(kgrams) - KGRAM_SIZE * max_distance
+        if threshold > 0:
+            matches = self._fuzzy_by_kgrams(term, kgrams, threshold, max_distance)
+        else:
+            matches = self._fuzzy_by_automaton(term, max_distance)
+        matches.sort(key=lambda match: (match[0], -int(self.df[match[1]])))
+        return [(self.term(term_id), distance) for distance, term_id in matches[:limit]]
+
+    def _fuzzy_by_kgrams(self, term: str, kgrams: List[str], threshold: int,
+                         max_distance: int) -> List[Tuple[int, int]]:
+        found = [self._kgram_terms(kgram) for kgram in kgrams]
+        term_ids, shared = np.unique(np.concatenate(found), return_counts=True)
+        matches = []
+        for term_id in term_ids[shared >= threshold].tolist():
+            distance = levenshtein(term, self.term(term_id))
+            if distance <= max_distance:
+                matches.append((distance, term_id))
+        return matches
+
+    def _fuzzy_by_automaton(self, term: str, max_distance: int) -> List[Tuple[int, int]]:
+        matches: List[Tuple[int, int]] = []
+        # rows[k] - строка таблицы расстояний для первых k символов текущего термина
+        rows = [list(range(len(term) + 1))]
+        previous = ''
+        i = 0
+        while i < len(self.terms):
+            candidate = self.term(i)
+            common = 0
+            limit_common = min(len(previous), len(candidate), len(rows) - 1)
+            while common < limit_common and previous[common] == candidate[common]:
+                common += 1
+            del rows[common + 1:]
+            pruned = False
+            for depth in range(common, len(candidate)):
+                row = rows[-1]
+                char = candidate[depth]
+                next_row = [row[0] + 1]
+                for j, query_char in enumerate(term, 1):
+                    next_row.append(min(next_row[j - 1] + 1, row[j] + 1, row[j - 1] + (query_char != char)))
+                rows.append(next_row)
+                if min(next_row) > max_distance:
+                    # Все термины с этим префиксом тоже дальше max_distance
+                    i = bisect_left(self.terms, candidate[:depth + 1].encode('utf-8') + _PREFIX_END)
+                    previous = candidate[:depth + 1]
+                    pruned = True
+                    break
+            if pruned:
+                continue
+            if rows[-1][-1] <= max_distance:
+                matches.append((rows[-1][-1], i))
+            previous = candidate
+            i += 1
+        return matches
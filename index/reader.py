@@ -0,0 +1,517 @@
+import json
+import mmap
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from index import codec
+from index.bitmap import RoaringBitmap
+from index.docstore import BLOCK_CACHE_SIZE, HIGHLIGHT, SNIPPET_WINDOW, DocumentStore, highlight, snippet
+from index.documents import Timestamp, to_timestamp
+from index.format import DOC_COLUMNS, HEADER, MAGIC, POSTING_BITMAP, SECTIONS, STORE_DTYPE, TERM_DTYPE, VERSION
+from index.lexicon import MAX_EXPANSIONS, Lexicon, SortedStrings, auto_distance, is_pattern
+from index.tokens import query_tokens
+from profiling import METRICS, count, timer
+
+
+class IndexReader:
+    """
+    Чтение индекса в формате index.format без загрузки в память.
+
+    Файл отображается в память (mmap), таблица терминов и сжатые списки
+    документов доступны без копирования поверх отображения; термин ищется двоичным
+    поиском по отсортированной секции terms (см. index.lexicon). Вместо пути можно передать
+    содержимое файла (bytes) - например, результат IndexBuilder.to_bytes().
+
+    В файле хранятся только сжатые списки. Распакованные списки частых
+    запросов держатся в LRU-кэше не более чем на cache_size терминов
+    (0 - без кэша), поэтому память не растет с размером индекса. Тексты
+    документов читаются из сжатых блоков (index.docstore), распакованные блоки
+    держатся в своем LRU-кэше на block_cache_size блоков.
+    """
+
+    def __init__(self, source: Union[str, os.PathLike, bytes, bytearray, memoryview], cache_size: int = 256,
+                 block_cache_size: int = BLOCK_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[int, np.ndarray]' = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._file = None
+        self._mmap = None
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, 'rb')
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._buffer = memoryview(self._mmap)
+        else:
+            self._buffer = memoryview(source)
+
+        if len(self._buffer) < HEADER.size:
+            raise ValueError("Файл слишком мал для индекса")
+        magic, version, self.doc_count, self.term_count, *layout = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC:
+            raise ValueError("Неизвестный формат файла индекса")
+        if version != VERSION:
+            raise ValueError(f"Неподдерживаемая версия индекса: {version}")
+        self._sections = {
+            name: self._buffer[layout[2 * i]:layout[2 * i] + layout[2 * i + 1]]
+            for i, name in enumerate(SECTIONS)
+        }
+
+        self._offsets = np.frombuffer(self._sections['term_offsets'], dtype='<u8')
+        self.table = np.frombuffer(self._sections['term_table'], dtype=TERM_DTYPE)
+        self.lexicon = Lexicon(
+            SortedStrings(self._sections['terms'], self._offsets),
+            self.table['df'],
+            SortedStrings(self._sections['kgrams'], np.frombuffer(self._sections['kgram_offsets'], dtype='<u8')),
+            np.frombuffer(self._sections['kgram_list_offsets'], dtype='<u8'),
+            np.frombuffer(self._sections['kgram_lists'], dtype='<u4'),
+        )
+        self.columns = {name: np.frombuffer(self._sections[f'doc_{name}'], dtype=dtype) for name, dtype in DOC_COLUMNS}
+        self.source_ids = np.frombuffer(self._sections['doc_sources'], dtype='<u8')
+        self.store = DocumentStore(
+            np.frombuffer(self._sections['store_table'], dtype=STORE_DTYPE),
+            np.frombuffer(self._sections['store_block_offsets'], dtype='<u8'),
+            self._sections['store_blocks'],
+            block_cache_size,
+        )
+        self._metadata = None
+
+    def close(self):
+        # Массивы поверх mmap держат на него ссылки, поэтому сначала освобождаются они
+        self._sections = {}
+        self._cache.clear()
+        self.store.clear()
+        self._offsets = self.table = self.lexicon = self.columns = self.source_ids = None
+        self._buffer.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Снаружи остались массивы поверх файла: отображение освободится вместе с ними
+                pass
+            self._file.close()
+            self._mmap = self._file = None
+
+    def __enter__(self) -> 'IndexReader':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def term_id(self, term: str) -> int:
+        """
+        Аргументы:
+            term: Термин
+
+        Возвращает:
+            Номер термина в таблице или -1, если термина нет в индексе
+        """
+        count('search.terms_looked_up')
+        return self.lexicon.find(term)
+
+    def __contains__(self, term: str) -> bool:
+        return self.term_id(term) >= 0
+
+    def __len__(self) -> int:
+        return self.term_count
+
+    def terms(self) -> Iterator[str]:
+        for i in range(self.term_count):
+            yield self.lexicon.term(i)
+
+    def df(self, term: str) -> int:
+        """Количество документов с термином."""
+        i = self.term_id(term)
+        return int(self.table['df'][i]) if i >= 0 else 0
+
+    def compressed_postings(self, term: str) -> memoryview:
+        """
+        Сжатый список документов термина (срез файла без копирования): коды
+        Элиаса-дельта или RoaringBitmap.to_bytes() для частых терминов (см. is_bitmap).
+        """
+        i = self.term_id(term)
+        if i < 0:
+            return self._sections['compressed'][:0]
+        return self._packed(i)
+
+    def is_bitmap(self, term: str) -> bool:
+        """Хранится ли список термина битовым множеством."""
+        i = self.term_id(term)
+        return i >= 0 and self.table['kind'][i] == POSTING_BITMAP
+
+    def _packed(self, i: int) -> memoryview:
+        entry = self.table[i]
+        section = 'bitmaps' if entry['kind'] == POSTING_BITMAP else 'compressed'
+        start = int(entry['comp_offset'])
+        return self._sections[section][start:start + int(entry['comp_length'])]
+
+    def _decode(self, i: int) -> np.ndarray:
+        count('search.doc_ids_decoded', int(self.table['df'][i]))
+        if self.table['kind'][i] == POSTING_BITMAP:
+            count('search.bitmaps_decoded')
+            return RoaringBitmap.frombuffer(self._packed(i)).to_array()
+        count('search.lists_decoded')
+        return codec.decode_postings(self._packed(i), int(self.table['df'][i]))
+
+    def decode(self, term: str) -> np.ndarray:
+        """Распаковка сжатого списка документов термина (всегда, без кэша)."""
+        i = self.term_id(term)
+        if i < 0:
+            return np.empty(0, dtype=np.uint32)
+        return self._decode(i)
+
+    def bitmap(self, term: str, allowed: Optional[RoaringBitmap] = None,
+               compressed: bool = False) -> RoaringBitmap:
+        """
+        Документы термина битовым множеством: для частых терминов - контейнеры
+        поверх файла без копирования, для редких - построенное из распакованного списка.
+
+        Аргументы:
+            term: Термин
+            allowed: Оставить только эти документы (см. document_filter)
+            compressed: Распаковывать сжатый список заново, без кэша. С фильтром
+                список распаковывается только до последнего разрешенного документа.
+                False - брать распакованный список из кэша (см. postings). Битовые
+                множества читаются из файла в обоих режимах, и у них затрагиваются
+                только контейнеры, общие с фильтром
+        """
+        i = self.term_id(term)
+        if i < 0 or (allowed is not None and not len(allowed.keys)):
+            return RoaringBitmap()
+        if self.table['kind'][i] == POSTING_BITMAP:
+            doc_ids = RoaringBitmap.frombuffer(self._packed(i))
+            return doc_ids if allowed is None else doc_ids & allowed
+        if not compressed:
+            doc_ids = self.postings(term)
+        elif allowed is None:
+            doc_ids = self._decode(i)
+        else:
+            count('search.lists_decoded')
+            doc_ids = codec.decode_postings(self._packed(i), int(self.table['df'][i]), stop=allowed.last() + 1)
+            count('search.doc_ids_decoded', len(doc_ids))
+        if allowed is None:
+            return RoaringBitmap.from_array(doc_ids)
+        first, stop = allowed.first(), allowed.last() + 1
+        doc_ids = doc_ids[(doc_ids >= first) & (doc_ids < stop)]
+        return RoaringBitmap.from_array(doc_ids) & allowed
+
+    def intersect(self, terms: List[str], allowed: Optional[RoaringBitmap] = None,
+                  compressed: bool = False) -> np.ndarray:
+        """
+        Документы, содержащие все термины.
+
+        Аргументы:
+            terms: Термины запроса
+            allowed: Искать только среди этих документов (см. document_filter)
+            compressed: Распаковывать сжатые списки заново (см. bitmap)
+
+        Возвращает:
+            Массив uint32 номеров документов в порядке возрастания
+        """
+        if not terms:
+            return np.empty(0, dtype=np.uint32)
+        return self._match([[term] for term in dict.fromkeys(terms)], allowed, compressed)
+
+    def union(self, terms: List[str]) -> np.ndarray:
+        """Документы, содержащие хотя бы один из терминов (массив uint32 по возрастанию)."""
+        result = RoaringBitmap()
+        for term in set(terms):
+            result = result | self.bitmap(term)
+        return result.to_array()
+
+    def _match(self, groups: List[List[str]], allowed: Optional[RoaringBitmap] = None,
+               compressed: bool = False) -> np.ndarray:
+        # Документы, где из каждой группы встречается хотя бы один термин. Группы идут
+        # от самой редкой, и каждая следующая ищется только среди уже найденных документов
+        if not all(groups) or (not groups and allowed is None):
+            return np.empty(0, dtype=np.uint32)
+        result = allowed
+        for group in sorted(groups, key=lambda group: sum(map(self.df, group))):
+            matched = RoaringBitmap()
+            for term in group:
+                matched = matched | self.bitmap(term, result, compressed)
+            result = matched
+            if not len(result.keys):
+                break
+        return result.to_array()
+
+    @property
+    def universities(self) -> List[str]:
+        """Названия университетов в порядке кодов колонки university."""
+        return self.metadata.get('universities', [])
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Колонка метаданных документов (см. index.format.DOC_COLUMNS) без копирования;
+        пустая, если индекс построен без метаданных.
+        """
+        return self.columns[name]
+
+    @property
+    def tokenizer(self) -> str:
+        """
+        Способ разбиения текстов на термины при построении (см. index.tokens.TOKENIZERS);
+        индексы без этого ключа построены разбиением по пробелам.
+        """
+        return self.metadata.get('tokenizer', 'split')
+
+    @property
+    def doc_order(self) -> str:
+        """Порядок нумерации документов при построении (см. index.reorder.ORDERS)."""
+        return self.metadata.get('doc_order', 'date')
+
+    def source_id(self, doc_id: int) -> int:
+        """
+        Номер исходной записи (например, в vk_array.npy) для документа индекса;
+        номер документа, если таблица соответствия не сохранена.
+        """
+        return int(self.source_ids[doc_id]) if len(self.source_ids) else doc_id
+
+    def university_bitmap(self, university: str) -> RoaringBitmap:
+        """Документы университета (пустое множество для неизвестного)."""
+        if university not in self.universities:
+            return RoaringBitmap()
+        code = self.universities.index(university)
+        offsets = np.frombuffer(self._sections['university_bitmap_offsets'], dtype='<u8')
+        return RoaringBitmap.frombuffer(self._sections['university_bitmaps'][offsets[code]:offsets[code + 1]])
+
+    def doc_range(self, start: Timestamp = None, end: Timestamp = None) -> Tuple[int, int]:
+        """
+        Диапазон [первый, последний + 1) номеров документов с датой в интервале:
+        документы пронумерованы по возрастанию даты, поэтому это два двоичных поиска.
+
+        Аргументы:
+            start: Начало интервала (unix time или datetime, включительно; None - без ограничения)
+            end: Конец интервала (включительно; None - без ограничения)
+        """
+        if self.doc_order != 'date':
+            raise ValueError(f"Документы пронумерованы не по дате (порядок {self.doc_order})")
+        dates = self.columns['date']
+        first = 0 if start is None else int(np.searchsorted(dates, to_timestamp(start), side='left'))
+        stop = len(dates) if end is None else int(np.searchsorted(dates, to_timestamp(end), side='right'))
+        return first, max(first, stop)
+
+    def document_filter(self, start: Timestamp = None, end: Timestamp = None,
+                        university: Union[str, Sequence[str], None] = None,
+                        min_likes: Optional[int] = None, min_views: Optional[int] = None) -> Optional[RoaringBitmap]:
+        """
+        Множество документов, подходящих под фильтры метаданных.
+
+        Аргументы:
+            start: Начало интервала дат (включительно)
+            end: Конец интервала дат (включительно)
+            university: Университет или список университетов
+            min_likes: Минимальное количество лайков
+            min_views: Минимальное количество просмотров
+
+        Возвращает:
+            RoaringBitmap или None, если фильтры не заданы
+        """
+        if start is None and end is None and university is None and min_likes is None and min_views is None:
+            return None
+        if self.doc_count and not len(self.columns['date']):
+            raise ValueError("Индекс построен без метаданных документов")
+        if self.doc_order == 'date':
+            allowed = RoaringBitmap.from_range(*self.doc_range(start, end))
+        else:
+            # Даты не упорядочены по номерам: интервал - маска по всей колонке
+            dates = self.columns['date']
+            mask = np.ones(len(dates), dtype=bool)
+            if start is not None:
+                mask &= dates >= to_timestamp(start)
+            if end is not None:
+                mask &= dates <= to_timestamp(end)
+            allowed = RoaringBitmap.from_array(np.flatnonzero(mask))
+        if university is not None:
+            selected = RoaringBitmap()
+            for name in ([university] if isinstance(university, str) else university):
+                selected = selected | self.university_bitmap(name)
+            allowed = allowed & selected
+        for name, minimum in (('likes', min_likes), ('views', min_views)):
+            if minimum is not None and len(allowed.keys):
+                first, stop = allowed.first(), allowed.last() + 1
+                doc_ids = first + np.flatnonzero(self.columns[name][first:stop] >= minimum)
+                allowed = allowed & RoaringBitmap.from_array(doc_ids)
+        return allowed
+
+    def postings(self, term: str) -> np.ndarray:
+        """
+        Несжатый список документов термина.
+
+        Аргументы:
+            term: Термин
+
+        Возвращает:
+            Массив uint32 только для чтения (пустой, если термина нет); распакованные
+            списки берутся из LRU-кэша и попадают в него
+        """
+        i = self.term_id(term)
+        if i < 0:
+            return np.empty(0, dtype=np.uint32)
+        doc_ids = self._cache.get(i)
+        if doc_ids is not None:
+            self.cache_hits += 1
+            self._cache.move_to_end(i)
+            return doc_ids
+        self.cache_misses += 1
+        doc_ids = self._decode(i)
+        doc_ids.flags.writeable = False
+        if self.cache_size > 0:
+            self._cache[i] = doc_ids
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return doc_ids
+
+    def cache_info(self) -> Dict[str, int]:
+        """Статистика кэша распакованных списков."""
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'size': len(self._cache),
+            'max_size': self.cache_size
+        }
+
+    def expand(self, token: str, max_expansions: int = MAX_EXPANSIONS) -> List[str]:
+        """
+        Термины словаря, соответствующие элементу запроса.
+
+        Аргументы:
+            token: Термин; с '*' или '?' - шаблон ('спбгу*'), если такого термина нет
+                в словаре ('зачем?' при разбиении по пробелам); с '~' в конце - нечеткий
+                поиск с числом опечаток по длине слова ('униврситет~', см. auto_distance)
+                или не больше N ('униврситет~1')
+            max_expansions: Максимальное количество терминов
+
+        Возвращает:
+            Найденные термины (для шаблонов - самые частые, для нечеткого - ближайшие)
+        """
+        fuzzy = self._fuzzy_token(token)
+        if fuzzy is not None:
+            term, distance = fuzzy
+            return [match for match, _ in self.lexicon.fuzzy(term, distance, max_expansions)]
+        if self._is_pattern(token):
+            return self.lexicon.wildcard(token, max_expansions)
+        return [token] if token in self else []
+
+    def _is_pattern(self, token: str) -> bool:
+        # Термин словаря с '*' или '?' ('зачем?' при разбиении по пробелам) ищется как есть
+        return is_pattern(token) and token not in self
+
+    @staticmethod
+    def _fuzzy_token(token: str) -> Optional[Tuple[str, int]]:
+        term, tilde, distance = token.rpartition('~')
+        if not tilde or not term or (distance and not distance.isdigit()):
+            return None
+        return term, int(distance) if distance else auto_distance(term)
+
+    def search(self, query: str, compressed: bool = True, max_expansions: int = MAX_EXPANSIONS,
+               start: Timestamp = None, end: Timestamp = None, university: Union[str, Sequence[str], None] = None,
+               min_likes: Optional[int] = None, min_views: Optional[int] = None) -> Dict[str, Union[List[int], float]]:
+        """
+        Поиск документов по термину; запрос из нескольких слов ищет документы
+        со всеми словами (пересечение битовых множеств, см. intersect). Слово с
+        '*', '?' или '~' заменяется найденными терминами (см. expand), и
+        подходит документ с любым из них. Фильтры метаданных (см. document_filter)
+        применяются до распаковки списков; пустой запрос с фильтрами возвращает
+        все подходящие документы.
+
+        Аргументы:
+            query: Термин или слова через пробел (разбиваются как тексты индекса, см. tokenizer)
+            compressed: Распаковывать сжатые списки заново (False - брать распакованные
+                списки из кэша, см. postings); действует на все виды запросов
+            max_expansions: Максимальное количество терминов на одно слово запроса
+            start, end, university, min_likes, min_views: Фильтры (см. document_filter)
+
+        Возвращает:
+            Словарь: results - номера исходных записей найденных документов
+            (позиции в vk_array.npy, см. source_id) в порядке номеров документов,
+            doc_ids - номера документов индекса (для document, snippets, column),
+            время поиска, количество результатов и термины, по которым шел поиск
+        """
+        start_time = time.perf_counter()
+        # Запрос разбивается так же, как тексты при построении индекса
+        tokens = query_tokens(query, self.tokenizer)
+        count('search.queries')
+        with timer('search.filter'):
+            allowed = self.document_filter(start, end, university, min_likes, min_views)
+        if len(tokens) == 1 and allowed is None and not self._is_pattern(tokens[0]) and self._fuzzy_token(tokens[0]) is None:
+            term = tokens[0]
+            terms = [term] if term in self else []
+            with timer('search.match'):
+                doc_ids = self.decode(term) if compressed else self.postings(term)
+        else:
+            with timer('search.expand'):
+                groups = [self.expand(token, max_expansions) for token in tokens]
+            terms = [term for group in groups for term in group]
+            with timer('search.match'):
+                doc_ids = self._match(groups, allowed, compressed)
+        # Номера документов переставлены при построении (index.reorder) - результат
+        # отдается в номерах исходных записей, как до перестановки
+        results = (self.source_ids[doc_ids] if len(self.source_ids) else doc_ids).tolist()
+        search_time = time.perf_counter() - start_time
+        if METRICS.enabled:
+            METRICS.add_time('search.query', search_time)
+        return {
+            'results': results,
+            'doc_ids': doc_ids.tolist(),
+            'time_sec': search_time,
+            'count': len(results),
+            'terms': terms
+        }
+
+    def document(self, doc_id: int) -> str:
+        """Текст документа из хранилища (одна распаковка блока, см. index.docstore)."""
+        if self.doc_count and not len(self.store):
+            raise ValueError("Индекс построен без текстов документов")
+        return self.store.document(doc_id)
+
+    def highlight(self, doc_id: int, terms: Sequence[str], marks: Tuple[str, str] = HIGHLIGHT) -> str:
+        """Текст документа с подсвеченными терминами (см. index.docstore.highlight)."""
+        return highlight(self.document(doc_id), terms, marks)
+
+    def snippets(self, doc_ids: Sequence[int], terms: Sequence[str], window: int = SNIPPET_WINDOW,
+                 marks: Tuple[str, str] = HIGHLIGHT) -> Dict[int, str]:
+        """
+        Фрагменты текстов найденных документов.
+
+        Аргументы:
+            doc_ids: Номера документов (например, search(...)['results'])
+            terms: Подсвечиваемые термины (search(...)['terms'])
+            window: Длина фрагмента в словах
+            marks: Разметка начала и конца совпадения
+
+        Возвращает:
+            Словарь номер документа -> фрагмент с подсветкой (см. index.docstore.snippet)
+        """
+        return {doc_id: snippet(self.document(doc_id), terms, window, marks) for doc_id in doc_ids}
+
+    def sizes(self) -> Dict[str, int]:
+        """Размеры списков документов в байтах: без сжатия (uint32) и в файле (списки и битовые множества)."""
+        return {
+            'uncompressed_bytes': int(self.table['df'].sum()) * 4,
+            'compressed_bytes': len(self._sections['compressed']) + len(self._sections['bitmaps'])
+        }
+
+    def evaluate(self, query: str, max_expansions: int = MAX_EXPANSIONS) -> Dict[str, Union[float, int]]:
+        sizes = self.sizes()
+        uncompressed_search = self.search(query, compressed=False, max_expansions=max_expansions)
+        compressed_search = self.search(query, compressed=True, max_expansions=max_expansions)
+        return {
+            'uncompressed_size_kb': sizes['uncompressed_bytes'] / 1024,
+            'compressed_size_kb': sizes['compressed_bytes'] / 1024,
+            'compression_ratio': sizes['compressed_bytes'] / sizes['uncompressed_bytes'] if sizes['uncompressed_bytes'] else 0.0,
+            'uncompressed_search_time': uncompressed_search['time_sec'],
+            'compressed_search_time': compressed_search['time_sec'],
+            'results_count': uncompressed_search['count']
+        }
+
+    @property
+    def metadata(self) -> dict:
+        """Дополнительные данные индекса (документы, кластеры дубликатов)."""
+        if self._metadata is None:
+            self._metadata = json.loads(bytes(self._sections['metadata']).decode('utf-8'))
+        return self._metadata
+
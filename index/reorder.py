@@ -0,0 +1,132 @@
+"""
+Перенумерация документов перед построением индекса.
+
+Разности соседних номеров в списках документов тем меньше (и коды Элиаса-дельта
+тем короче, а битовые контейнеры тем плотнее), чем ближе друг к другу стоят
+документы с общими терминами. Порядки:
+
+    date       - по дате (по умолчанию): интервал времени - диапазон номеров
+    university - по университету, внутри - по дате
+    bp         - рекурсивная бисекция графа документ-термин (BP ordering):
+                 документы с похожими словарями оказываются рядом
+    none       - в порядке загрузки
+"""
+
+from typing import Callable, List, Sequence, Tuple
+
+import numpy as np
+
+from index.documents import date_order, to_timestamp
+
+ORDERS = ('date', 'university', 'bp', 'none')
+
+
+def doc_term_matrix(records: Sequence[dict], tokenize: Callable[[str], List[str]] = str.split,
+                    text_field: str = 'text') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Матрица документ-термин в формате CSR (без весов).
+
+    Возвращает:
+        Кортеж (indptr длиной len(records) + 1, номера терминов каждого документа подряд)
+    """
+    vocabulary = {}
+    indptr = np.zeros(len(records) + 1, dtype=np.int64)
+    indices: List[int] = []
+    for doc_id, record in enumerate(records):
+        indices.extend({vocabulary.setdefault(word, len(vocabulary)) for word in tokenize(record[text_field])})
+        indptr[doc_id + 1] = len(indices)
+    return indptr, np.array(indices, dtype=np.int64)
+
+
+def _log_cost(degree: np.ndarray, size: int) -> np.ndarray:
+    # Оценка числа бит на разности списка из degree документов в части из size документов
+    degree = np.maximum(degree, 0)
+    return degree * np.log2(size / (degree + 1))
+
+
+def bp_order(indptr: np.ndarray, indices: np.ndarray, leaf_size: int = 64, iterations: int = 10) -> np.ndarray:
+    """
+    Рекурсивная бисекция графа (Dhulipala et al., 2016).
+
+    Документы делятся пополам; затем пары документов, перенос которых
+    в другую половину сильнее всего уменьшает оценку размера списков
+    (сумма d * log2(n / (d + 1)) по терминам и половинам), меняются местами,
+    пока обмены выгодны, но не больше iterations раз. Каждая половина делится
+    так же, пока в ней больше leaf_size документов. Выигрыши всех документов
+    части считаются векторными операциями NumPy.
+
+    Аргументы:
+        indptr, indices: Матрица документ-термин (см. doc_term_matrix)
+        leaf_size: Размер части, которая больше не делится
+        iterations: Максимум раундов обменов на одно деление
+
+    Возвращает:
+        Перестановка: новый документ i - это старый документ order[i]
+    """
+    order = np.arange(len(indptr) - 1)
+    stack = [(0, len(order))]
+    while stack:
+        start, stop = stack.pop()
+        if stop - start <= leaf_size:
+            continue
+        docs = order[start:stop]
+        lengths = indptr[docs + 1] - indptr[docs]
+        owner = np.repeat(np.arange(len(docs)), lengths)
+        positions = np.repeat(indptr[docs] - np.cumsum(lengths) + lengths, lengths) + np.arange(int(lengths.sum()))
+        _, terms = np.unique(indices[positions], return_inverse=True)
+        term_count = int(terms.max()) + 1 if len(terms) else 0
+        middle = len(docs) // 2
+        size_left, size_right = middle, len(docs) - middle
+        right = np.arange(len(docs)) >= middle
+
+        for _ in range(iterations):
+            occurrence_right = right[owner]
+            left_degree = np.bincount(terms[~occurrence_right], minlength=term_count)
+            right_degree = np.bincount(terms[occurrence_right], minlength=term_count)
+            current = _log_cost(left_degree, size_left) + _log_cost(right_degree, size_right)
+            to_right = current - _log_cost(left_degree - 1, size_left) - _log_cost(right_degree + 1, size_right)
+            to_left = current - _log_cost(left_degree + 1, size_left) - _log_cost(right_degree - 1, size_right)
+            gain = np.bincount(owner, weights=np.where(occurrence_right, to_left[terms], to_right[terms]),
+                               minlength=len(docs))
+            left_docs = np.flatnonzero(~right)
+            right_docs = np.flatnonzero(right)
+            left_docs = left_docs[np.argsort(-gain[left_docs], kind='stable')]
+            right_docs = right_docs[np.argsort(-gain[right_docs], kind='stable')]
+            pairs = min(len(left_docs), len(right_docs))
+            swap = np.flatnonzero(gain[left_docs[:pairs]] + gain[right_docs[:pairs]] > 0)
+            if not len(swap):
+                break
+            # Выигрыши отсортированы по убыванию, поэтому выгодные пары идут подряд с начала
+            right[left_docs[swap]] = True
+            right[right_docs[swap]] = False
+
+        order[start:stop] = np.concatenate((docs[~right], docs[right]))
+        stack.append((start, start + middle))
+        stack.append((start + middle, stop))
+    return order
+
+
+def document_order(records: Sequence[dict], order: str = 'date', tokenize: Callable[[str], List[str]] = str.split,
+                   text_field: str = 'text') -> np.ndarray:
+    """
+    Аргументы:
+        records: Записи в порядке загрузки
+        order: Порядок из ORDERS
+        tokenize: Функция разбиения текста на термины (для bp)
+        text_field: Имя поля с текстом (для bp)
+
+    Возвращает:
+        Перестановка: новый документ i - это запись records[order[i]]
+    """
+    if order == 'date':
+        return date_order(records)
+    if order == 'university':
+        dates = np.fromiter((to_timestamp(record.get('date')) for record in records), dtype=np.int64, count=len(records))
+        _, universities = np.unique(np.array([record.get('university') or '' for record in records], dtype=object),
+                                    return_inverse=True)
+        return np.lexsort((dates, universities))
+    if order == 'bp':
+        return bp_order(*doc_term_matrix(records, tokenize, text_field))
+    if order == 'none':
+        return np.arange(len(records))
+    raise ValueError(f"Неизвестный порядок документов: {order} (допустимы {', '.join(ORDERS)})")
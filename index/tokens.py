@@ -0,0 +1,62 @@
+"""
+Разбиение текстов и запросов на термины.
+
+Способ разбиения выбирается при построении индекса (IndexBuilder, pipeline.py)
+и сохраняется в метаданных индекса (ключ tokenizer), поэтому IndexReader
+разбивает запрос так же, как тексты документов:
+
+    normalize - слова в нижнем регистре без знаков препинания (dedup.normalize_text)
+    split     - разбиение по пробелам без изменений (индексы без ключа tokenizer)
+"""
+
+from typing import Callable, List
+
+from dedup import normalize_text
+from index.lexicon import WILDCARDS
+
+TOKENIZERS = ('normalize', 'split')
+DEFAULT_TOKENIZER = 'normalize'
+
+
+def normalized_words(text: str) -> List[str]:
+    """Слова текста в нижнем регистре без знаков препинания."""
+    return normalize_text(text).split()
+
+
+def get_tokenizer(name: str) -> Callable[[str], List[str]]:
+    """Функция текст -> термины для способа разбиения name (см. TOKENIZERS)."""
+    if name == 'normalize':
+        return normalized_words
+    if name == 'split':
+        return str.split
+    raise ValueError(f"Неизвестный способ разбиения на термины: {name}")
+
+
+def query_tokens(query: str, name: str) -> List[str]:
+    """
+    Элементы запроса для способа разбиения name. При normalize слова
+    нормализуются как тексты документов, а у шаблонов ('СПбГУ*') и нечетких
+    элементов ('Униврситет~1') приводится к нижнему регистру только слово,
+    без удаления '*', '?' и '~'.
+
+    Аргументы:
+        query: Запрос, элементы через пробел
+        name: Способ разбиения (см. TOKENIZERS)
+
+    Возвращает:
+        Список элементов запроса
+    """
+    tokenize = get_tokenizer(name)
+    if name == 'split':
+        return tokenize(query)
+    tokens = []
+    for token in query.split():
+        term, tilde, distance = token.rpartition('~')
+        if tilde and term and (not distance or distance.isdigit()):
+            words = tokenize(term)
+            tokens.append(words[0] + tilde + distance if len(words) == 1 else token.lower())
+        elif any(char in token for char in WILDCARDS):
+            tokens.append(token.lower())
+        else:
+            tokens.extend(tokenize(token))
+    return tokens
@@ -1,122 +1,50 @@
-import numpy as np
-import time
-import pickle
 import argparse
 from typing import Dict, List, Union
 
-class InvertedIndex:
+from index import IndexBuilder, IndexReader
+
+class InvertedIndex(IndexBuilder):
     """
     Класс для создания и работы с инвертированным индексом со сжатием Элиаса-дельта.
     Поддерживает создание индекса, сжатие, поиск и оценку производительности.
+    Поиск и оценка идут через IndexReader поверх сериализованного индекса,
+    как и при поиске по файлу в search_index.py.
     """
-    
-    def __init__(self, data_file: str = 'vk_array.npy'):
-        self.data_file = data_file
-        self.data = None
-        self.inverted_index = None
-        self.inverted_index_compressed = None
-
-    def load_data(self) -> np.ndarray:
-        data = np.load(self.data_file, allow_pickle=True)
-        self.data = np.repeat(data, 6) if len(data) < 40000 else data
-        return self.data
-
-    def create_inverted_index(self) -> Dict[str, List[int]]:
-        if self.data is None:
-            self.load_data()
-            
-        self.inverted_index = {}
-        for doc_id, record in enumerate(self.data):
-            words = record['text'].split()
-            for word in words:
-                if word not in self.inverted_index:
-                    self.inverted_index[word] = []
-                self.inverted_index[word].append(doc_id)
-        return self.inverted_index
 
-    @staticmethod
-    def elias_gamma_encode(number: int) -> str:
-        if number == 0:
-            return '0'
-        n = 1 + int(np.log2(number))
-        binary = bin(number)[2:]
-        return ('0' * (n - 1)) + binary
+    def __init__(self, data_file: str = 'vk_array.npy', dedupe: bool = False, dedupe_threshold: float = 0.8):
+        super().__init__(data_file, dedupe, dedupe_threshold)
+        self._reader = None
+        self._reader_source = None
 
-    @staticmethod
-    def elias_delta_encode(number: int) -> str:
-        if number == 0:
-            return '0'
-        binary = bin(number)[2:]
-        gamma = InvertedIndex.elias_gamma_encode(len(binary))
-        return gamma + binary[1:]
-
-    def compress_index(self) -> Dict[str, List[str]]:
+    def reader(self) -> IndexReader:
         if self.inverted_index is None:
             self.create_inverted_index()
-            
-        self.inverted_index_compressed = {
-            word: [self.elias_delta_encode(doc_id) for doc_id in doc_ids]
-            for word, doc_ids in self.inverted_index.items()
-        }
-        return self.inverted_index_compressed
+        # Индекс перестраивается при изменении inverted_index (например, после create_inverted_index)
+        if self._reader is None or self._reader_source is not self.inverted_index:
+            self._reader = IndexReader(self.to_bytes())
+            self._reader_source = self.inverted_index
+        return self._reader
 
     def calculate_sizes(self) -> Dict[str, float]:
-        if self.inverted_index is None:
-            self.create_inverted_index()
-        if self.inverted_index_compressed is None:
-            self.compress_index()
-            
-        # Размер несжатого индекса
-        uncompressed_size = sum(len(pickle.dumps(doc_ids)) for doc_ids in self.inverted_index.values())
-        
-        # Размер сжатого индекса (в битах -> байтах)
-        compressed_bits = sum(len(code) for codes in self.inverted_index_compressed.values() for code in codes)
-        compressed_size = compressed_bits / 8
-        
-        return {
-            'uncompressed_bytes': uncompressed_size,
-            'compressed_bytes': compressed_size
-        }
+        return self.reader().sizes()
 
     def search(self, query: str, compressed: bool = True) -> Dict[str, Union[List[int], float]]:
-        start_time = time.time()
-        
-        if compressed:
-            results = self.inverted_index_compressed.get(query, [])
-        else:
-            results = self.inverted_index.get(query, [])
-            
-        search_time = time.time() - start_time
-        
-        return {
-            'results': results,
-            'time_sec': search_time,
-            'count': len(results)
-        }
+        return self.reader().search(query, compressed=compressed)
 
     def evaluate(self, query: str) -> Dict[str, Union[float, int]]:
-        sizes = self.calculate_sizes()
-        uncompressed_search = self.search(query, compressed=False)
-        compressed_search = self.search(query, compressed=True)
-        
-        return {
-            'uncompressed_size_kb': sizes['uncompressed_bytes'] / 1024,
-            'compressed_size_kb': sizes['compressed_bytes'] / 1024,
-            'compression_ratio': sizes['compressed_bytes'] / sizes['uncompressed_bytes'],
-            'uncompressed_search_time': uncompressed_search['time_sec'],
-            'compressed_search_time': compressed_search['time_sec'],
-            'results_count': uncompressed_search['count']
-        }
+        return self.reader().evaluate(query)
 
 
 def main():
     parser = argparse.ArgumentParser(description='Инвертированный индекс со сжатием Элиаса-дельта')
     parser.add_argument('query', type=str, help='Поисковый запрос (например, "ректор")')
     parser.add_argument('--data', type=str, default='vk_array.npy', help='Путь к файлу данных (по умолчанию: vk_array.npy)')
+    parser.add_argument('--dedupe', action='store_true', help='Удалить дубликаты и почти-дубликаты текстов перед индексацией')
+    parser.add_argument('--dedupe-threshold', type=float, default=0.8, help='Порог сходства почти-дубликатов (MinHash)')
     args = parser.parse_args()
     
     # Инициализация и оценка
-    index = InvertedIndex(data_file=args.data)
+    index = InvertedIndex(data_file=args.data, dedupe=args.dedupe, dedupe_threshold=args.dedupe_threshold)
     metrics = index.evaluate(args.query)
     
     # Вывод результатов
@@ -0,0 +1,124 @@
+import hashlib
+import math
+import threading
+from datetime import datetime
+
+# Формат метки периода гистограммы для каждой гранулярности
+PERIOD_FORMATS = {
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+    'week': '%G-W%V',
+    'month': '%Y-%m',
+}
+
+
+class HyperLogLog:
+    """
+    Оценка количества уникальных значений в фиксированной памяти (2 ** precision байт).
+
+    Относительная ошибка около 1.04 / sqrt(2 ** precision): для precision=12 -
+    примерно 1.6% при 4 КБ памяти независимо от числа значений. Повторное
+    добавление значения оценку не меняет.
+    """
+
+    def __init__(self, precision=12):
+        """
+        :param precision: Количество бит хеша на номер регистра (4..16)
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError("precision должен быть от 4 до 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @staticmethod
+    def _hash(value):
+        digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def add(self, value):
+        hashed = self._hash(value)
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        # Позиция первой единицы в оставшихся битах (1 - старший бит)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """
+        Объединение с другой оценкой той же точности (как если бы значения добавлялись в одну)
+        """
+        if other.precision != self.precision:
+            raise ValueError("Нельзя объединить HyperLogLog разной точности")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self):
+        """
+        :return: Оценка количества уникальных значений
+        """
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # Поправка для малых множеств: линейный подсчет по пустым регистрам
+            estimate = size * math.log(size / zeros)
+        return int(round(estimate))
+
+
+class StatsAccumulator:
+    """
+    Статистика по публикациям одного университета, обновляемая по мере загрузки страниц.
+
+    Хранит количество публикаций, суммы реакций, HyperLogLog авторов и
+    гистограмму публикаций по периодам, поэтому память не зависит от числа
+    публикаций (гистограмма ограничена числом периодов в собираемом интервале).
+    Потокобезопасен: страницы могут приходить из разных рабочих потоков.
+    """
+
+    def __init__(self, granularity='day', precision=12):
+        """
+        :param granularity: Период гистограммы: 'hour', 'day', 'week' или 'month'
+        :param precision: Точность HyperLogLog для числа авторов
+        """
+        self.period_format = PERIOD_FORMATS[granularity]
+        self.posts_count = 0
+        self.sums = {'likes': 0, 'views': 0, 'reposts': 0, 'comments': 0}
+        self.authors = HyperLogLog(precision)
+        self.histogram = {}
+        self._lock = threading.Lock()
+
+    def add_posts(self, posts):
+        """
+        Учет очередной страницы публикаций (словари VK API)
+        """
+        with self._lock:
+            for post in posts:
+                self.posts_count += 1
+                for name in self.sums:
+                    value = post.get(name)
+                    if isinstance(value, dict):
+                        self.sums[name] += value.get('count', 0)
+                self.authors.add(post.get('from_id', post.get('owner_id')))
+                period = datetime.fromtimestamp(post.get('date', 0)).strftime(self.period_format)
+                self.histogram[period] = self.histogram.get(period, 0) + 1
+
+    def snapshot(self):
+        """
+        :return: Копия текущей статистики с ключами как в university_stats
+                 и гистограммой {метка периода: количество публикаций}
+        """
+        with self._lock:
+            return {
+                'posts_count': self.posts_count,
+                'authors_count': self.authors.count(),
+                'likes_count': self.sums['likes'],
+                'views_count': self.sums['views'],
+                'reposts_count': self.sums['reposts'],
+                'comments_count': self.sums['comments'],
+                'histogram': dict(sorted(self.histogram.items())),
+            }
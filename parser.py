@@ -1,5 +1,15 @@
+import argparse
 from bs4 import BeautifulSoup
+from codecs import getincrementaldecoder
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+import json
 import os
+import posixpath
+import shutil
+import xml.etree.ElementTree as ET
+import zipfile
 from langchain.document_loaders import Docx2txtLoader
 from PyPDF2 import PdfReader
 import re
@@ -7,17 +17,472 @@ import subprocess
 import tempfile
 from pdf2image import convert_from_path
 import pytesseract
+from urllib.parse import urlsplit, urlunsplit
+
+from profiling import count, profile, timer
+
+# Теги, содержимое которых не является видимым текстом страницы
+HTML_SKIP_TAGS = frozenset({'script', 'style', 'noscript', 'template', 'rt', 'rp'})
+
+HTML_READ_CHUNK_SIZE = 64 * 1024
+
+# Блочные теги, на границах которых заканчивается абзац при потоковой разбивке HTML
+HTML_BLOCK_TAGS = frozenset({
+    'p', 'div', 'br', 'li', 'ul', 'ol', 'dl', 'dt', 'dd', 'tr', 'table', 'blockquote', 'pre',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'article', 'header', 'footer', 'nav', 'aside', 'main',
+})
+
+CHUNK_MODES = ('window', 'paragraph')
+
+URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+
+# Знаки, которые в тексте прилипают к концу ссылки, но не входят в нее
+_LINK_TRAILING_CHARS = '.,;:!?)]}>»"\''
+
+DOCX_HYPERLINK_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink'
+
+# Переменная окружения с путем к djvutxt и путь установки DjVuLibre по умолчанию в Windows
+DJVUTXT_ENV = 'DJVUTXT'
+DJVULIBRE_WINDOWS_DIR = r"C:\Program Files (x86)\DjVuLibre"
+
+DJVU_NOT_FOUND_MESSAGE = (
+    "Утилита djvutxt не найдена. Установите DjVuLibre:\n"
+    "Linux: sudo apt-get install djvulibre-bin\n"
+    "MacOS: brew install djvulibre\n"
+    "Windows: скачайте с https://djvu.sourceforge.net/\n"
+    f"Либо укажите путь к djvutxt в переменной окружения {DJVUTXT_ENV}"
+)
+
+
+def find_djvu_tool(name: str, djvutxt_path: str | None = None) -> str | None:
+    """
+    Ищет исполняемый файл DjVuLibre (djvutxt, djvused).
+
+    Порядок поиска: каталог явно указанного djvutxt (параметр или переменная
+    окружения DJVUTXT), затем PATH, затем стандартный каталог установки в Windows.
+
+    Возвращает:
+        str | None: Путь к исполняемому файлу или None, если он не найден
+    """
+    djvutxt_path = djvutxt_path or os.environ.get(DJVUTXT_ENV)
+    if djvutxt_path:
+        if name == 'djvutxt':
+            return djvutxt_path
+        found = shutil.which(name, path=os.path.dirname(djvutxt_path))
+        if found:
+            return found
+
+    found = shutil.which(name)
+    if found:
+        return found
+
+    windows_path = os.path.join(DJVULIBRE_WINDOWS_DIR, f"{name}.exe")
+    if os.path.isfile(windows_path):
+        return windows_path
+    return None
+
+
+# MIME-типы поддерживаемых форматов
+MIME_HTML = 'text/html'
+MIME_TXT = 'text/plain'
+MIME_PDF = 'application/pdf'
+MIME_DOCX = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+MIME_DJVU = 'image/vnd.djvu'
+MIME_RTF = 'application/rtf'
+MIME_ODT = 'application/vnd.oasis.opendocument.text'
+MIME_EPUB = 'application/epub+zip'
+
+# Сколько байт с начала файла читается для определения формата
+SNIFF_SIZE = 4096
+
+# Расширение -> MIME-тип; используется, только если сигнатура не распознана
+EXTENSION_MIME = {
+    '.html': MIME_HTML,
+    '.htm': MIME_HTML,
+    '.txt': MIME_TXT,
+    '.pdf': MIME_PDF,
+    '.docx': MIME_DOCX,
+    '.djvu': MIME_DJVU,
+    '.rtf': MIME_RTF,
+    '.odt': MIME_ODT,
+    '.epub': MIME_EPUB,
+}
+
+# Расширения, при которых нераспознанный файл в UTF-8 считается простым текстом;
+# исходный код, разметка и журналы (.py, .md, .json, .log) не индексируются
+TEXT_FALLBACK_EXTENSIONS = ('', '.txt')
+
+_HTML_MARKERS = ('<!doctype html', '<html', '<head', '<body')
+
+
+def normalize_link(link: str) -> str | None:
+    """
+    Приводит ссылку к каноническому виду: убирает хвостовую пунктуацию и якорь,
+    добавляет схему к www-ссылкам, переводит схему и домен в нижний регистр.
+
+    Возвращает:
+        str | None: Нормализованная ссылка или None для относительных и не-HTTP ссылок
+    """
+    link = link.strip().rstrip(_LINK_TRAILING_CHARS)
+    if link.lower().startswith('www.'):
+        link = 'http://' + link
+    try:
+        parts = urlsplit(link)
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ('http', 'https') or not parts.netloc:
+        return None
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, ''))
+
+
+def normalize_links(links: list[str]) -> list[str]:
+    """Нормализует ссылки и удаляет дубликаты с сохранением порядка."""
+    unique = {}
+    for link in links:
+        normalized = normalize_link(link)
+        if normalized:
+            unique.setdefault(normalized, None)
+    return list(unique)
+
+
+def _sniff_zip_mime(file_path: str) -> str | None:
+    # ZipFile читает только центральный каталог в конце архива, а не весь файл
+    with zipfile.ZipFile(file_path) as archive:
+        names = set(archive.namelist())
+        if 'mimetype' in names:
+            return archive.read('mimetype').decode('ascii', errors='ignore').strip()
+        if 'word/document.xml' in names:
+            return MIME_DOCX
+    return None
+
+
+def detect_mime(file_path: str) -> str | None:
+    """
+    Определяет MIME-тип файла по сигнатуре (magic bytes).
+
+    Читается не более SNIFF_SIZE байт с начала файла; для ZIP-контейнеров
+    (DOCX, ODT, EPUB) дополнительно читается только оглавление архива.
+    Если сигнатура не распознана, тип определяется по расширению; файл в
+    UTF-8 без расширения или с расширением .txt считается простым текстом.
+
+    Аргументы:
+        file_path (str): Путь к файлу
+
+    Возвращает:
+        str | None: MIME-тип или None, если формат не удалось определить
+    """
+    with open(file_path, 'rb') as file:
+        head = file.read(SNIFF_SIZE)
+    extension = os.path.splitext(file_path)[1].lower()
+    extension_mime = EXTENSION_MIME.get(extension)
+
+    if head.startswith(b'AT&TFORM') and head[12:16] in (b'DJVU', b'DJVM', b'DJVI'):
+        return MIME_DJVU
+    if b'%PDF-' in head[:1024]:
+        return MIME_PDF
+    if head.startswith(b'{\\rtf'):
+        return MIME_RTF
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            return _sniff_zip_mime(file_path) or extension_mime
+        except zipfile.BadZipFile:
+            return extension_mime
+
+    try:
+        # Последний многобайтовый символ мог обрезаться на границе SNIFF_SIZE
+        sample = getincrementaldecoder('utf-8')().decode(head.removeprefix(b'\xef\xbb\xbf'))
+    except UnicodeDecodeError:
+        return extension_mime
+
+    sample = sample.lower()
+    if any(marker in sample for marker in _HTML_MARKERS):
+        return MIME_HTML
+    if extension in TEXT_FALLBACK_EXTENSIONS and b'\x00' not in head:
+        return MIME_TXT
+    return extension_mime
+
+
+def _rtf_to_text(content: str) -> str:
+    """Упрощенное извлечение текста из RTF: отбрасывает управляющие слова и служебные группы."""
+    ignorable = {
+        'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'object', 'header', 'footer',
+        'headerl', 'headerr', 'footerl', 'footerr', 'listtable', 'listoverridetable', 'themedata',
+        'colorschememapping', 'datastore', 'latentstyles', 'xmlnstbl', 'rsidtbl', 'generator',
+    }
+    specials = {'par': '\n', 'line': '\n', 'sect': '\n', 'page': '\n', 'tab': ' ', 'cell': ' ', 'row': '\n'}
+    token_pattern = re.compile(r"\\([a-z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-f]{2})|\\([^a-z])|([{}])|[\r\n]+|(.)", re.I)
+
+    stack = []
+    ignore = False
+    skip = 0
+    uc_skip = 1
+    encoding = 'cp1251'
+    out = []
+    for match in token_pattern.finditer(content):
+        word, arg, hex_code, char, brace, text = match.groups()
+        if brace:
+            skip = 0
+            if brace == '{':
+                stack.append((uc_skip, ignore))
+            elif stack:
+                uc_skip, ignore = stack.pop()
+        elif char:
+            skip = 0
+            if char == '*':
+                ignore = True
+            elif char in '\\{}' and not ignore:
+                out.append(char)
+            elif char == '~' and not ignore:
+                out.append(' ')
+        elif word:
+            skip = 0
+            if word in ignorable:
+                ignore = True
+            elif word == 'ansicpg' and arg:
+                encoding = f'cp{arg}'
+            elif word == 'uc' and arg:
+                uc_skip = int(arg)
+            elif ignore:
+                pass
+            elif word in specials:
+                out.append(specials[word])
+            elif word == 'u' and arg:
+                code = int(arg)
+                out.append(chr(code + 0x10000 if code < 0 else code))
+                skip = uc_skip
+        elif hex_code:
+            if skip > 0:
+                skip -= 1
+            elif not ignore:
+                out.append(bytes.fromhex(hex_code).decode(encoding, errors='replace'))
+        elif text:
+            if skip > 0:
+                skip -= 1
+            elif not ignore:
+                out.append(text)
+    return "".join(out)
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """
+    Потоковый извлекатель текста из HTML на базе стандартного HTMLParser.
+    Пропускает поддеревья из HTML_SKIP_TAGS и за тот же проход собирает ссылки:
+    значения href у тегов <a> и URL, встречающиеся в видимом тексте.
+
+    HTMLParser отдает текст на границе каждого блока feed() отдельным вызовом
+    handle_data, поэтому куски копятся в _pending и склеиваются без пробела до
+    следующего тега или комментария: так слово или URL на границе блока не
+    разрывается, а текстовые узлы разделяются пробелом, как в BeautifulSoup.
+    """
+
+    def __init__(self, split_paragraphs: bool = False) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.links: list[str] = []
+        # При split_paragraphs=True текст на границах блочных тегов переносится из parts сюда
+        self.paragraphs: list[str] = []
+        self.split_paragraphs = split_paragraphs
+        self._skip_stack: list[str] = []
+        # Куски текущего текстового узла, пришедшие из разных блоков feed()
+        self._pending: list[str] = []
+
+    def _flush_data(self) -> None:
+        if self._pending:
+            data = "".join(self._pending)
+            self._pending.clear()
+            self.parts.append(data)
+            self.links.extend(URL_PATTERN.findall(data))
+
+    def _flush_paragraph(self) -> None:
+        paragraph = self.get_text()
+        if paragraph:
+            self.paragraphs.append(paragraph)
+        self.parts.clear()
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._flush_data()
+        if self.split_paragraphs and tag in HTML_BLOCK_TAGS:
+            self._flush_paragraph()
+        if tag in HTML_SKIP_TAGS:
+            self._skip_stack.append(tag)
+        elif tag == 'a' and not self._skip_stack:
+            for name, value in attrs:
+                if name == 'href' and value:
+                    self.links.append(value.strip())
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        # Самозакрывающийся тег не открывает поддерево
+        if tag not in HTML_SKIP_TAGS:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush_data()
+        if self.split_paragraphs and tag in HTML_BLOCK_TAGS:
+            self._flush_paragraph()
+        if tag in self._skip_stack:
+            # Закрываем в том числе незакрытые вложенные теги (<rt> без </rt> и т.п.)
+            while self._skip_stack.pop() != tag:
+                pass
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip_stack:
+            self._pending.append(data)
+
+    def handle_comment(self, data: str) -> None:
+        # Комментарий в текст не попадает, но разделяет текстовые узлы
+        self._flush_data()
+
+    def handle_decl(self, decl: str) -> None:
+        self._flush_data()
+
+    def handle_pi(self, data: str) -> None:
+        self._flush_data()
+
+    def get_text(self) -> str:
+        self._flush_data()
+        return " ".join(" ".join(self.parts).split())
+
+    def close(self) -> None:
+        super().close()
+        if self.split_paragraphs:
+            self._flush_paragraph()
+
+
+def _window_chunks(pieces: Iterator[str], size: int, overlap: int) -> Iterator[str]:
+    """
+    Режет поток нормализованных фрагментов на окна длиной не более size символов
+    с перекрытием около overlap символов. Границы окон по возможности совпадают
+    с границами слов; в памяти хранится не больше одного окна и одного фрагмента.
+    """
+    buffer = ''
+    only_overlap = True
+    for piece in pieces:
+        if not piece:
+            continue
+        buffer = f'{buffer} {piece}' if buffer else piece
+        only_overlap = False
+        while len(buffer) > size:
+            cut = buffer.rfind(' ', 0, size + 1)
+            if cut <= 0:
+                cut = size
+            yield buffer[:cut].rstrip()
+
+            start = cut - overlap if overlap else cut
+            if start <= 0:
+                start = cut
+            elif buffer[start - 1] != ' ':
+                # Перекрытие начинаем с целого слова
+                next_space = buffer.find(' ', start, cut)
+                start = next_space + 1 if next_space != -1 else cut
+            # Если после окна ничего не осталось, в буфере только уже отданное перекрытие
+            only_overlap = not buffer[cut:].strip()
+            buffer = buffer[start:].lstrip()
+    if buffer and not only_overlap:
+        yield buffer
+
+
+def _paragraph_chunks(paragraphs: Iterator[str], size: int) -> Iterator[str]:
+    """
+    Склеивает абзацы в фрагменты длиной не более size символов.
+    Абзацы длиннее size режутся на окна без перекрытия.
+    """
+    buffer = ''
+    for paragraph in paragraphs:
+        if not paragraph:
+            continue
+        if len(paragraph) > size:
+            if buffer:
+                yield buffer
+                buffer = ''
+            yield from _window_chunks(iter([paragraph]), size, 0)
+        elif not buffer:
+            buffer = paragraph
+        elif len(buffer) + 1 + len(paragraph) <= size:
+            buffer = f'{buffer} {paragraph}'
+        else:
+            yield buffer
+            buffer = paragraph
+    if buffer:
+        yield buffer
+
 
 class Parser:
-    def __init__(self, path: str = 'docs') -> None:
+    # MIME-тип -> функция извлечения текста; дополняется через register_extractor
+    extractors: dict[str, Callable[['Parser', str], str]] = {}
+    # MIME-тип -> функция, возвращающая текст и ссылки из разметки за один проход
+    link_extractors: dict[str, Callable[['Parser', str], tuple[str, list[str]]]] = {}
+    # MIME-тип -> генератор нормализованных абзацев/страниц для iter_chunks
+    stream_extractors: dict[str, Callable[['Parser', str], Iterator[str]]] = {}
+    # Увеличивается при каждой регистрации: кэш MIME-типов зависит от EXTENSION_MIME
+    _registry_version = 0
+
+    def __init__(
+        self,
+        path: str = 'docs',
+        djvutxt_path: str | None = None,
+        djvu_timeout: float = 120.0,
+        max_workers: int | None = None,
+    ) -> None:
         self.path = path
+        self.djvutxt_path = djvutxt_path
+        self.djvu_timeout = djvu_timeout
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Путь -> (mtime_ns, размер, версия реестра, MIME-тип): detect_mime читает начало файла
+        self._mime_cache: dict[str, tuple[int, int, int, str | None]] = {}
+
+    def mime_type(self, file_path: str) -> str | None:
+        """
+        MIME-тип файла (см. detect_mime); результат кэшируется по пути и
+        определяется заново, если у файла изменились время изменения или размер
+        или после вызова register_extractor.
+        """
+        stat = os.stat(file_path)
+        key = (stat.st_mtime_ns, stat.st_size, self._registry_version)
+        cached = self._mime_cache.get(file_path)
+        if cached is not None and cached[:3] == key:
+            return cached[3]
+        mime_type = detect_mime(file_path)
+        self._mime_cache[file_path] = (*key, mime_type)
+        return mime_type
+
+    def extract_html(self, file_path: str) -> tuple[str, list[str]]:
+        """
+        Быстрое потоковое извлечение текста и ссылок из HTML.
+
+        Файл читается блоками по HTML_READ_CHUNK_SIZE символов, дерево документа
+        не строится. Содержимое script/style/noscript в текст не попадает.
+
+        Аргументы:
+            file_path (str): Путь к HTML-файлу
+
+        Возвращает:
+            tuple[str, list[str]]: Нормализованный текст и найденные ссылки
+                (href тегов <a> и URL из текста, без нормализации)
+        """
+        try:
+            extractor = _HTMLTextExtractor()
+            with open(file_path, 'r', encoding='utf-8') as file:
+                while chunk := file.read(HTML_READ_CHUNK_SIZE):
+                    extractor.feed(chunk)
+            extractor.close()
+
+            return extractor.get_text(), extractor.links
+        except UnicodeDecodeError as e:
+            raise RuntimeError(f"Ошибка кодировки файла: {e}")
+        except Exception as e:
+            raise RuntimeError(f"Ошибка при обработке HTML: {e}")
+
+    def extract_text_from_html(self, file_path: str, fast: bool = True) -> str:
+        if fast:
+            return self.extract_html(file_path)[0]
 
-    def extract_text_from_html(self, file_path: str) -> str:
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
                 content = file.read()
             
             soup = BeautifulSoup(content, 'html.parser')
+            for tag in soup(list(HTML_SKIP_TAGS)):
+                tag.decompose()
             
             text = soup.get_text(separator=' ')
             text = " ".join(text.split())
@@ -63,60 +528,370 @@ class Parser:
         except Exception as e:
             raise RuntimeError(f"Ошибка при обработке DOCX: {e}")
 
-    def extract_text_from_djvu(self, file_path: str) -> str:
+    def extract_docx_with_links(self, file_path: str) -> tuple[str, list[str]]:
+        """
+        Извлекает текст DOCX и ссылки: внешние гиперссылки из связей документа
+        (word/_rels/document.xml.rels) и URL, встречающиеся в тексте.
+        """
+        text = self.extract_text_from_docx(file_path)
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                rels = ET.fromstring(archive.read('word/_rels/document.xml.rels'))
+        except KeyError:
+            rels = None
+        except Exception as e:
+            raise RuntimeError(f"Ошибка при обработке DOCX: {e}")
+
+        links = []
+        if rels is not None:
+            links = [
+                relationship.get('Target')
+                for relationship in rels
+                if relationship.get('Type') == DOCX_HYPERLINK_TYPE and relationship.get('Target')
+            ]
+        links.extend(URL_PATTERN.findall(text))
+        return text, links
+
+    def _run_djvu_tool(self, args: list[str]) -> str:
+        try:
+            result = subprocess.run(
+                args,
+                capture_output=True,
+                text=True,
+                check=True,
+                timeout=self.djvu_timeout
+            )
+            return result.stdout
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Ошибка извлечения текста: {e.stderr}") from e
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(
+                f"Превышено время ожидания {self.djvu_timeout} с для {os.path.basename(args[0])}"
+            ) from None
+        except FileNotFoundError:
+            raise RuntimeError(DJVU_NOT_FOUND_MESSAGE) from None
+        except PermissionError:
+            raise PermissionError(f"Нет прав на выполнение {args[0]}")
+
+    def extract_text_from_djvu(self, file_path: str, page: int | None = None) -> str:
         """
         Извлекает текст из файла DjVu с помощью утилиты djvutxt.
 
         Аргументы:
             file_path (str): Путь к файлу DjVu
+            page (int | None): Номер страницы (с 1); None - весь документ
 
         Возвращает:
             str: Извлеченный текст
 
         Исключения:
             FileNotFoundError: Если файл не существует
-            RuntimeError: При ошибках извлечения текста
+            RuntimeError: При ошибках извлечения текста, отсутствии djvutxt или превышении таймаута
         """
         if not os.path.isfile(file_path):
             raise FileNotFoundError(f"Файл {file_path} не существует")
 
+        djvutxt = find_djvu_tool('djvutxt', self.djvutxt_path)
+        if djvutxt is None:
+            raise RuntimeError(DJVU_NOT_FOUND_MESSAGE)
+
+        args = [djvutxt]
+        if page is not None:
+            args.append(f"--page={page}")
+        args.append(file_path)
+        return self._run_djvu_tool(args).strip()
+
+    def count_djvu_pages(self, file_path: str) -> int | None:
+        """
+        Возвращает количество страниц DjVu через `djvused -e n`
+        или None, если djvused недоступен.
+        """
+        djvused = find_djvu_tool('djvused', self.djvutxt_path)
+        if djvused is None:
+            return None
+        return int(self._run_djvu_tool([djvused, '-e', 'n', file_path]).strip())
+
+    def extract_djvu_batch(self, file_paths: list[str]) -> dict[str, str]:
+        """
+        Извлекает текст из нескольких файлов DjVu постранично в ограниченном пуле.
+
+        Одновременно запускается не более max_workers процессов djvutxt, поэтому
+        большие книги распределяются по всем ядрам без лавины процессов.
+        Если djvused недоступен, каждый файл обрабатывается целиком.
+
+        Возвращает:
+            dict[str, str]: Путь к файлу -> извлеченный текст
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            page_counts = dict(zip(file_paths, executor.map(self.count_djvu_pages, file_paths)))
+
+            jobs = {}
+            for file_path, pages in page_counts.items():
+                page_numbers = range(1, pages + 1) if pages else [None]
+                jobs[file_path] = [
+                    executor.submit(self.extract_text_from_djvu, file_path, page)
+                    for page in page_numbers
+                ]
+
+            return {
+                file_path: " ".join(" ".join(future.result() for future in futures).split())
+                for file_path, futures in jobs.items()
+            }
+    
+    def extract_text_from_txt(self, file_path: str) -> str:
         try:
-            result = subprocess.run(
-                ["C:\Program Files (x86)\DjVuLibre\djvutxt.exe", file_path],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Ошибка извлечения текста: {e.stderr}") from e
+            with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as file:
+                return " ".join(word for line in file for word in line.split())
         except FileNotFoundError:
-            raise RuntimeError(
-                "Утилита djvutxt не найдена. Установите DjVuLibre:\n"
-                "Linux: sudo apt-get install djvulibre-bin\n"
-                "MacOS: brew install djvulibre\n"
-                "Windows: скачайте с https://djvu.sourceforge.net/"
-            ) from None
+            raise FileNotFoundError(f"Текстовый файл не найден: {file_path}")
         except PermissionError:
-            raise PermissionError(f"Нет прав на выполнение djvutxt")
-    
+            raise PermissionError(f"Нет доступа к файлу: {file_path}")
+
+    def extract_text_from_rtf(self, file_path: str) -> str:
+        try:
+            with open(file_path, 'r', encoding='latin-1') as file:
+                text = _rtf_to_text(file.read())
+            return " ".join(text.split())
+        except FileNotFoundError:
+            raise FileNotFoundError(f"RTF файл не найден: {file_path}")
+        except PermissionError:
+            raise PermissionError(f"Нет доступа к файлу: {file_path}")
+        except Exception as e:
+            raise RuntimeError(f"Ошибка при обработке RTF: {e}")
+
+    def extract_text_from_odt(self, file_path: str) -> str:
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                root = ET.fromstring(archive.read('content.xml'))
+
+            text_ns = '{urn:oasis:names:tc:opendocument:xmlns:text:1.0}'
+            paragraphs = [
+                "".join(element.itertext())
+                for element in root.iter()
+                if element.tag in (f'{text_ns}p', f'{text_ns}h')
+            ]
+            return " ".join(" ".join(paragraphs).split())
+        except FileNotFoundError:
+            raise FileNotFoundError(f"ODT файл не найден: {file_path}")
+        except PermissionError:
+            raise PermissionError(f"Нет доступа к файлу: {file_path}")
+        except Exception as e:
+            raise RuntimeError(f"Ошибка при обработке ODT: {e}")
+
+    def extract_text_from_epub(self, file_path: str) -> str:
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                container = ET.fromstring(archive.read('META-INF/container.xml'))
+                rootfile = container.find('.//{urn:oasis:names:tc:opendocument:xmlns:container}rootfile')
+                opf_path = rootfile.get('full-path')
+                opf = ET.fromstring(archive.read(opf_path))
+
+                opf_ns = '{http://www.idpf.org/2007/opf}'
+                manifest = {
+                    item.get('id'): item.get('href')
+                    for item in opf.iter(f'{opf_ns}item')
+                }
+                opf_dir = posixpath.dirname(opf_path)
+                chapters = [
+                    posixpath.join(opf_dir, manifest[itemref.get('idref')])
+                    for itemref in opf.iter(f'{opf_ns}itemref')
+                    if itemref.get('idref') in manifest
+                ]
+
+                texts = []
+                for chapter in chapters:
+                    extractor = _HTMLTextExtractor()
+                    extractor.feed(archive.read(chapter).decode('utf-8', errors='replace'))
+                    extractor.close()
+                    texts.append(extractor.get_text())
+            return " ".join(texts)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"EPUB файл не найден: {file_path}")
+        except PermissionError:
+            raise PermissionError(f"Нет доступа к файлу: {file_path}")
+        except Exception as e:
+            raise RuntimeError(f"Ошибка при обработке EPUB: {e}")
+
+    @classmethod
+    def register_extractor(
+        cls,
+        mime_type: str,
+        extractor: Callable[['Parser', str], str],
+        extensions: tuple[str, ...] = (),
+        link_extractor: Callable[['Parser', str], tuple[str, list[str]]] | None = None,
+        stream_extractor: Callable[['Parser', str], Iterator[str]] | None = None,
+    ) -> None:
+        """
+        Регистрирует извлекатель текста для MIME-типа.
+
+        Аргументы:
+            mime_type (str): MIME-тип, который возвращает detect_mime
+            extractor (Callable[[Parser, str], str]): Функция (parser, file_path) -> текст
+            extensions (tuple[str, ...]): Расширения, по которым тип определяется,
+                если сигнатура файла не распознана
+            link_extractor (Callable | None): Функция (parser, file_path) -> (текст, ссылки),
+                извлекающая ссылки из разметки за тот же проход; без нее ссылки
+                ищутся в тексте регулярным выражением
+            stream_extractor (Callable | None): Генератор (parser, file_path) -> абзацы/страницы
+                для потоковой разбивки в iter_chunks
+        """
+        cls.extractors[mime_type] = extractor
+        if link_extractor is not None:
+            cls.link_extractors[mime_type] = link_extractor
+        else:
+            cls.link_extractors.pop(mime_type, None)
+        if stream_extractor is not None:
+            cls.stream_extractors[mime_type] = stream_extractor
+        else:
+            cls.stream_extractors.pop(mime_type, None)
+        for extension in extensions:
+            EXTENSION_MIME[extension.lower()] = mime_type
+        cls._registry_version += 1
+
+    def get_extractor(self, file_path: str) -> Callable[['Parser', str], str] | None:
+        return self.extractors.get(self.mime_type(file_path))
+
     def parse_document(self, file_path: str, inner_text: bool = False) -> str:
         if not inner_text:
             file_path = os.path.join(self.path, file_path)
         try:
-            _, extension = os.path.splitext(file_path)
-            extension = extension.lower()
-
-            if extension == '.html':
-                return self.extract_text_from_html(file_path)
-            elif extension == '.pdf':
-                return self.extract_text_from_pdf(file_path)
-            elif extension == '.docx':
-                return self.extract_text_from_docx(file_path)
-            elif extension == '.djvu':
-                return self.extract_text_from_djvu(file_path)
-            else:
-                raise ValueError(f"Неподдерживаемый формат файла: {extension}")
+            mime_type = self.mime_type(file_path)
+            extractor = self.extractors.get(mime_type)
+            if extractor is None:
+                raise ValueError(f"Неподдерживаемый формат файла: {mime_type or os.path.splitext(file_path)[1]}")
+            with timer(f'parser.{mime_type}'):
+                text = extractor(self, file_path)
+            count('parser.documents')
+            count('parser.chars', len(text))
+            return text
+        except (FileNotFoundError, PermissionError) as e:
+            raise e
+        except Exception as e:
+            raise RuntimeError(f"Непредвиденная ошибка при обработке {file_path}: {e}")
+
+    def iter_html_paragraphs(self, file_path: str) -> Iterator[str]:
+        try:
+            extractor = _HTMLTextExtractor(split_paragraphs=True)
+            with open(file_path, 'r', encoding='utf-8') as file:
+                while chunk := file.read(HTML_READ_CHUNK_SIZE):
+                    extractor.feed(chunk)
+                    yield from extractor.paragraphs
+                    extractor.paragraphs.clear()
+            extractor.close()
+            yield from extractor.paragraphs
+        except UnicodeDecodeError as e:
+            raise RuntimeError(f"Ошибка кодировки файла: {e}")
+
+    def iter_txt_paragraphs(self, file_path: str) -> Iterator[str]:
+        paragraph = []
+        with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as file:
+            for line in file:
+                words = line.split()
+                if words:
+                    paragraph.extend(words)
+                elif paragraph:
+                    yield " ".join(paragraph)
+                    paragraph = []
+        if paragraph:
+            yield " ".join(paragraph)
+
+    def iter_pdf_pages(self, file_path: str) -> Iterator[str]:
+        try:
+            reader = PdfReader(file_path)
+            for page in reader.pages:
+                yield " ".join(page.extract_text().split())
+        except FileNotFoundError:
+            raise FileNotFoundError(f"PDF файл не найден: {file_path}")
+        except PermissionError:
+            raise PermissionError(f"Нет доступа к файлу: {file_path}")
+
+    def iter_djvu_pages(self, file_path: str) -> Iterator[str]:
+        pages = self.count_djvu_pages(file_path)
+        if not pages:
+            yield " ".join(self.extract_text_from_djvu(file_path).split())
+            return
+        for page in range(1, pages + 1):
+            yield " ".join(self.extract_text_from_djvu(file_path, page=page).split())
+
+    def iter_text(self, file_path: str) -> Iterator[str]:
+        """
+        Отдает нормализованный текст документа по частям (абзацам или страницам).
+
+        Для форматов без потокового извлекателя весь текст отдается одной частью.
+        """
+        mime_type = self.mime_type(file_path)
+        stream_extractor = self.stream_extractors.get(mime_type)
+        if stream_extractor is not None:
+            yield from stream_extractor(self, file_path)
+            return
+
+        extractor = self.extractors.get(mime_type)
+        if extractor is None:
+            raise ValueError(f"Неподдерживаемый формат файла: {mime_type or os.path.splitext(file_path)[1]}")
+        yield extractor(self, file_path)
+
+    def iter_chunks(
+        self,
+        filename: str,
+        size: int = 2000,
+        overlap: int = 200,
+        mode: str = 'window',
+        inner_text: bool = False,
+    ) -> Iterator[str]:
+        """
+        Отдает текст документа фрагментами ограниченного размера.
+
+        Документ не собирается в одну строку целиком, поэтому расход памяти
+        ограничен размером фрагмента и одной страницы/абзаца исходного файла.
+
+        Аргументы:
+            filename (str): Имя файла в папке self.path (или путь при inner_text=True)
+            size (int): Максимальная длина фрагмента в символах
+            overlap (int): Перекрытие соседних окон в символах (только для mode='window')
+            mode (str): 'window' - окна фиксированного размера с перекрытием,
+                'paragraph' - абзацы, склеенные до длины size
+
+        Возвращает:
+            Iterator[str]: Нормализованные фрагменты текста
+        """
+        if mode not in CHUNK_MODES:
+            raise ValueError(f"Неизвестный режим разбиения: {mode}")
+        if size <= 0 or (mode == 'window' and not 0 <= overlap < size):
+            raise ValueError("Должно выполняться size > 0 и 0 <= overlap < size")
+
+        file_path = filename if inner_text else os.path.join(self.path, filename)
+        pieces = self.iter_text(file_path)
+        if mode == 'paragraph':
+            return _paragraph_chunks(pieces, size)
+        return _window_chunks(pieces, size, overlap)
+
+    def parse_document_with_links(self, file_path: str, inner_text: bool = False) -> tuple[str, list[str]]:
+        """
+        Извлекает текст документа и нормализованные уникальные ссылки за один проход.
+
+        Возвращает:
+            tuple[str, list[str]]: Текст документа и список ссылок
+        """
+        if not inner_text:
+            file_path = os.path.join(self.path, file_path)
+        try:
+            mime_type = self.mime_type(file_path)
+            link_extractor = self.link_extractors.get(mime_type)
+            with timer(f'parser.{mime_type}'):
+                if link_extractor is not None:
+                    text, links = link_extractor(self, file_path)
+                else:
+                    extractor = self.extractors.get(mime_type)
+                    if extractor is None:
+                        raise ValueError(f"Неподдерживаемый формат файла: {mime_type or os.path.splitext(file_path)[1]}")
+                    text = extractor(self, file_path)
+                    links = URL_PATTERN.findall(text)
+            with timer('parser.links'):
+                links = normalize_links(links)
+            count('parser.documents')
+            count('parser.chars', len(text))
+            count('parser.links', len(links))
+            return text, links
         except (FileNotFoundError, PermissionError) as e:
             raise e
         except Exception as e:
@@ -124,11 +899,27 @@ class Parser:
 
     def find_links(self, text: str) -> list[str]:
         try:
-            url_pattern = re.compile(r'https?://\S+|www\.\S+')
-            links = url_pattern.findall(text)
+            links = URL_PATTERN.findall(text)
             return links
         except Exception as e:
             raise RuntimeError(f"Ошибка при поиске ссылок: {e}")
+
+    def build_link_graph(self, documents: dict[str, tuple[str, list[str]]] | None = None) -> dict[str, list[str]]:
+        """
+        Строит граф ссылок: имя документа -> список URL, на которые он ссылается.
+
+        Аргументы:
+            documents: Результат process_documents(); если не передан, документы обрабатываются заново
+        """
+        if documents is None:
+            documents = self.process_documents()
+        return {filename: links for filename, (_, links) in documents.items()}
+
+    def save_link_graph(self, output_file: str = 'link_graph.json') -> dict[str, list[str]]:
+        link_graph = self.build_link_graph()
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(link_graph, f, ensure_ascii=False, indent=2)
+        return link_graph
     
     def process_documents(self) -> dict[str, tuple[str, list[str]]]:
         documents_text = {}
@@ -137,12 +928,16 @@ class Parser:
         for filename in os.listdir(folder_path):
             file_path = os.path.join(folder_path, filename)
 
-            if filename.lower().endswith(('.html', '.pdf', '.docx', '.djvu')):
+            try:
+                # Определение формата читает начало файла: ошибка доступа - ошибка этого файла
+                supported = os.path.isfile(file_path) and self.get_extractor(file_path) is not None
+            except OSError as e:
+                print(f"Ошибка при обработке файла {filename}: {e}")
+                continue
+            if supported:
                 try:
                     # print(f"Обработка файла: {filename}")
-                    text = self.parse_document(file_path, inner_text=True)
-                    links = self.find_links(text)
-                    documents_text[filename] = (text, links)
+                    documents_text[filename] = self.parse_document_with_links(file_path, inner_text=True)
                 except Exception as e:
                     print(f"Ошибка при обработке файла {filename}: {e}")
             else:
@@ -150,7 +945,24 @@ class Parser:
 
         return documents_text
 
+Parser.register_extractor(MIME_HTML, Parser.extract_text_from_html, link_extractor=Parser.extract_html,
+                          stream_extractor=Parser.iter_html_paragraphs)
+Parser.register_extractor(MIME_TXT, Parser.extract_text_from_txt, stream_extractor=Parser.iter_txt_paragraphs)
+Parser.register_extractor(MIME_PDF, Parser.extract_text_from_pdf, stream_extractor=Parser.iter_pdf_pages)
+Parser.register_extractor(MIME_DOCX, Parser.extract_text_from_docx, link_extractor=Parser.extract_docx_with_links)
+Parser.register_extractor(MIME_DJVU, Parser.extract_text_from_djvu, stream_extractor=Parser.iter_djvu_pages)
+Parser.register_extractor(MIME_RTF, Parser.extract_text_from_rtf)
+Parser.register_extractor(MIME_ODT, Parser.extract_text_from_odt)
+Parser.register_extractor(MIME_EPUB, Parser.extract_text_from_epub)
+
+
 if __name__ == '__main__':
-    parser = Parser()
-    data = parser.process_documents()
+    arguments = argparse.ArgumentParser(description='Извлечение текста и ссылок из документов папки')
+    arguments.add_argument('--path', type=str, default='docs', help='Папка с документами')
+    arguments.add_argument('--profile', nargs='?', const='profile', default=None, metavar='PREFIX',
+                           help='Сохранить профиль cProfile (PREFIX.pstats) и метрики (PREFIX.json)')
+    args = arguments.parse_args()
+
+    with profile(args.profile):
+        data = Parser(args.path).process_documents()
     print(data)
@@ -0,0 +1,499 @@
+import argparse
+import configparser
+import glob
+import heapq
+import os
+import pickle
+import queue
+import threading
+import time
+from datetime import datetime
+from itertools import groupby
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from dedup import Deduplicator
+from index import write_index
+from index.documents import counter_value, date_order, document_columns
+from index.tokens import DEFAULT_TOKENIZER, TOKENIZERS, get_tokenizer
+
+# Признак конца потока в очереди между стадиями
+_END = object()
+# Поля документа в сегментах и в таблице documents итогового индекса
+DOCUMENT_FIELDS = ('university', 'owner_id', 'post_id', 'date', 'likes', 'views')
+DATE_FIELD = DOCUMENT_FIELDS.index('date')
+
+
+class StageStats:
+    """
+    Счетчики стадии конвейера: сколько записей обработано, сколько времени
+    стадия работала и сколько ждала входных данных или места в выходной очереди.
+    Стадия с наибольшим временем работы и наименьшим ожиданием - узкое место.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_sec = 0.0
+        self.wait_input_sec = 0.0
+        self.wait_output_sec = 0.0
+
+    def throughput(self) -> float:
+        """Записей в секунду работы стадии (без учета ожидания)."""
+        return self.items_in / self.busy_sec if self.busy_sec else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'stage': self.name,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'busy_sec': self.busy_sec,
+            'wait_input_sec': self.wait_input_sec,
+            'wait_output_sec': self.wait_output_sec,
+            'items_per_sec': self.throughput(),
+        }
+
+
+class NormalizeStage:
+    """
+    Приведение публикаций VK к записям документа с терминами текста
+    (способ разбиения - см. index.tokens.TOKENIZERS, как в create_index.py).
+    """
+
+    name = 'normalize'
+
+    def __init__(self, tokenizer: str = DEFAULT_TOKENIZER):
+        self.tokenize = get_tokenizer(tokenizer)
+
+    def process(self, batch: List[dict]) -> List[dict]:
+        records = []
+        for post in batch:
+            text = post.get('text', '') or ''
+            records.append({
+                'university': post.get('university', ''),
+                'owner_id': post.get('owner_id', 0),
+                'post_id': post.get('id', post.get('post_id', 0)),
+                'date': post.get('date', 0),
+                'likes': counter_value(post.get('likes')),
+                'views': counter_value(post.get('views')),
+                'text': text,
+                'tokens': self.tokenize(text),
+            })
+        return records
+
+    def finish(self) -> List[dict]:
+        return []
+
+
+class DedupeStage:
+    """Отбрасывание дубликатов и почти-дубликатов текстов (см. dedup.Deduplicator)."""
+
+    name = 'dedupe'
+
+    def __init__(self, threshold: float = 0.8, near_duplicates: bool = True):
+        self.deduplicator = Deduplicator(threshold=threshold, near_duplicates=near_duplicates)
+        self.duplicates = 0
+
+    def process(self, batch: List[dict]) -> List[dict]:
+        unique = []
+        for record in batch:
+            _, duplicate = self.deduplicator.add(record['text'])
+            if duplicate:
+                self.duplicates += 1
+            else:
+                unique.append(record)
+        return unique
+
+    def finish(self) -> List[dict]:
+        return []
+
+
+class SegmentWriterStage:
+    """
+    Запись индекса сегментами: каждые segment_size документов сохраняются в
+    отдельный файл segment-NNNNN.pkl, поэтому память ограничена одним сегментом.
+    Файл сегмента - поток pickle: заголовок (таблица документов сегмента,
+    количество терминов), затем пары (термин, номера документов внутри сегмента)
+    по возрастанию байтов UTF-8 терминов. Тексты сегмента - отдельный поток
+    texts-NNNNN.pkl по возрастанию даты. Так merge_segments сливает сегменты
+    потоком, не загружая их целиком.
+    Если в output_dir уже есть сегменты, запуск (start) завершается ошибкой,
+    а с overwrite=True они удаляются, чтобы не попасть в новый индекс.
+    """
+
+    name = 'index'
+
+    def __init__(self, output_dir: str, segment_size: int = 10000, tokenizer: str = DEFAULT_TOKENIZER,
+                 overwrite: bool = False):
+        self.output_dir = output_dir
+        self.segment_size = segment_size
+        self.overwrite = overwrite
+        # Способ разбиения, которым получены термины записей (NormalizeStage); пишется в индекс
+        self.tokenizer = tokenizer
+        self.segments: List[str] = []
+        self.documents_count = 0
+        self._postings: Dict[str, List[int]] = {}
+        self._documents: List[tuple] = []
+        self._texts: List[str] = []
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        existing = sorted(glob.glob(os.path.join(self.output_dir, 'segment-*.pkl')) +
+                          glob.glob(os.path.join(self.output_dir, 'texts-*.pkl')))
+        if existing and not self.overwrite:
+            raise FileExistsError(f"В папке {self.output_dir} уже есть сегменты ({len(existing)} файлов); "
+                                  f"для перезаписи укажите --overwrite")
+        for path in existing:
+            os.remove(path)
+
+    def process(self, batch: List[dict]) -> List[dict]:
+        for record in batch:
+            doc_id = len(self._documents)
+            self.documents_count += 1
+            for token in dict.fromkeys(record['tokens']):
+                self._postings.setdefault(token, []).append(doc_id)
+            self._documents.append(tuple(record[field] for field in DOCUMENT_FIELDS))
+            self._texts.append(record['text'])
+            if len(self._documents) >= self.segment_size:
+                self._flush()
+        return []
+
+    def finish(self) -> List[dict]:
+        if self._documents:
+            self._flush()
+        return []
+
+    def _flush(self):
+        path = os.path.join(self.output_dir, f"segment-{len(self.segments):05d}.pkl")
+        # Тексты - в порядке итогового индекса внутри сегмента (устойчиво по дате)
+        with open(texts_path(path), 'wb') as f:
+            for i in _date_order(self._documents):
+                pickle.dump(self._texts[i], f)
+        terms = sorted(self._postings, key=lambda term: term.encode('utf-8'))
+        with open(path, 'wb') as f:
+            pickle.dump({
+                'first_doc': self.documents_count - len(self._documents),
+                'tokenizer': self.tokenizer,
+                'documents': self._documents,
+                'terms': len(terms),
+            }, f)
+            for term in terms:
+                pickle.dump((term, self._postings[term]), f)
+        self.segments.append(path)
+        self._postings = {}
+        self._documents = []
+        self._texts = []
+
+
+def texts_path(segment_path: str) -> str:
+    """Файл текстов сегмента segment-NNNNN.pkl (texts-NNNNN.pkl в той же папке)."""
+    folder, name = os.path.split(segment_path)
+    return os.path.join(folder, 'texts-' + name[len('segment-'):])
+
+
+def _date_order(documents: List[tuple]) -> np.ndarray:
+    return date_order([{'date': document[DATE_FIELD]} for document in documents])
+
+
+def _read_header(path: str) -> dict:
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _segment_terms(path: str, base: int) -> Iterator[Tuple[str, np.ndarray]]:
+    """Пары (термин, номера документов в порядке конвейера) из файла сегмента."""
+    with open(path, 'rb') as f:
+        header = pickle.load(f)
+        for _ in range(header['terms']):
+            term, doc_ids = pickle.load(f)
+            yield term, base + np.asarray(doc_ids, dtype=np.int64)
+
+
+def _segment_texts(path: str) -> Iterator[str]:
+    with open(texts_path(path), 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def merge_segments(output_dir: str, output_file: str = 'index.idx',
+                   segments: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Объединение сегментов в один индекс в формате create_index.py
+    (таблица documents сохраняется в метаданных индекса, тексты - в хранилище
+    документов index.docstore).
+
+    Списки документов сливаются потоком: словари сегментов отсортированы, и
+    k-путевое слияние (heapq.merge) отдает в serialize_index по одному термину
+    с объединенным списком; тексты читаются из файлов сегментов в порядке
+    итогового индекса прямо в хранилище. В памяти остаются таблица documents
+    (она пишется в метаданные), перестановка номеров документов, словарь
+    терминов (для индекса k-грамм) и собираемое содержимое файла индекса
+    (сжатые списки и блоки текстов), но не несжатые списки и не исходные тексты.
+
+    Аргументы:
+        output_dir: Папка с файлами segment-NNNNN.pkl
+        output_file: Путь к итоговому индексу
+        segments: Файлы сегментов по порядку (например, SegmentWriterStage.segments);
+            по умолчанию все segment-NNNNN.pkl из output_dir
+
+    Возвращает:
+        Словарь с количеством документов, терминов и сегментов
+    """
+    if segments is None:
+        segment_files = sorted(glob.glob(os.path.join(output_dir, 'segment-*.pkl')))
+    else:
+        segment_files = list(segments)
+    documents: List[tuple] = []
+    bases = []
+    tokenizers = set()
+    for path in segment_files:
+        header = _read_header(path)
+        bases.append(len(documents))
+        documents.extend(header['documents'])
+        tokenizers.add(header.get('tokenizer', 'split'))
+    if len(tokenizers) > 1:
+        raise ValueError(f"Сегменты построены разными способами разбиения на термины: {sorted(tokenizers)}")
+
+    # Номера документов итогового индекса идут по возрастанию даты (см. index.documents)
+    order = _date_order(documents)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    terms_count = 0
+
+    def merged_postings() -> Iterator[Tuple[str, List[int]]]:
+        nonlocal terms_count
+        streams = [_segment_terms(path, base) for path, base in zip(segment_files, bases)]
+        merged = heapq.merge(*streams, key=lambda item: item[0].encode('utf-8'))
+        for term, group in groupby(merged, key=lambda item: item[0]):
+            terms_count += 1
+            yield term, np.sort(np.concatenate([rank[doc_ids] for _, doc_ids in group])).tolist()
+
+    def merged_texts() -> Iterator[str]:
+        # Внутри сегмента тексты уже идут в порядке индекса: берется следующий текст сегмента документа
+        streams = [_segment_texts(path) for path in segment_files]
+        for segment in np.searchsorted(bases, order, side='right') - 1:
+            yield next(streams[segment])
+
+    columns, universities = document_columns(dict(zip(DOCUMENT_FIELDS, documents[i])) for i in order)
+    # Таблица documents - в порядке записей конвейера: search()['results'] указывает в нее
+    metadata = {'documents': documents, 'tokenizer': tokenizers.pop() if tokenizers else DEFAULT_TOKENIZER}
+    write_index(output_file, merged_postings(), len(documents), metadata,
+                columns=columns, universities=universities, source_ids=order, texts=merged_texts())
+    return {'documents': len(documents), 'terms': terms_count, 'segments': len(segment_files)}
+
+
+class Pipeline:
+    """
+    Конвейер источник -> стадии, где каждая стадия работает в своем потоке и
+    связана со следующей ограниченной очередью. Пока сеть отдает публикации,
+    предыдущие порции уже нормализуются, проверяются на дубликаты и пишутся в
+    индекс; при заполнении очереди быстрая стадия ждет медленную, поэтому
+    память ограничена queue_size порциями на стадию.
+    """
+
+    def __init__(self, stages: List, queue_size: int = 16):
+        """
+        Аргументы:
+            stages: Стадии с методами process(batch) -> batch и finish() -> batch и атрибутом name;
+                необязательный метод start() вызывается в run до запуска потоков
+            queue_size: Максимум порций в каждой очереди между стадиями
+        """
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats = [StageStats('collect')] + [StageStats(stage.name) for stage in stages]
+        self._errors: List[BaseException] = []
+
+    def _put(self, output: queue.Queue, item, stats: StageStats, stop: threading.Event):
+        started = time.perf_counter()
+        while not stop.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stats.wait_output_sec += time.perf_counter() - started
+
+    def _run_source(self, source: Iterable[List[dict]], output: queue.Queue, stop: threading.Event):
+        stats = self.stats[0]
+        try:
+            iterator = iter(source)
+            while not stop.is_set():
+                started = time.perf_counter()
+                batch = next(iterator, _END)
+                stats.busy_sec += time.perf_counter() - started
+                if batch is _END:
+                    break
+                stats.items_in += len(batch)
+                stats.items_out += len(batch)
+                self._put(output, batch, stats, stop)
+        except BaseException as e:
+            self._errors.append(e)
+            stop.set()
+        # Следующая стадия читает очередь до признака конца, поэтому put не зависнет
+        output.put(_END)
+
+    def _run_stage(self, stage, stats: StageStats, source: queue.Queue, output: Optional[queue.Queue],
+                   stop: threading.Event):
+        # После ошибки в любой стадии очередь дочитывается без обработки, чтобы не блокировать соседей
+        finished = False
+        while True:
+            started = time.perf_counter()
+            batch = source.get()
+            stats.wait_input_sec += time.perf_counter() - started
+            if batch is _END:
+                finished = True
+            elif stop.is_set():
+                continue
+
+            try:
+                started = time.perf_counter()
+                if finished:
+                    result = stage.finish() if not stop.is_set() else []
+                else:
+                    result = stage.process(batch)
+                    stats.items_in += len(batch)
+                stats.busy_sec += time.perf_counter() - started
+                if result and output is not None:
+                    stats.items_out += len(result)
+                    self._put(output, result, stats, stop)
+            except BaseException as e:
+                self._errors.append(e)
+                stop.set()
+            if finished:
+                break
+
+        if output is not None:
+            output.put(_END)
+
+    def run(self, source: Iterable[List[dict]], report: Optional[Callable[[List[StageStats]], None]] = None,
+            report_interval: float = 5.0) -> List[StageStats]:
+        """
+        Запуск конвейера до исчерпания источника.
+
+        Аргументы:
+            source: Итератор порций (списков публикаций)
+            report: Функция, которой каждые report_interval секунд передаются счетчики стадий
+            report_interval: Период вызова report в секундах
+
+        Возвращает:
+            Счетчики стадий (первая - источник 'collect')
+        """
+        # Ошибки подготовки (например, сегменты прошлого запуска) - до начала сбора
+        for stage in self.stages:
+            if hasattr(stage, 'start'):
+                stage.start()
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = [threading.Thread(target=self._run_source, args=(source, queues[0], stop), name='collect')]
+        for i, stage in enumerate(self.stages):
+            output = queues[i + 1] if i + 1 < len(queues) else None
+            threads.append(threading.Thread(
+                target=self._run_stage, args=(stage, self.stats[i + 1], queues[i], output, stop), name=stage.name
+            ))
+        for thread in threads:
+            thread.start()
+
+        while any(thread.is_alive() for thread in threads):
+            threads[-1].join(timeout=report_interval)
+            if report is not None and threads[-1].is_alive():
+                report(self.stats)
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+        return self.stats
+
+
+def print_stage_stats(stats: List[StageStats]):
+    """Таблица счетчиков стадий; узкое место - стадия с наибольшим временем работы."""
+    bottleneck = max(stats, key=lambda stage: stage.busy_sec)
+    print(f"{'Стадия':<12} {'вход':>9} {'выход':>9} {'работа, с':>10} {'ожид. вход':>11} "
+          f"{'ожид. выход':>12} {'зап./с':>10}")
+    for stage in stats:
+        marker = ' <- узкое место' if stage is bottleneck else ''
+        print(f"{stage.name:<12} {stage.items_in:>9} {stage.items_out:>9} {stage.busy_sec:>10.2f} "
+              f"{stage.wait_input_sec:>11.2f} {stage.wait_output_sec:>12.2f} {stage.throughput():>10.0f}{marker}")
+
+
+def vk_source(collector, universities: List[str], start_time: int, end_time: int) -> Iterable[List[dict]]:
+    """
+    Источник конвейера: публикации университетов из web.VKUniversityMentionsCollector
+    порциями по одному временному окну
+    """
+    for university in universities:
+        for window_posts in collector.iter_posts(university, start_time, end_time):
+            yield [dict(post, university=university) for post in window_posts]
+
+
+def array_source(data_file: str, batch_size: int = 1000) -> Iterable[List[dict]]:
+    """Источник конвейера из сохраненного массива записей (например, vk_array.npy)."""
+    data = np.load(data_file, allow_pickle=True)
+    for offset in range(0, len(data), batch_size):
+        yield list(data[offset:offset + batch_size])
+
+
+def build_pipeline(output_dir: str, segment_size: int = 10000, dedupe_threshold: float = 0.8,
+                   near_duplicates: bool = True, queue_size: int = 16,
+                   tokenizer: str = DEFAULT_TOKENIZER, overwrite: bool = False) -> Pipeline:
+    """Конвейер normalize -> dedupe -> index с настройками по умолчанию."""
+    return Pipeline([
+        NormalizeStage(tokenizer),
+        DedupeStage(threshold=dedupe_threshold, near_duplicates=near_duplicates),
+        SegmentWriterStage(output_dir, segment_size=segment_size, tokenizer=tokenizer, overwrite=overwrite),
+    ], queue_size=queue_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Конвейер: сбор публикаций VK -> нормализация -> '
+                                                 'удаление дубликатов -> сегменты индекса')
+    parser.add_argument('--universities', nargs='+', default=["СПбГУ", "МГУ"], help='Университеты для поиска')
+    parser.add_argument('--year', type=int, default=2024, help='Год, за который собираются публикации')
+    parser.add_argument('--data', type=str, default=None,
+                        help='Вместо сбора из VK взять записи из файла .npy (например, vk_array.npy)')
+    parser.add_argument('--segments', type=str, default='index_segments', help='Папка для сегментов индекса')
+    parser.add_argument('--output', type=str, default='index.idx',
+                        help='Итоговый индекс (потоковое слияние сегментов; в памяти остаются таблица documents, '
+                             'словарь терминов и сжатое содержимое индекса, но не несжатые списки и тексты)')
+    parser.add_argument('--segment-size', type=int, default=10000, help='Документов в одном сегменте')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='Удалить сегменты предыдущего запуска в папке --segments (без флага - ошибка, если они есть)')
+    parser.add_argument('--queue-size', type=int, default=16, help='Максимум порций в очереди между стадиями')
+    parser.add_argument('--dedupe-threshold', type=float, default=0.8, help='Порог сходства почти-дубликатов')
+    parser.add_argument('--exact-only', action='store_true', help='Удалять только точные дубликаты')
+    parser.add_argument('--tokenizer', choices=TOKENIZERS, default=DEFAULT_TOKENIZER,
+                        help='Разбиение текстов на термины (сохраняется в индексе, запросы разбиваются так же)')
+    args = parser.parse_args()
+
+    if args.data:
+        source = array_source(args.data)
+    else:
+        import web
+        config = configparser.ConfigParser()
+        config.read('config.ini')
+        collector = web.VKUniversityMentionsCollector(config['vk']['access_token'])
+        start_time = int(datetime(args.year, 1, 1).timestamp())
+        end_time = int(min(datetime(args.year, 12, 31, 23, 59, 59), datetime.now()).timestamp())
+        source = vk_source(collector, args.universities, start_time, end_time)
+
+    pipeline = build_pipeline(args.segments, args.segment_size, args.dedupe_threshold,
+                              not args.exact_only, args.queue_size, args.tokenizer, args.overwrite)
+    try:
+        stats = pipeline.run(source, report=print_stage_stats)
+    except FileExistsError as e:
+        parser.error(str(e))
+    print_stage_stats(stats)
+
+    writer = pipeline.stages[-1]
+    merged = merge_segments(args.segments, args.output, segments=writer.segments)
+    print(f"Индекс: {merged['documents']} документов, {merged['terms']} терминов, "
+          f"{merged['segments']} сегментов -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
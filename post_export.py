@@ -0,0 +1,163 @@
+import csv
+import gzip
+import os
+from abc import ABC, abstractmethod
+
+# Предел строк на листе Excel (1 048 576 вместе с заголовком)
+EXCEL_MAX_ROWS = 1048575
+
+# Колонки выгрузки публикаций и их заголовки
+EXPORT_COLUMNS = (
+    ('university', 'Университет'),
+    ('post_id', 'ID публикации'),
+    ('owner_id', 'ID владельца'),
+    ('author_id', 'ID автора'),
+    ('date', 'Дата публикации'),
+    ('text', 'Текст публикации'),
+    ('likes', 'Лайки'),
+    ('views', 'Просмотры'),
+    ('reposts', 'Репосты'),
+    ('comments', 'Комментарии'),
+    ('post_url', 'Ссылка на публикацию'),
+)
+
+
+class PostWriter(ABC):
+    """
+    Базовый класс потоковой выгрузки публикаций.
+
+    write() принимает очередную порцию публикаций - DataFrame с колонками
+    EXPORT_COLUMNS (например, PostStore.to_dataframe) - и сразу пишет ее на
+    диск, поэтому память ограничена размером одной порции, а не всей выборки.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows_written = 0
+
+    @abstractmethod
+    def write(self, df):
+        """
+        Запись порции публикаций
+        :param df: DataFrame с колонками EXPORT_COLUMNS
+        """
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CsvPostWriter(PostWriter):
+    """
+    Выгрузка в CSV (UTF-8); для путей, оканчивающихся на .gz, - со сжатием gzip
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        if path.endswith('.gz'):
+            self._file = gzip.open(path, 'wt', encoding='utf-8', newline='')
+        else:
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._header = True
+
+    def write(self, df):
+        df[[name for name, _ in EXPORT_COLUMNS]].to_csv(self._file, header=self._header, index=False)
+        self._header = False
+        self.rows_written += len(df)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetPostWriter(PostWriter):
+    """
+    Выгрузка в Parquet через pyarrow: каждая порция записывается отдельной группой строк
+    """
+
+    def __init__(self, path, compression='zstd'):
+        """
+        :param compression: Алгоритм сжатия Parquet (zstd, snappy, gzip, none)
+        """
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Для выгрузки в Parquet установите pyarrow: pip install pyarrow")
+        super().__init__(path)
+        self._pyarrow = pyarrow
+        self._compression = compression
+        self._writer = None
+
+    def write(self, df):
+        df = df[[name for name, _ in EXPORT_COLUMNS]].copy()
+        df['university'] = df['university'].astype(str)
+        table = self._pyarrow.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pyarrow.parquet.ParquetWriter(self.path, table.schema, compression=self._compression)
+        self._writer.write_table(table)
+        self.rows_written += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class ExcelPostWriter(PostWriter):
+    """
+    Выгрузка в Excel в режиме openpyxl write_only: строки сбрасываются на диск по мере
+    записи. При достижении предела строк листа создается следующий лист.
+    """
+
+    def __init__(self, path, sheet_name='Публикации', max_rows=EXCEL_MAX_ROWS):
+        from openpyxl import Workbook
+        super().__init__(path)
+        self._workbook = Workbook(write_only=True)
+        self._sheet_name = sheet_name
+        self._max_rows = max_rows
+        self._sheets = 0
+        self._sheet = None
+        self._sheet_rows = 0
+
+    def _next_sheet(self):
+        self._sheets += 1
+        title = self._sheet_name if self._sheets == 1 else f"{self._sheet_name} {self._sheets}"
+        self._sheet = self._workbook.create_sheet(title)
+        self._sheet.append([header for _, header in EXPORT_COLUMNS])
+        self._sheet_rows = 0
+
+    def write(self, df):
+        columns = [df[name].tolist() for name, _ in EXPORT_COLUMNS]
+        for row in zip(*columns):
+            if self._sheet is None or self._sheet_rows >= self._max_rows:
+                self._next_sheet()
+            self._sheet.append([str(value) if name == 'university' else value
+                                for (name, _), value in zip(EXPORT_COLUMNS, row)])
+            self._sheet_rows += 1
+        self.rows_written += len(df)
+
+    def close(self):
+        if self._sheet is None:
+            self._next_sheet()
+        self._workbook.save(self.path)
+
+
+def open_post_writer(path, **options):
+    """
+    Создание выгрузки по расширению файла: .csv, .csv.gz, .parquet или .xlsx
+    :param path: Путь к выходному файлу
+    :param options: Параметры конкретного класса выгрузки
+    :return: PostWriter
+    """
+    name = path.lower()
+    if name.endswith('.csv') or name.endswith('.csv.gz'):
+        return CsvPostWriter(path, **options)
+    if name.endswith('.parquet'):
+        return ParquetPostWriter(path, **options)
+    if name.endswith('.xlsx'):
+        return ExcelPostWriter(path, **options)
+    raise ValueError(f"Неизвестный формат выгрузки: {os.path.basename(path)}")
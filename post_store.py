@@ -0,0 +1,341 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from dedup import Deduplicator
+
+# Числовые колонки хранилища; текст хранится отдельным списком, ссылка на публикацию вычисляется
+NUMERIC_COLUMNS = (
+    ('university', np.int16),
+    ('post_id', np.int64),
+    ('owner_id', np.int64),
+    ('author_id', np.int64),
+    ('date', np.int64),
+    ('likes', np.int64),
+    ('views', np.int64),
+    ('reposts', np.int64),
+    ('comments', np.int64),
+)
+POST_DTYPE = np.dtype(list(NUMERIC_COLUMNS))
+COLUMNS = tuple(name for name, _ in NUMERIC_COLUMNS) + ('text',)
+
+# Гранулярность агрегации -> частота периодов pandas
+AGGREGATION_FREQS = {'hour': 'h', 'day': 'D', 'week': 'W', 'month': 'M'}
+ENGAGEMENT_COLUMNS = ('likes', 'views', 'reposts', 'comments')
+
+
+def _post_url(owner_id, post_id):
+    return f"https://vk.com/wall{owner_id}_{post_id}"
+
+
+def _local_timezone():
+    return datetime.now().astimezone().tzinfo
+
+
+def _local_datetimes(timestamps):
+    # unix time -> локальное время без часового пояса, как у datetime.fromtimestamp
+    return pd.to_datetime(pd.Series(timestamps), unit='s', utc=True).dt.tz_convert(_local_timezone()).dt.tz_localize(None)
+
+
+def _count(post, field):
+    value = post.get(field)
+    return value.get('count', 0) if isinstance(value, dict) else 0
+
+
+class PostStore:
+    """
+    Колоночное хранилище собранных публикаций.
+
+    Числовые поля лежат в одном структурированном массиве NumPy: университет -
+    код категории int16 (названия хранятся один раз в self.universities), дата -
+    unix time int64. Текст - отдельная колонка (список строк), ссылка на
+    публикацию не хранится, а собирается из owner_id и post_id. Массив растет
+    удвоением емкости, поэтому добавление амортизированно O(1).
+
+    Для совместимости со списком словарей хранилище поддерживает len(),
+    итерацию и индексацию, которые отдают записи в прежнем формате.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        :param capacity: Начальная емкость в публикациях
+        """
+        self.universities = []
+        self._codes = {}
+        self._rows = np.zeros(capacity, dtype=POST_DTYPE)
+        self._text = []
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self.record(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.record(i) for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("индекс публикации вне диапазона")
+        return self.record(index)
+
+    def university_code(self, university):
+        """
+        :return: Код категории университета (новое название получает следующий код)
+        """
+        code = self._codes.get(university)
+        if code is None:
+            code = self._codes[university] = len(self.universities)
+            self.universities.append(university)
+        return code
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed > len(self._rows):
+            rows = np.zeros(max(needed, 2 * len(self._rows)), dtype=POST_DTYPE)
+            rows[:self._size] = self._rows[:self._size]
+            self._rows = rows
+
+    def append_posts(self, university, posts, start_time=None, end_time=None):
+        """
+        Добавление публикаций из ответа newsfeed.search
+        :param university: Университет, к которому относятся публикации
+        :param posts: Список публикаций (словари VK API)
+        :param start_time: Пропускать публикации раньше этого времени (unix time)
+        :param end_time: Пропускать публикации позже этого времени (unix time)
+        :return: Количество добавленных публикаций
+        """
+        code = self.university_code(university)
+        batch = np.array([
+            (code, post.get('id', 0), post.get('owner_id', 0), post.get('from_id', post.get('owner_id', 0)),
+             post.get('date', 0), _count(post, 'likes'), _count(post, 'views'),
+             _count(post, 'reposts'), _count(post, 'comments'))
+            for post in posts
+        ], dtype=POST_DTYPE)
+        keep = np.ones(len(batch), dtype=bool)
+        if start_time is not None:
+            keep &= batch['date'] >= start_time
+        if end_time is not None:
+            keep &= batch['date'] <= end_time
+
+        batch = batch[keep]
+        self._reserve(len(batch))
+        self._rows[self._size:self._size + len(batch)] = batch
+        self._text.extend(post.get('text', '') for post, kept in zip(posts, keep) if kept)
+        self._size += len(batch)
+        return len(batch)
+
+    def column(self, name):
+        """
+        :param name: Имя колонки из COLUMNS
+        :return: Массив NumPy (представление без копирования) или список строк для text
+        """
+        if name == 'text':
+            return self._text
+        return self._rows[name][:self._size]
+
+    def record(self, index):
+        """
+        :return: Публикация в виде словаря (дата - datetime, университет - название)
+        """
+        row = self._rows[index]
+        return {
+            'university': self.universities[row['university']],
+            'post_id': int(row['post_id']),
+            'owner_id': int(row['owner_id']),
+            'author_id': int(row['author_id']),
+            'date': datetime.fromtimestamp(int(row['date'])),
+            'text': self._text[index],
+            'likes': int(row['likes']),
+            'views': int(row['views']),
+            'reposts': int(row['reposts']),
+            'comments': int(row['comments']),
+            'post_url': _post_url(row['owner_id'], row['post_id']),
+        }
+
+    def view(self, university=None):
+        """
+        :param university: Университет; None - все публикации
+        :return: PostView - фильтр по хранилищу без копирования данных
+        """
+        return PostView(self, university)
+
+    def to_dataframe(self, mask=None):
+        """
+        Таблица pandas с колонками как у прежнего списка словарей;
+        университет - категориальный тип, дата - datetime64
+        :param mask: Логическая маска или срез строк (по умолчанию все)
+        """
+        rows = self._rows[:self._size]
+        text = self._text
+        if isinstance(mask, slice):
+            rows = rows[mask]
+            text = text[mask]
+        elif mask is not None:
+            rows = rows[mask]
+            text = [text[i] for i in np.flatnonzero(mask)]
+        df = pd.DataFrame({name: rows[name] for name, _ in NUMERIC_COLUMNS[1:]})
+        df.insert(0, 'university', pd.Categorical.from_codes(rows['university'], categories=self.universities))
+        df['date'] = _local_datetimes(rows['date'])
+        df['text'] = text
+        df['post_url'] = [_post_url(owner_id, post_id) for owner_id, post_id in zip(rows['owner_id'], rows['post_id'])]
+        return df
+
+    def cluster_ids(self, threshold=0.8, near_duplicates=True):
+        """
+        Кластеры одинакового содержимого (перепосты одного текста в разных сообществах)
+        :param threshold: Порог сходства почти-дубликатов (см. dedup.Deduplicator)
+        :param near_duplicates: Объединять почти-дубликаты (False - только точные)
+        :return: Массив int64: для каждой публикации - номер строки первой публикации ее кластера;
+                 строки, где cluster_ids() == arange(len(store)), - уникальное содержимое
+        """
+        deduplicator = Deduplicator(threshold=threshold, near_duplicates=near_duplicates)
+        return np.fromiter((deduplicator.add(text)[0] for text in self._text), dtype=np.int64, count=self._size)
+
+    def iter_dataframes(self, batch_size=50000):
+        """
+        Последовательная выгрузка хранилища порциями (для потоковой записи в файл)
+        :param batch_size: Количество публикаций в порции
+        :return: Генератор DataFrame в формате to_dataframe
+        """
+        for offset in range(0, self._size, batch_size):
+            yield self.to_dataframe(slice(offset, min(offset + batch_size, self._size)))
+
+    def aggregate(self, granularity='month', start=None, end=None, mask=None):
+        """
+        Количество публикаций и суммы реакций по университетам и периодам за один проход
+        :param granularity: 'hour', 'day', 'week' или 'month'
+        :param start: Начало диапазона периодов (datetime; по умолчанию - самая ранняя публикация)
+        :param end: Конец диапазона периодов (datetime; по умолчанию - самая поздняя публикация)
+        :param mask: Логическая маска строк (по умолчанию все)
+        :return: DataFrame с индексом (university, period) и колонками posts_count, likes_count,
+                 views_count, reposts_count, comments_count; периоды без публикаций заполнены нулями,
+                 публикации вне диапазона не учитываются
+        """
+        freq = AGGREGATION_FREQS[granularity]
+        rows = self._rows[:self._size]
+        if mask is not None:
+            rows = rows[mask]
+        dates = _local_datetimes(rows['date'])
+        if start is None or end is None:
+            if not len(rows):
+                return pd.DataFrame(
+                    columns=['posts_count'] + [f'{name}_count' for name in ENGAGEMENT_COLUMNS],
+                    index=pd.MultiIndex.from_arrays([[], []], names=['university', 'period'])
+                )
+            start = dates.min() if start is None else start
+            end = dates.max() if end is None else end
+
+        periods = pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq=freq)
+        post_periods = dates.dt.to_period(freq)
+        in_range = post_periods.isin(periods).to_numpy()
+        rows = rows[in_range]
+        df = pd.DataFrame({
+            'university': pd.Categorical.from_codes(rows['university'], categories=self.universities),
+            'period': pd.Categorical(post_periods[in_range], categories=periods),
+            'posts_count': 1,
+        })
+        for name in ENGAGEMENT_COLUMNS:
+            df[f'{name}_count'] = rows[name]
+        return df.groupby(['university', 'period'], observed=False).sum()
+
+    def counts_table(self, granularity='month', start=None, end=None, value='posts_count'):
+        """
+        Сводная таблица университет x период
+        :param value: Колонка результата aggregate (по умолчанию количество публикаций)
+        :return: DataFrame: строки - университеты, колонки - периоды
+        """
+        return self.aggregate(granularity, start, end)[value].unstack('period')
+
+    def to_parquet(self, path, compression='zstd'):
+        """
+        Сохранение хранилища в Parquet (нужен pyarrow или fastparquet)
+        :param path: Путь к файлу
+        :param compression: Алгоритм сжатия
+        """
+        df = pd.DataFrame({name: self.column(name) for name in COLUMNS})
+        df['university'] = pd.Categorical.from_codes(df['university'], categories=self.universities)
+        df.to_parquet(path, compression=compression, index=False)
+
+    @classmethod
+    def from_parquet(cls, path):
+        """
+        Загрузка хранилища, сохраненного to_parquet
+        """
+        df = pd.read_parquet(path)
+        store = cls(capacity=max(len(df), 1))
+        universities = df['university'].astype('category')
+        for university in universities.cat.categories:
+            store.university_code(university)
+        store._rows['university'][:len(df)] = [store._codes[name] for name in universities]
+        for name, _ in NUMERIC_COLUMNS[1:]:
+            store._rows[name][:len(df)] = df[name].to_numpy()
+        store._text = df['text'].tolist()
+        store._size = len(df)
+        return store
+
+
+class PostView:
+    """
+    Публикации одного университета в PostStore.
+
+    Не копирует данные: колонки каждый раз выбираются из хранилища по маске,
+    поэтому представление видит и публикации, добавленные позже.
+    """
+
+    def __init__(self, store, university=None):
+        self.store = store
+        self.university = university
+
+    def mask(self):
+        """
+        :return: Логическая маска строк хранилища, входящих в представление
+        """
+        codes = self.store.column('university')
+        if self.university is None:
+            return np.ones(len(codes), dtype=bool)
+        code = self.store._codes.get(self.university)
+        return codes == code if code is not None else np.zeros(len(codes), dtype=bool)
+
+    def column(self, name):
+        if name == 'text':
+            text = self.store.column('text')
+            return [text[i] for i in np.flatnonzero(self.mask())]
+        return self.store.column(name)[self.mask()]
+
+    def __len__(self):
+        return int(np.count_nonzero(self.mask()))
+
+    def __iter__(self):
+        for index in np.flatnonzero(self.mask()):
+            yield self.store.record(index)
+
+    def summary(self):
+        """
+        :return: Словарь с количеством публикаций и авторов и суммами реакций
+        """
+        rows = self.store._rows[:len(self.store)][self.mask()]
+        return {
+            'posts_count': len(rows),
+            'authors_count': len(np.unique(rows['author_id'])),
+            'likes_count': int(rows['likes'].sum()),
+            'views_count': int(rows['views'].sum()),
+            'reposts_count': int(rows['reposts'].sum()),
+            'comments_count': int(rows['comments'].sum()),
+        }
+
+    def to_dataframe(self):
+        return self.store.to_dataframe(self.mask())
+
+    def aggregate(self, granularity='month', start=None, end=None):
+        """
+        То же, что PostStore.aggregate, но только по публикациям представления
+        """
+        result = self.store.aggregate(granularity, start, end, self.mask())
+        if self.university is None:
+            return result
+        return result[result.index.get_level_values('university') == self.university]
@@ -0,0 +1,150 @@
+import cProfile
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Сколько строк pstats (по суммарному времени) печатать после профилирования
+PROFILE_TOP = 20
+
+
+class _NullTimer:
+    """Таймер выключенных метрик: один общий объект, вход и выход ничего не делают."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, metrics: 'Metrics', name: str):
+        self._metrics = metrics
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._metrics.add_time(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class Metrics:
+    """
+    Счетчики и таймеры стадий построения индекса, поиска и разбора документов.
+
+    По умолчанию выключены: timer() возвращает общий пустой контекстный
+    менеджер, count() только проверяет флаг, поэтому инструментированный код
+    почти не замедляется. Таймеры и счетчики ставятся на стадии и порции
+    (документы, списки, блоки), а не на каждый элемент в цикле.
+    Потокобезопасен: стадии pipeline.py работают в разных потоках.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.timers: dict[str, list[float]] = {}
+        self.counters: dict[str, int] = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.timers = {}
+            self.counters = {}
+
+    def timer(self, name: str):
+        """
+        Контекстный менеджер, который добавляет время выполнения блока к таймеру name.
+
+        :param name: Имя стадии, например 'build.encode'
+        """
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            timer = self.timers.setdefault(name, [0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+
+    def count(self, name: str, value: int = 1):
+        """
+        Увеличивает счетчик name на value (только если метрики включены).
+
+        :param name: Имя счетчика, например 'search.postings_decoded'
+        :param value: Приращение
+        """
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self) -> dict:
+        """
+        :return: Словарь для JSON: таймеры (вызовы, суммарное и среднее время) и счетчики
+        """
+        with self._lock:
+            return {
+                'timers': {
+                    name: {'calls': calls, 'total_sec': total, 'mean_sec': total / calls}
+                    for name, (calls, total) in sorted(self.timers.items())
+                },
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+
+# Общие метрики процесса: их пишут index, parser и CLI-скрипты
+METRICS = Metrics()
+
+
+def timer(name: str):
+    """Таймер стадии в общих метриках (см. Metrics.timer)."""
+    return METRICS.timer(name)
+
+
+def count(name: str, value: int = 1):
+    """Счетчик в общих метриках (см. Metrics.count)."""
+    METRICS.count(name, value)
+
+
+@contextmanager
+def profile(output_prefix: str | None) -> Iterator[Metrics]:
+    """
+    Профилирование блока: включает общие метрики и cProfile, по выходе пишет
+    output_prefix.pstats (открывается pstats или snakeviz) и output_prefix.json
+    (отчет Metrics.report() и общее время) и печатает самые долгие функции.
+    При output_prefix=None ничего не включает.
+
+    :param output_prefix: Путь к файлам отчета без расширения или None
+    """
+    if output_prefix is None:
+        yield METRICS
+        return
+    METRICS.reset()
+    METRICS.enable()
+    profiler = cProfile.Profile()
+    start_time = time.perf_counter()
+    profiler.enable()
+    try:
+        yield METRICS
+    finally:
+        profiler.disable()
+        wall_sec = time.perf_counter() - start_time
+        METRICS.disable()
+        profiler.dump_stats(f'{output_prefix}.pstats')
+        with open(f'{output_prefix}.json', 'w', encoding='utf-8') as f:
+            json.dump(dict(METRICS.report(), wall_sec=wall_sec), f, ensure_ascii=False, indent=2)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(PROFILE_TOP)
+        print(f"Профиль сохранен в {output_prefix}.pstats, метрики - в {output_prefix}.json")
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+import time
+from typing import Callable
+
+# Лимит VK API для пользовательского токена: не более 3 запросов в секунду
+VK_REQUESTS_PER_SECOND = 3.0
+
+
+class TokenBucket:
+    """
+    Потокобезопасный ограничитель частоты запросов по алгоритму token bucket.
+
+    Корзина вмещает capacity токенов и пополняется со скоростью rate токенов
+    в секунду. Каждый запрос забирает один токен; если токенов нет, поток ждет
+    ровно столько, сколько нужно до появления следующего. Один экземпляр
+    делится между всеми потоками, работающими с одним токеном доступа.
+    """
+
+    def __init__(
+        self,
+        rate: float = VK_REQUESTS_PER_SECOND,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate должен быть положительным")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        # Резервирует токены (баланс может уйти в минус) и возвращает время ожидания
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Забирает токены, при необходимости блокируя поток.
+
+        :param tokens: Количество токенов (обычно 1 запрос = 1 токен)
+        :return: Время ожидания в секундах
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """
+        То же, что acquire, но ожидание не блокирует цикл событий asyncio.
+
+        :param tokens: Количество токенов
+        :return: Время ожидания в секундах
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
@@ -1,69 +1,57 @@
-import time
-import pickle
+from datetime import datetime, timedelta
 from typing import Dict, List, Union
 import argparse
 
+from index import IndexReader
+from index.docstore import SNIPPET_WINDOW
+from index.lexicon import MAX_EXPANSIONS
+from profiling import profile
+
 class IndexSearcher:
     """
     Класс для поиска по предварительно созданному инвертированному индексу.
+    Файл индекса отображается в память и не загружается целиком.
     """
     
-    def __init__(self, index_file: str = 'index.pkl'):
+    def __init__(self, index_file: str = 'index.idx', cache_size: int = 256):
         self.index_file = index_file
-        self.index_data = None
+        self.cache_size = cache_size
+        self.reader = None
 
-    def load_index(self):
-        with open(self.index_file, 'rb') as f:
-            self.index_data = pickle.load(f)
+    def load_index(self) -> IndexReader:
+        if self.reader is None:
+            self.reader = IndexReader(self.index_file, cache_size=self.cache_size)
+        return self.reader
 
-    def search(self, query: str, compressed: bool = True) -> Dict[str, Union[List[int], float]]:
-        if self.index_data is None:
-            self.load_index()
-            
-        start_time = time.time()
-        
-        if compressed:
-            results = self.index_data['compressed'].get(query, [])
-        else:
-            results = self.index_data['uncompressed'].get(query, [])
-            
-        search_time = time.time() - start_time
-        
-        return {
-            'results': results,
-            'time_sec': search_time,
-            'count': len(results)
-        }
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
 
-    def evaluate(self, query: str) -> Dict[str, Union[float, int]]:
-        if self.index_data is None:
-            self.load_index()
-            
-        uncompressed_search = self.search(query, compressed=False)
-        compressed_search = self.search(query, compressed=True)
-        
-        # Расчет размеров
-        uncompressed_size = sum(len(pickle.dumps(doc_ids)) for doc_ids in self.index_data['uncompressed'].values())
-        compressed_bits = sum(len(code) for codes in self.index_data['compressed'].values() for code in codes)
-        compressed_size = compressed_bits / 8
-        
-        return {
-            'uncompressed_size_kb': uncompressed_size / 1024,
-            'compressed_size_kb': compressed_size / 1024,
-            'compression_ratio': compressed_size / uncompressed_size,
-            'uncompressed_search_time': uncompressed_search['time_sec'],
-            'compressed_search_time': compressed_search['time_sec'],
-            'results_count': uncompressed_search['count']
-        }
+    def search(self, query: str, compressed: bool = True, max_expansions: int = MAX_EXPANSIONS,
+               **filters) -> Dict[str, Union[List[int], float]]:
+        """filters - start, end, university, min_likes, min_views (см. IndexReader.document_filter)"""
+        return self.load_index().search(query, compressed=compressed, max_expansions=max_expansions, **filters)
 
-def main():
-    parser = argparse.ArgumentParser(description='Поиск по инвертированному индексу')
-    parser.add_argument('query', type=str, help='Поисковый запрос')
-    parser.add_argument('--index', type=str, default='index.pkl', help='Путь к файлу индекса')
-    args = parser.parse_args()
-    
-    searcher = IndexSearcher(index_file=args.index)
-    metrics = searcher.evaluate(args.query)
+    def evaluate(self, query: str, max_expansions: int = MAX_EXPANSIONS) -> Dict[str, Union[float, int]]:
+        return self.load_index().evaluate(query, max_expansions=max_expansions)
+
+    def snippets(self, result: Dict[str, Union[List[int], float]], limit: int = 10,
+                 window: int = SNIPPET_WINDOW) -> Dict[int, str]:
+        """
+        Фрагменты текстов первых limit результатов search с подсветкой терминов запроса
+        по номерам исходных записей (result['results']).
+        """
+        snippets = self.load_index().snippets(result['doc_ids'][:limit], result['terms'], window)
+        return dict(zip(result['results'][:limit], snippets.values()))
+
+def run(args: argparse.Namespace):
+    """Поиск и вывод метрик по аргументам командной строки (см. main)."""
+    searcher = IndexSearcher(index_file=args.index, cache_size=args.cache_size)
+    terms = searcher.search(args.query, max_expansions=args.max_expansions)['terms']
+    if terms != args.query.split():
+        print(f"Термины запроса: {', '.join(terms) or '-'}")
+    metrics = searcher.evaluate(args.query, max_expansions=args.max_expansions)
     
     print(f"Размер индекса без сжатия: {metrics['uncompressed_size_kb']:.2f} KB")
     print(f"Размер индекса со сжатием: {metrics['compressed_size_kb']:.2f} KB")
@@ -72,5 +60,41 @@ def main():
     print(f"Время поиска со сжатием: {metrics['compressed_search_time']:.6f} сек")
     print(f"Найдено результатов: {metrics['results_count']}")
 
+    filters = {
+        'start': datetime.strptime(args.start, '%Y-%m-%d') if args.start else None,
+        'end': datetime.strptime(args.end, '%Y-%m-%d') + timedelta(days=1, seconds=-1) if args.end else None,
+        'university': args.university,
+        'min_likes': args.min_likes,
+        'min_views': args.min_views,
+    }
+    result = None
+    if any(value is not None for value in filters.values()):
+        result = searcher.search(args.query, max_expansions=args.max_expansions, **filters)
+        print(f"Найдено с фильтрами: {result['count']} (за {result['time_sec']:.6f} сек)")
+    if args.show > 0:
+        result = result or searcher.search(args.query, max_expansions=args.max_expansions)
+        for source_id, text in searcher.snippets(result, limit=args.show, window=args.window).items():
+            print(f"[{source_id}] {text}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Поиск по инвертированному индексу')
+    parser.add_argument('query', type=str, help="Поисковый запрос: слова через пробел, шаблоны 'спбгу*', 'р?ктор', нечеткий поиск 'униврситет~'")
+    parser.add_argument('--index', type=str, default='index.idx', help='Путь к файлу индекса')
+    parser.add_argument('--cache-size', type=int, default=256, help='Сколько распакованных списков держать в кэше (0 - без кэша)')
+    parser.add_argument('--from', dest='start', type=str, default=None, help='Публикации не раньше даты (ГГГГ-ММ-ДД)')
+    parser.add_argument('--to', dest='end', type=str, default=None, help='Публикации не позже даты (ГГГГ-ММ-ДД, включительно)')
+    parser.add_argument('--university', nargs='+', default=None, help='Только публикации этих университетов')
+    parser.add_argument('--min-likes', type=int, default=None, help='Минимальное количество лайков')
+    parser.add_argument('--min-views', type=int, default=None, help='Минимальное количество просмотров')
+    parser.add_argument('--show', type=int, default=0, help='Показать фрагменты текстов первых N результатов')
+    parser.add_argument('--window', type=int, default=SNIPPET_WINDOW, help='Длина фрагмента текста в словах')
+    parser.add_argument('--max-expansions', type=int, default=MAX_EXPANSIONS, help='Сколько терминов может дать одно слово с шаблоном или ~')
+    parser.add_argument('--profile', nargs='?', const='profile', default=None, metavar='PREFIX',
+                        help='Сохранить профиль cProfile (PREFIX.pstats) и метрики поиска (PREFIX.json)')
+    args = parser.parse_args()
+
+    with profile(args.profile):
+        run(args)
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
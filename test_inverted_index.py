@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 from inverted_index import InvertedIndex
 import numpy as np
@@ -74,6 +76,17 @@ class TestInvertedIndex(unittest.TestCase):
         self.assertGreaterEqual(result['uncompressed_search_time'], 0.0)
         self.assertGreaterEqual(result['compressed_search_time'], 0.0)
 
+    def test_load_data_dedupe(self):
+        """Проверяет, что при dedupe повторы текстов индексируются один раз."""
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = os.path.join(tmp, 'data.npy')
+            np.save(data_file, self.test_data, allow_pickle=True)
+            index = InvertedIndex(data_file=data_file, dedupe=True)
+            index.create_inverted_index()
+        self.assertEqual(len(index.data), 4)
+        self.assertEqual(len(index.cluster_ids), 24)
+        self.assertEqual(index.inverted_index['декан'], [0, 1])
+
 
 if __name__ == '__main__':
     unittest.main()
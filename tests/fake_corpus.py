@@ -0,0 +1,131 @@
+"""
+Воспроизводимый синтетический корпус публикаций на русском языке для тестов
+и бенчмарков индекса (benchmarks/bench_index.py) без приватного vk_array.npy.
+
+Словарь - частые служебные и тематические слова и псевдослова из русских
+слогов с окончаниями; частоты слов подчиняются закону Ципфа-Мандельброта
+(частота слова ранга r пропорциональна 1 / (r + ZIPF_SHIFT) ** ZIPF_EXPONENT),
+а размер словаря растет с объемом корпуса по закону Хипса. Длины публикаций
+распределены логнормально, как у коротких постов ВКонтакте с редкими
+длинными статьями; у каждой публикации есть университет, дата, лайки и
+просмотры в формате записей vk_array.npy. Один и тот же seed дает один и тот
+же корпус на любой машине.
+"""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+ZIPF_EXPONENT = 1.07
+ZIPF_SHIFT = 2.7
+# Закон Хипса: словарь из HEAPS_K * (число словоупотреблений) ** HEAPS_BETA слов
+HEAPS_K = 30
+HEAPS_BETA = 0.5
+MIN_VOCABULARY = 5000
+# Логнормальная длина публикации в словах: медиана около 33 слов
+LENGTH_MEAN = 3.5
+LENGTH_SIGMA = 0.9
+MAX_LENGTH = 3000
+
+# Самые частые слова корпуса упоминаний университетов (ранги 0, 1, ...)
+COMMON_WORDS = (
+    'и', 'в', 'на', 'с', 'не', 'по', 'для', 'что', 'университет', 'студенты', 'о', 'к', 'из', 'это',
+    'как', 'а', 'года', 'мы', 'все', 'приглашаем', 'университета', 'от', 'до', 'также', 'студентов',
+    'будет', 'новости', 'конкурс', 'ректор', 'олимпиада', 'лекция', 'наука', 'факультет', 'спбгу', 'мгу',
+    'итмо', 'вшэ', 'мфти', 'кафедра', 'магистратура', 'абитуриенты', 'конференция', 'стипендия',
+)
+UNIVERSITIES = ('СПбГУ', 'МГУ', 'ИТМО', 'ВШЭ', 'МФТИ', 'УрФУ', 'НГУ', 'КФУ', 'ТГУ', 'ДВФУ')
+
+_CONSONANTS = list('бвгдзклмнпрстфхцчшщжй')
+_VOWELS = list('аеиоуыэюя')
+_ENDINGS = ('', 'а', 'ы', 'ов', 'ам', 'ах', 'ой', 'ый', 'ая', 'ие', 'ния', 'ость', 'ский', 'ать', 'ет', 'ют')
+
+
+def vocabulary_size(documents, mean_length=None):
+    """Размер словаря по закону Хипса для корпуса из documents публикаций."""
+    mean_length = mean_length or np.exp(LENGTH_MEAN + LENGTH_SIGMA ** 2 / 2)
+    return max(MIN_VOCABULARY, int(HEAPS_K * (documents * mean_length) ** HEAPS_BETA))
+
+
+def make_vocabulary(size, seed=0):
+    """
+    Словарь из size различных слов в порядке ранга: сначала COMMON_WORDS, затем псевдослова.
+
+    :param size: Количество слов
+    :param seed: Начальное значение генератора
+    """
+    rng = np.random.default_rng(seed)
+    words = dict.fromkeys(COMMON_WORDS[:size])
+    while len(words) < size:
+        batch = 2 * (size - len(words))
+        syllables = rng.integers(2, 5, size=batch)
+        consonants = rng.choice(_CONSONANTS, size=(batch, 4))
+        vowels = rng.choice(_VOWELS, size=(batch, 4))
+        endings = rng.choice(_ENDINGS, size=batch)
+        for i in range(batch):
+            word = ''.join(consonants[i, j] + vowels[i, j] for j in range(syllables[i])) + endings[i]
+            words.setdefault(word)
+            if len(words) == size:
+                break
+    return np.array(list(words), dtype=object)
+
+
+def zipf_cdf(size):
+    """Функция распределения рангов слов для закона Ципфа-Мандельброта."""
+    weights = 1.0 / (np.arange(size) + ZIPF_SHIFT) ** ZIPF_EXPONENT
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def iter_documents(count, seed=0, start_time=None, end_time=None, batch_size=10000, vocabulary=None):
+    """
+    Генерирует публикации порциями (память ограничена одной порцией).
+
+    :param count: Количество публикаций
+    :param seed: Начальное значение генератора
+    :param start_time: Начало периода дат публикаций (unix time, по умолчанию 2024-01-01 UTC)
+    :param end_time: Конец периода (по умолчанию 2024-12-31)
+    :param batch_size: Публикаций в порции (корпус зависит от seed и batch_size)
+    :param vocabulary: Словарь по рангу (по умолчанию make_vocabulary(vocabulary_size(count), seed))
+    :return: Генератор списков записей с полями id, owner_id, university, date, text, likes, views
+    """
+    start_time = start_time or int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp())
+    end_time = end_time or int(datetime(2024, 12, 31, 23, 59, tzinfo=timezone.utc).timestamp())
+    if vocabulary is None:
+        vocabulary = make_vocabulary(vocabulary_size(count), seed)
+    cdf = zipf_cdf(len(vocabulary))
+    university_weights = 1.0 / np.arange(1, len(UNIVERSITIES) + 1)
+    university_weights /= university_weights.sum()
+    rng = np.random.default_rng(seed + 1)
+
+    for first in range(0, count, batch_size):
+        size = min(batch_size, count - first)
+        lengths = np.clip(rng.lognormal(LENGTH_MEAN, LENGTH_SIGMA, size).astype(np.int64), 1, MAX_LENGTH)
+        words = vocabulary[np.minimum(np.searchsorted(cdf, rng.random(int(lengths.sum()))), len(cdf) - 1)]
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        universities = rng.choice(len(UNIVERSITIES), size=size, p=university_weights)
+        dates = rng.integers(start_time, end_time + 1, size=size)
+        views = rng.lognormal(6.0, 1.2, size).astype(np.int64)
+        likes = rng.binomial(views, 0.03)
+        yield [
+            {
+                'id': first + i + 1,
+                'owner_id': -1 - int(universities[i]),
+                'university': UNIVERSITIES[universities[i]],
+                'date': int(dates[i]),
+                'text': ' '.join(words[bounds[i]:bounds[i + 1]]),
+                'likes': {'count': int(likes[i])},
+                'views': {'count': int(views[i])},
+            }
+            for i in range(size)
+        ]
+
+
+def make_corpus(count, seed=0, **kwargs):
+    """Корпус из count публикаций массивом объектов, как np.load('vk_array.npy') (см. iter_documents)."""
+    corpus = np.empty(count, dtype=object)
+    position = 0
+    for batch in iter_documents(count, seed, **kwargs):
+        corpus[position:position + len(batch)] = batch
+        position += len(batch)
+    return corpus
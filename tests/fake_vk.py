@@ -0,0 +1,227 @@
+"""
+Локальная заглушка VK API для офлайн-тестов сборщиков.
+
+Реализует newsfeed.search с теми же параметрами и ограничениями, что и VK:
+поиск по подстроке в периоде [start_time, end_time], сортировка по убыванию
+даты, пагинация через offset или next_from и не более 1000 результатов на запрос.
+Метод execute понимает код вида `return [API.newsfeed.search({...}), ...];`,
+который формирует сборщик. FakeVkServer отдает ту же заглушку по HTTP
+для тестов клиента vk_client.py.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from datetime import datetime
+
+import vk_api
+from aiohttp import web
+
+MAX_SEARCH_RESULTS = 1000
+MAX_EXECUTE_CALLS = 25
+
+
+def make_posts(query, count, start_time, end_time, seed=0, owner_id=-1):
+    """Генерирует count публикаций с упоминанием query, равномерно распределенных по периоду."""
+    rng = random.Random(seed)
+    posts = []
+    for post_id in range(1, count + 1):
+        posts.append({
+            'id': post_id,
+            'owner_id': owner_id,
+            'from_id': rng.randint(1, count // 2 + 1),
+            'date': rng.randint(start_time, end_time),
+            'text': f"Новости {query}: запись {post_id}",
+            'likes': {'count': rng.randint(0, 50)},
+            'views': {'count': rng.randint(0, 1000)},
+            'reposts': {'count': rng.randint(0, 5)},
+            'comments': {'count': rng.randint(0, 10)},
+        })
+    return posts
+
+
+def ts(*args):
+    return int(datetime(*args).timestamp())
+
+
+class FakeNewsfeed:
+    def __init__(self, api):
+        self.api = api
+
+    def search(self, q, start_time=0, end_time=2 ** 31, count=30, offset=0, start_from=None):
+        return self.api.call('newsfeed.search', {
+            'q': q, 'start_time': start_time, 'end_time': end_time,
+            'count': count, 'offset': offset, 'start_from': start_from,
+        })
+
+
+class FakeVkApi:
+    """
+    Заглушка объекта, который возвращает vk_api.VkApi(...).get_api().
+
+    :param posts: Публикации, по которым идет поиск
+    :param latency: Искусственная задержка ответа в секундах (имитация сети)
+    :param fail_execute: execute всегда завершается ошибкой API
+    :param fail_items: Номера вызовов внутри execute, для которых возвращается false
+    :param fail_after: После стольких запросов каждый следующий падает с ConnectionError (имитация сбоя сети)
+    :param fail_calls: Номера одиночных вызовов (по порядку в calls), завершающихся ошибкой API
+    """
+
+    def __init__(self, posts, latency=0.0, fail_execute=False, fail_items=(), fail_after=None, fail_calls=()):
+        self.posts = sorted(posts, key=lambda post: post['date'], reverse=True)
+        self.latency = latency
+        self.fail_execute = fail_execute
+        self.fail_items = set(fail_items)
+        self.fail_after = fail_after
+        self.fail_calls = set(fail_calls)
+        self.calls = []
+        # Одновременно выполняемые вызовы (сейчас и максимум за все время)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.newsfeed = FakeNewsfeed(self)
+
+    def _record(self, method, params):
+        with self._lock:
+            if self.fail_after is not None and len(self.calls) >= self.fail_after:
+                raise ConnectionError("Сбой сети в заглушке VK API")
+            self.calls.append((method, dict(params), time.monotonic()))
+            return len(self.calls) - 1
+
+    def _wait(self):
+        # Искусственная задержка ответа с подсчетом одновременных вызовов
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def call(self, method, params):
+        number = self._record(method, params)
+        self._wait()
+        if number in self.fail_calls:
+            raise self.api_error(method, params, 10, 'Internal server error')
+        return self.search(**params)
+
+    def execute(self, code):
+        self._record('execute', {'code': code})
+        self._wait()
+        if self.fail_execute:
+            raise self.api_error('execute', {'code': code}, 13, 'Runtime error occurred during code invocation')
+
+        decoder = json.JSONDecoder()
+        marker = 'API.newsfeed.search('
+        results = []
+        position = code.find(marker)
+        while position != -1:
+            params, end = decoder.raw_decode(code, position + len(marker))
+            results.append(False if len(results) in self.fail_items else self.search(**params))
+            position = code.find(marker, end)
+        if len(results) > MAX_EXECUTE_CALLS:
+            raise self.api_error('execute', {'code': code}, 13, 'Too many API calls')
+        return results
+
+    @staticmethod
+    def api_error(method, values, code, message):
+        return vk_api.exceptions.ApiError(None, method, values, False, {'error_code': code, 'error_msg': message})
+
+    def search(self, q, start_time=0, end_time=2 ** 31, count=30, offset=0, start_from=None):
+        matches = [
+            post for post in self.posts
+            if q.lower() in post['text'].lower() and start_time <= post['date'] <= end_time
+        ]
+        position = int(start_from) if start_from else offset
+        limit = min(len(matches), MAX_SEARCH_RESULTS)
+        items = matches[position:min(position + count, limit)]
+        response = {'items': items, 'count': len(items), 'total_count': len(matches)}
+        if position + count < limit:
+            response['next_from'] = str(position + count)
+        return response
+
+    def call_times(self, method=None):
+        return [call_time for name, _, call_time in self.calls if method in (None, name)]
+
+    def count_calls(self, method):
+        return sum(1 for name, _, _ in self.calls if name == method)
+
+
+class FakeVkServer:
+    """
+    Локальный HTTP-сервер с протоколом VK API поверх FakeVkApi.
+
+    Принимает POST /method/<имя метода>, отвечает {"response": ...} или
+    {"error": {...}}. Через errors можно задать коды ошибок, которыми сервер
+    ответит на первые запросы (для проверки повторов).
+
+    :param api: FakeVkApi, который обрабатывает вызовы
+    :param errors: Ошибки для первых len(errors) запросов: код ошибки VK,
+        'disconnect' (сервер закрывает соединение без ответа) или 'HTTP 503' (статус HTTP)
+    """
+
+    SEARCH_INT_PARAMS = ('start_time', 'end_time', 'count', 'offset')
+
+    def __init__(self, api, errors=()):
+        self.api = api
+        self.errors = list(errors)
+        self.requests = []
+        self.url = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runner = None
+
+    async def _handle(self, request):
+        method = request.match_info['method']
+        params = dict(await request.post())
+        self.requests.append((method, dict(params)))
+        if self.errors:
+            code = self.errors.pop(0)
+            if code == 'disconnect':
+                request.transport.close()
+                return web.Response()
+            if isinstance(code, str) and code.startswith('HTTP '):
+                return web.Response(status=int(code[5:]))
+            return web.json_response({'error': {'error_code': code, 'error_msg': f"Ошибка {code}"}})
+        token, version = params.pop('access_token', None), params.pop('v', None)
+        if not token or not version:
+            return web.json_response({'error': {'error_code': 5, 'error_msg': 'User authorization failed'}})
+
+        try:
+            if method == 'execute':
+                result = await asyncio.to_thread(self.api.execute, params['code'])
+            elif method == 'newsfeed.search':
+                for name in self.SEARCH_INT_PARAMS:
+                    if name in params:
+                        params[name] = int(params[name])
+                result = await asyncio.to_thread(self.api.call, method, params)
+            else:
+                return web.json_response({'error': {'error_code': 3, 'error_msg': 'Unknown method passed'}})
+        except vk_api.exceptions.ApiError as e:
+            return web.json_response({'error': e.error})
+        return web.json_response({'response': result})
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_post('/method/{method}', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/method/"
+
+    def __enter__(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
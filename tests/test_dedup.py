@@ -0,0 +1,66 @@
+# python -m pytest tests/test_dedup.py — удаление дубликатов и почти-дубликатов
+
+import random
+import unittest
+
+import numpy as np
+
+from dedup import Deduplicator, MinHasher, deduplicate, normalize_text, shingles
+from post_store import PostStore
+from fake_vk import make_posts, ts
+
+BASE = ("Студенты СПбГУ победили на всероссийской олимпиаде по программированию "
+        "и получили гранты на обучение в магистратуре университета")
+
+
+class TestDeduplication(unittest.TestCase):
+    def test_normalization_and_shingles(self):
+        self.assertEqual(normalize_text("  Привет,  МИР!! "), "привет мир")
+        self.assertEqual(shingles("один два", size=3), ["один два"])
+        self.assertEqual(len(shingles(BASE, size=3)), len(BASE.split()) - 2)
+
+    def test_minhash_estimates_jaccard(self):
+        rng = random.Random(0)
+        words = [f"слово{i}" for i in range(500)]
+        first = [rng.choice(words) for _ in range(200)]
+        second = first[:150] + [rng.choice(words) for _ in range(50)]
+        hasher = MinHasher(num_perm=256)
+        first_set, second_set = set(shingles(" ".join(first))), set(shingles(" ".join(second)))
+        exact = len(first_set & second_set) / len(first_set | second_set)
+        estimate = MinHasher.similarity(hasher.signature(" ".join(first)), hasher.signature(" ".join(second)))
+        self.assertLess(abs(estimate - exact), 0.1)
+
+    def test_exact_and_near_duplicates(self):
+        records = [
+            {"text": BASE},
+            {"text": "Приемная комиссия МГУ начинает работу первого июня"},
+            {"text": BASE.upper() + "!!!"},
+            {"text": BASE + " подробнее"},
+            {"text": ""},
+            {"text": ""},
+        ]
+        unique, clusters = deduplicate(records)
+        self.assertEqual([record["text"] for record in unique], [BASE, records[1]["text"], ""])
+        self.assertEqual(clusters.tolist(), [0, 1, 0, 0, 2, 2])
+
+        exact_only, clusters = deduplicate(records, near_duplicates=False)
+        self.assertEqual(len(exact_only), 4)
+        self.assertEqual(clusters.tolist(), [0, 1, 0, 2, 3, 3])
+
+    def test_streaming_cluster_numbers(self):
+        deduplicator = Deduplicator()
+        results = [deduplicator.add(text) for text in ["раз два три четыре", BASE, BASE, "раз два три четыре"]]
+        self.assertEqual(results, [(0, False), (1, False), (1, True), (0, True)])
+
+    def test_store_cluster_ids(self):
+        posts = make_posts("СПбГУ", 20, ts(2023, 1, 1), ts(2023, 12, 31), seed=61)
+        reposts = [dict(post, id=post["id"] + 100, owner_id=-7) for post in posts[:5]]
+        store = PostStore()
+        store.append_posts("СПбГУ", posts + reposts)
+        clusters = store.cluster_ids()
+        self.assertEqual(clusters[20:].tolist(), list(range(5)))
+        self.assertEqual(int(np.count_nonzero(clusters == np.arange(len(store)))), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+# python -m pytest tests/test_fake_corpus.py — синтетический корпус для бенчмарков индекса
+
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from fake_corpus import COMMON_WORDS, UNIVERSITIES, iter_documents, make_corpus, make_vocabulary, vocabulary_size
+from index import IndexBuilder
+
+
+class TestFakeCorpus(unittest.TestCase):
+    def test_same_seed_same_corpus(self):
+        first = make_corpus(300, seed=3)
+        self.assertEqual(list(first), list(make_corpus(300, seed=3)))
+        self.assertNotEqual(list(first), list(make_corpus(300, seed=4)))
+        batches = list(iter_documents(300, seed=3, batch_size=128))
+        self.assertEqual([len(batch) for batch in batches], [128, 128, 44])
+        self.assertEqual([record for batch in batches for record in batch], list(make_corpus(300, seed=3, batch_size=128)))
+
+    def test_vocabulary(self):
+        vocabulary = make_vocabulary(20000, seed=1)
+        self.assertEqual(len(set(vocabulary)), 20000)
+        self.assertEqual(tuple(vocabulary[:len(COMMON_WORDS)]), COMMON_WORDS)
+        self.assertLess(vocabulary_size(10 ** 4), vocabulary_size(10 ** 6))
+
+    def test_zipf_frequencies_and_metadata(self):
+        corpus = make_corpus(5000, seed=2)
+        counts = Counter(word for record in corpus for word in record['text'].split())
+        frequencies = np.array(sorted(counts.values(), reverse=True), dtype=float)
+        # Наклон log(частота) от log(ранг) около -1, как у текстов на естественном языке
+        ranks = np.arange(10, 1000)
+        slope = np.polyfit(np.log(ranks + 1), np.log(frequencies[ranks]), 1)[0]
+        self.assertTrue(-1.3 < slope < -0.8, slope)
+        self.assertEqual(counts.most_common(1)[0][0], 'и')
+
+        lengths = np.array([len(record['text'].split()) for record in corpus])
+        self.assertTrue(20 < np.median(lengths) < 50)
+        self.assertGreater(lengths.max(), 5 * np.median(lengths))
+        self.assertTrue({record['university'] for record in corpus} <= set(UNIVERSITIES))
+        self.assertTrue(all(record['likes']['count'] <= record['views']['count'] for record in corpus))
+
+    def test_corpus_builds_index(self):
+        builder = IndexBuilder()
+        builder.data = make_corpus(2000, seed=5)
+        builder.create_inverted_index()
+        self.assertEqual(len(builder.data), 2000)
+        self.assertIn('университет', builder.inverted_index)
+
+
+if __name__ == '__main__':
+    unittest.main()
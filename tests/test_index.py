@@ -0,0 +1,465 @@
+# python -m pytest tests/test_index.py — пакет index: кодек, построение и чтение двоичного индекса
+
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from index import IndexBuilder, IndexReader, build_postings, decode_postings, encode_postings, serialize_index, write_index
+from index.bitmap import ARRAY, BITMAP, RUN, RoaringBitmap
+from index.codec import encoded_bits
+from index.docstore import DocumentStore, build_store, highlight, match_spans, snippet
+from index.lexicon import term_kgrams
+from index.reorder import ORDERS, bp_order, doc_term_matrix, document_order
+from search_index import IndexSearcher
+from fake_vk import ts
+
+RECORDS = [
+    {'text': 'декан студент факультет'},
+    {'text': 'декан преподаватель декан'},
+    {'text': 'преподаватель экзамен'},
+    {'text': ''},
+    {'text': 'ёлка студент'},
+]
+
+
+class TestCodec(unittest.TestCase):
+    def test_round_trip(self):
+        rng = random.Random(7)
+        for size in (0, 1, 2, 10, 500):
+            doc_ids = sorted(rng.sample(range(1_000_000), size))
+            packed = encode_postings(doc_ids)
+            self.assertEqual(len(packed), (encoded_bits(doc_ids) + 7) // 8)
+            self.assertEqual(decode_postings(packed, size).tolist(), doc_ids)
+
+    def test_dense_list_is_small(self):
+        # Подряд идущие документы кодируются одним битом на номер
+        self.assertEqual(len(encode_postings(range(800))), 100)
+
+
+class TestIndexFormat(unittest.TestCase):
+    def setUp(self):
+        self.postings = build_postings(RECORDS)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'index.idx')
+        # Плотность 0.5: в маленьком корпусе все термины остаются сжатыми списками
+        write_index(self.path, self.postings, len(RECORDS), {'clusters': [0, 1, 1]}, bitmap_density=0.5)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build_postings_without_repeats(self):
+        self.assertEqual(self.postings['декан'], [0, 1])
+        self.assertEqual(self.postings['студент'], [0, 4])
+
+    def test_reader_round_trip(self):
+        with IndexReader(self.path) as reader:
+            self.assertEqual(reader.doc_count, 5)
+            self.assertEqual(sorted(reader.terms()), sorted(self.postings))
+            for term, doc_ids in self.postings.items():
+                self.assertEqual(reader.postings(term).tolist(), doc_ids)
+                self.assertEqual(reader.decode(term).tolist(), doc_ids)
+            self.assertNotIn('аспирант', reader)
+            self.assertEqual(reader.search('аспирант')['count'], 0)
+            self.assertEqual(reader.metadata, {'clusters': [0, 1, 1]})
+
+    def test_compressed_postings_are_zero_copy(self):
+        with IndexReader(self.path) as reader:
+            packed = reader.compressed_postings('декан')
+            self.assertTrue(packed.readonly)
+            self.assertEqual(bytes(packed), encode_postings([0, 1]))
+            packed.release()
+
+    def test_only_compressed_postings_are_stored(self):
+        with IndexReader(self.path) as reader:
+            sizes = reader.sizes()
+        self.assertEqual(sizes['uncompressed_bytes'], 4 * sum(map(len, self.postings.values())))
+
+    def test_decoded_lists_cache_is_bounded(self):
+        with IndexReader(self.path, cache_size=2) as reader:
+            first = reader.postings('декан')
+            self.assertIs(reader.postings('декан'), first)
+            self.assertFalse(first.flags.writeable)
+            reader.postings('студент')
+            reader.postings('экзамен')
+            self.assertEqual(reader.cache_info(), {'hits': 1, 'misses': 3, 'size': 2, 'max_size': 2})
+            # 'декан' вытеснен как давно не использованный
+            self.assertIsNot(reader.postings('декан'), first)
+            self.assertEqual(reader.search('декан', compressed=False)['results'], [0, 1])
+        with IndexReader(self.path, cache_size=0) as reader:
+            reader.postings('декан')
+            self.assertEqual(reader.cache_info()['size'], 0)
+
+    def test_compressed_flag_for_all_queries(self):
+        with IndexReader(self.path) as reader:
+            queries = ('декан студент', 'преподаватель экзамен', 'дек*', 'декаан~')
+            results = [reader.search(query, compressed=True)['results'] for query in queries]
+            self.assertEqual(results, [[0], [2], [0, 1], [0, 1]])
+            # Распакованные списки кэшируются только в режиме compressed=False
+            self.assertEqual(reader.cache_info()['size'], 0)
+            self.assertEqual([reader.search(query, compressed=False)['results'] for query in queries], results)
+            self.assertEqual(reader.cache_info()['size'], 4)
+
+    def test_bytes_match_file(self):
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), serialize_index(self.postings, len(RECORDS), {'clusters': [0, 1, 1]}, bitmap_density=0.5))
+        # Поток пар (термин, список) по возрастанию терминов дает тот же файл
+        items = sorted(self.postings.items(), key=lambda item: item[0].encode('utf-8'))
+        self.assertEqual(serialize_index(iter(items), len(RECORDS), bitmap_density=0.5),
+                         serialize_index(self.postings, len(RECORDS), bitmap_density=0.5))
+        with self.assertRaises(ValueError):
+            serialize_index(iter(items[::-1]), len(RECORDS))
+        with self.assertRaises(ValueError):
+            serialize_index(iter(items))
+
+    def test_builder_and_searcher(self):
+        data_file = os.path.join(self.tmp.name, 'data.npy')
+        np.save(data_file, np.array(RECORDS * 10000), allow_pickle=True)
+        builder = IndexBuilder(data_file=data_file)
+        builder.save(self.path)
+        searcher = IndexSearcher(index_file=self.path)
+        result = searcher.search('экзамен')
+        self.assertEqual(result['count'], 10000)
+        self.assertEqual(result['results'][:2], [2, 7])
+        # Несжатые списки не хранятся: списки в файле меньше их несжатого размера
+        sizes = searcher.load_index().sizes()
+        self.assertLess(sizes['compressed_bytes'], sizes['uncompressed_bytes'] / 4)
+        metrics = searcher.evaluate('декан')
+        self.assertEqual(metrics['results_count'], 20000)
+        self.assertLess(metrics['compression_ratio'], 0.5)
+        searcher.close()
+
+    def test_query_uses_index_tokenizer(self):
+        records = [{'text': 'Декан СПбГУ: студенты!', 'date': 1}, {'text': 'декан, МГУ', 'date': 2}]
+        data_file = os.path.join(self.tmp.name, 'punct.npy')
+        np.save(data_file, np.array(records), allow_pickle=True)
+        with IndexReader(IndexBuilder(data_file=data_file).to_bytes()) as reader:
+            self.assertEqual(reader.tokenizer, 'normalize')
+            self.assertNotIn('СПбГУ:', reader)
+            self.assertEqual(reader.search('декан')['count'], 12)
+            # Запрос разбивается как тексты: регистр и знаки препинания не важны
+            self.assertEqual(reader.search('Декан,')['count'], 12)
+            self.assertEqual(reader.search('СПбГУ: студенты')['count'], 6)
+            self.assertEqual(reader.search('СПБГУ*')['count'], 6)
+            self.assertEqual(reader.search('Студенты~1')['count'], 6)
+        with IndexReader(IndexBuilder(data_file=data_file, tokenizer='split').to_bytes()) as reader:
+            self.assertEqual(reader.tokenizer, 'split')
+            self.assertEqual(reader.search('декан')['count'], 0)
+            self.assertEqual(reader.search('декан,')['count'], 6)
+        # Индекс без ключа tokenizer построен разбиением по пробелам
+        with IndexReader(self.path) as reader:
+            self.assertEqual(reader.tokenizer, 'split')
+
+
+
+class TestRoaringBitmap(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.sparse = np.unique(rng.integers(0, 300000, 2000)).astype(np.uint32)
+        self.dense = np.unique(rng.integers(0, 300000, 150000)).astype(np.uint32)
+        self.runs = np.arange(70000, 140000, dtype=np.uint32)
+
+    def test_containers_and_round_trip(self):
+        self.assertEqual(set(RoaringBitmap.from_array(self.sparse).kinds.tolist()), {ARRAY})
+        self.assertEqual(set(RoaringBitmap.from_array(self.dense).kinds.tolist()), {BITMAP})
+        self.assertEqual(set(RoaringBitmap.from_array(self.runs).kinds.tolist()), {RUN})
+        for doc_ids in (self.sparse, self.dense, self.runs, np.empty(0, dtype=np.uint32)):
+            bitmap = RoaringBitmap.from_array(doc_ids)
+            self.assertEqual(len(bitmap), len(doc_ids))
+            restored = RoaringBitmap.frombuffer(bitmap.to_bytes())
+            np.testing.assert_array_equal(restored.to_array(), doc_ids)
+
+    def test_boolean_operations(self):
+        arrays = (self.sparse, self.dense, self.runs)
+        for a in arrays:
+            for b in arrays:
+                left, right = RoaringBitmap.from_array(a), RoaringBitmap.from_array(b)
+                np.testing.assert_array_equal((left & right).to_array(), np.intersect1d(a, b))
+                np.testing.assert_array_equal((left | right).to_array(), np.union1d(a, b))
+        bitmap = RoaringBitmap.from_array(self.runs)
+        self.assertIn(70000, bitmap)
+        self.assertNotIn(140000, bitmap)
+
+    def test_dense_terms_stored_as_bitmaps(self):
+        records = [{'text': 'спбгу ' + ('ректор' if i % 3 == 0 else 'декан') + (' олимпиада' if i % 1000 == 0 else '')}
+                   for i in range(30000)]
+        postings = build_postings(records)
+        with IndexReader(serialize_index(postings, len(records))) as reader:
+            self.assertTrue(reader.is_bitmap('спбгу'))
+            self.assertTrue(reader.is_bitmap('ректор'))
+            self.assertFalse(reader.is_bitmap('олимпиада'))
+            for term, doc_ids in postings.items():
+                self.assertEqual(reader.decode(term).tolist(), doc_ids)
+            # Весь корпус в одном битовом множестве из участков - десятки байт
+            self.assertLess(len(reader.compressed_postings('спбгу')), 64)
+            self.assertEqual(reader.search('ректор олимпиада')['results'], list(range(0, 30000, 3000)))
+            self.assertEqual(reader.search('спбгу ректор')['count'], 10000)
+            self.assertEqual(reader.search('ректор аспирант')['count'], 0)
+            self.assertEqual(len(reader.union(['ректор', 'декан'])), 30000)
+
+
+
+class TestLexicon(unittest.TestCase):
+    def setUp(self):
+        records = [
+            {'text': 'университет спбгу ректор'},
+            {'text': 'университета спбгу-2024 проректор'},
+            {'text': 'университеты мгу декан'},
+            {'text': 'униврситет мгу'},
+        ]
+        self.reader = IndexReader(serialize_index(build_postings(records), len(records)))
+
+    def tearDown(self):
+        self.reader.close()
+
+    def test_prefix_and_wildcard(self):
+        self.assertEqual(self.reader.lexicon.prefix('спбгу'), ['спбгу', 'спбгу-2024'])
+        self.assertEqual(self.reader.expand('спбгу*'), ['спбгу', 'спбгу-2024'])
+        self.assertEqual(sorted(self.reader.expand('у*т')), ['университет', 'униврситет'])
+        self.assertEqual(sorted(self.reader.expand('*ректор')), ['проректор', 'ректор'])
+        self.assertEqual(self.reader.expand('р?ктор'), ['ректор'])
+        self.assertEqual(self.reader.expand('*'), [])
+        self.assertEqual(len(self.reader.expand('*е*', max_expansions=2)), 2)
+
+    def test_fuzzy(self):
+        self.assertEqual(self.reader.lexicon.fuzzy('униврситет', 1), [('униврситет', 0), ('университет', 1)])
+        self.assertEqual(sorted(self.reader.expand('унивеситет~')),
+                         ['университет', 'университета', 'университеты', 'униврситет'])
+        # Короткие слова допускают меньше опечаток
+        self.assertEqual(self.reader.expand('мгв~'), ['мгу'])
+        self.assertEqual(self.reader.expand('мг~'), [])
+        # Отбор по k-граммам и обход словаря автоматом Левенштейна находят одно и то же
+        lexicon = self.reader.lexicon
+        kgrams = term_kgrams('униврситетт')
+        self.assertEqual(sorted(lexicon._fuzzy_by_kgrams('униврситетт', kgrams, len(kgrams) - 6, 2)),
+                         sorted(lexicon._fuzzy_by_automaton('униврситетт', 2)))
+
+    def test_search_with_expansions(self):
+        result = self.reader.search('университет* мгу')
+        self.assertEqual(result['results'], [2])
+        self.assertEqual(result['terms'], ['университет', 'университета', 'университеты', 'мгу'])
+        self.assertEqual(self.reader.search('униврситт~1')['results'], [3])
+        self.assertEqual(self.reader.search('спбгу*')['count'], 2)
+
+    def test_literal_terms_with_wildcard_chars(self):
+        records = [{'text': 'зачем? поступать'}, {'text': 'зачем! поступать'}, {'text': 'зачем поступать*'}]
+        with IndexReader(serialize_index(build_postings(records), len(records))) as reader:
+            # Термин словаря с '?' или '*' ищется как есть, а не как шаблон
+            result = reader.search('зачем?')
+            self.assertEqual(result['results'], [0])
+            self.assertEqual(result['terms'], ['зачем?'])
+            self.assertEqual(reader.search('зачем? поступать')['results'], [0])
+            self.assertEqual(reader.expand('поступать*'), ['поступать*'])
+            # Без такого термина '?' и '*' остаются шаблоном
+            self.assertEqual(sorted(reader.expand('заче?')), ['зачем'])
+            self.assertEqual(reader.search('заче??')['results'], [0, 1])
+
+
+
+class TestDocumentFilters(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.records = [
+            {'text': ('ректор спбгу' if i % 4 == 0 else 'студент олимпиада' if i % 23 == 0 else 'новости спбгу') + f' №{i}',
+             'date': int(rng.integers(ts(2024, 1, 1), ts(2025, 1, 1))),
+             'university': ('СПбГУ', 'МГУ', 'ИТМО')[i % 3],
+             'likes': {'count': i % 50},
+             'views': i % 1000}
+            for i in range(3000)
+        ]
+        self.tmp = tempfile.TemporaryDirectory()
+        data_file = os.path.join(self.tmp.name, 'data.npy')
+        np.save(data_file, np.array(self.records * 14), allow_pickle=True)
+        self.builder = IndexBuilder(data_file=data_file, dedupe=True)
+        self.path = os.path.join(self.tmp.name, 'index.idx')
+        self.builder.save(self.path)
+        self.reader = IndexReader(self.path)
+
+    def tearDown(self):
+        self.reader.close()
+        self.tmp.cleanup()
+
+    def expected(self, word, start, end, university=None, min_likes=0):
+        # Номера исходных записей в порядке номеров документов (по дате)
+        order = sorted(range(len(self.records)), key=lambda i: self.records[i]['date'])
+        return [i for i in order
+                if word in self.records[i]['text'].split() and start <= self.records[i]['date'] <= end
+                and university in (None, self.records[i]['university'])
+                and self.records[i]['likes']['count'] >= min_likes]
+
+    def test_documents_sorted_by_date(self):
+        dates = self.reader.column('date')
+        self.assertEqual(len(dates), 3000)
+        self.assertTrue(np.all(np.diff(dates) >= 0))
+        self.assertCountEqual(self.reader.universities, ['СПбГУ', 'МГУ', 'ИТМО'])
+        # Кластеры дубликатов указывают на документы с тем же текстом после перенумерации
+        self.assertEqual(len(self.builder.cluster_ids), 42000)
+        self.assertEqual(self.builder.data[self.builder.cluster_ids[5]]['date'], self.records[5]['date'])
+
+    def test_time_range_is_doc_range(self):
+        start, end = ts(2024, 3, 1), ts(2024, 3, 31, 23, 59)
+        first, stop = self.reader.doc_range(start, end)
+        dates = self.reader.column('date')
+        self.assertTrue(np.all((dates[first:stop] >= start) & (dates[first:stop] <= end)))
+        self.assertEqual(stop - first, int(np.count_nonzero((dates >= start) & (dates <= end))))
+
+    def test_filtered_search(self):
+        start, end = ts(2024, 3, 1), ts(2024, 3, 31, 23, 59)
+        self.assertTrue(self.reader.is_bitmap('спбгу'))
+        self.assertFalse(self.reader.is_bitmap('олимпиада'))
+        for word in ('ректор', 'спбгу', 'олимпиада'):
+            result = self.reader.search(word, start=start, end=end, university='МГУ')
+            self.assertEqual(result['results'], self.expected(word, start, end, 'МГУ'))
+        result = self.reader.search('ректор спбгу', start=start, end=end, min_likes=25)
+        self.assertEqual(result['results'], self.expected('ректор', start, end, min_likes=25))
+        for compressed in (True, False):
+            result = self.reader.search('ректор олимпиада', start=start, end=end, compressed=compressed)
+            self.assertEqual(result['results'], sorted(set(self.expected('ректор', start, end))
+                                                       & set(self.expected('олимпиада', start, end))))
+        self.assertEqual(self.reader.search('', university='ИТМО')['count'], 1000)
+        self.assertEqual(self.reader.search('ректор', university='РАН')['count'], 0)
+
+    def test_decoding_stops_at_filter(self):
+        doc_ids = list(range(0, 1000, 3))
+        packed = encode_postings(doc_ids)
+        self.assertEqual(decode_postings(packed, len(doc_ids), stop=10).tolist(), [0, 3, 6, 9])
+
+
+class TestDocumentOrder(unittest.TestCase):
+    def setUp(self):
+        # Тексты из 20 тем, перемешанные: у каждой темы свой словарь
+        rng = np.random.default_rng(11)
+        topics = [[f'тема{topic}слово{word}' for word in range(30)] for topic in range(20)]
+        self.records = []
+        for i in range(2000):
+            topic = int(rng.integers(20))
+            words = rng.choice(topics[topic], size=8, replace=False).tolist()
+            self.records.append({'text': ' '.join(words + [f'№{i}']),
+                                 'date': int(rng.integers(ts(2024, 1, 1), ts(2025, 1, 1))),
+                                 'university': ('СПбГУ', 'МГУ', 'ИТМО')[i % 3]})
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_file = os.path.join(self.tmp.name, 'data.npy')
+        np.save(self.data_file, np.array(self.records), allow_pickle=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, order):
+        builder = IndexBuilder(data_file=self.data_file, bitmap_density=2.0, order=order)
+        path = os.path.join(self.tmp.name, f'{order}.idx')
+        builder.save(path)
+        return builder, IndexReader(path)
+
+    def test_orders_are_permutations(self):
+        for order in ORDERS:
+            permutation = document_order(self.records, order)
+            self.assertEqual(sorted(permutation.tolist()), list(range(len(self.records))))
+        with self.assertRaises(ValueError):
+            document_order(self.records, 'url')
+
+    def test_bp_order_groups_topics(self):
+        indptr, indices = doc_term_matrix(self.records)
+        self.assertEqual(indptr[-1], len(indices))
+        order = bp_order(indptr, indices)
+        topic = [self.records[i]['text'].split()[0].split('слово')[0] for i in order]
+        changes = sum(first != second for first, second in zip(topic, topic[1:]))
+        # Для случайного порядка было бы около 1900 смен темы
+        self.assertLess(changes, 600)
+
+    def test_bp_index_is_smaller(self):
+        _, unordered = self.build('none')
+        _, clustered = self.build('bp')
+        with unordered, clustered:
+            self.assertEqual(clustered.doc_order, 'bp')
+            self.assertLess(clustered.sizes()['compressed_bytes'], unordered.sizes()['compressed_bytes'])
+            self.assertEqual(clustered.search('тема3слово7')['count'], unordered.search('тема3слово7')['count'])
+
+    def test_source_ids_map_to_records(self):
+        builder, reader = self.build('bp')
+        with reader:
+            self.assertEqual(len(reader.source_ids), len(builder.data))
+            result = reader.search('тема5слово1')
+            self.assertEqual(result['results'], [reader.source_id(doc_id) for doc_id in result['doc_ids']])
+            for doc_id, source_id in zip(result['doc_ids'], result['results']):
+                # load_data повторяет каждую запись маленького набора 6 раз подряд
+                source = self.records[source_id // 6]
+                self.assertEqual(source['text'], builder.data[doc_id]['text'])
+
+    def test_filters_without_date_order(self):
+        start, end = ts(2024, 3, 1), ts(2024, 8, 31, 23, 59)
+        builder, reader = self.build('university')
+        with reader:
+            with self.assertRaises(ValueError):
+                reader.doc_range(start, end)
+            result = reader.search('тема2слово4', start=start, end=end, university='МГУ')
+            expected = [doc_id for doc_id, record in enumerate(builder.data)
+                        if 'тема2слово4' in record['text'].split() and start <= record['date'] <= end
+                        and record['university'] == 'МГУ']
+            self.assertTrue(expected)
+            self.assertEqual(result['doc_ids'], expected)
+
+
+class TestDocumentStore(unittest.TestCase):
+    def setUp(self):
+        self.texts = [f'Новости №{i}: ректор СПбГУ ' + 'и ' * (i % 40) + 'олимпиада' for i in range(500)]
+
+    def open_store(self, block_size, cache_size=4):
+        table, blocks = build_store(self.texts, block_size)
+        offsets = np.zeros(len(blocks) + 1, dtype=np.uint64)
+        offsets[1:] = np.cumsum([len(block) for block in blocks])
+        return DocumentStore(table, offsets, memoryview(b''.join(blocks)), cache_size), blocks
+
+    def test_documents_round_trip(self):
+        store, blocks = self.open_store(block_size=1024)
+        self.assertGreater(len(blocks), 10)
+        self.assertLess(sum(len(block) for block in blocks), len(''.join(self.texts).encode('utf-8')) / 3)
+        for doc_id in (0, 1, 250, 499):
+            self.assertEqual(store.document(doc_id), self.texts[doc_id])
+        with self.assertRaises(IndexError):
+            store.document(500)
+
+    def test_one_block_per_document(self):
+        store, _ = self.open_store(block_size=1024, cache_size=2)
+        store.document(300)
+        self.assertEqual(store.cache_info()['misses'], 1)
+        # Соседний документ в том же блоке читается из кэша
+        store.document(301)
+        self.assertEqual(store.cache_info()['hits'], 1)
+        store.document(0)
+        store.document(100)
+        store.document(300)
+        self.assertEqual(store.cache_info()['misses'], 4)
+        self.assertEqual(store.cache_info()['size'], 2)
+
+    def test_highlight_and_snippet(self):
+        text = 'Ректор СПбГУ вручил дипломы. ' + 'слово ' * 50 + 'Олимпиада СПбГУ, финал: спбгу!'
+        self.assertEqual(len(match_spans(text, ['спбгу'])), 3)
+        self.assertEqual(highlight('Ректор СПбГУ, ректор', ['ректор']), '<b>Ректор</b> СПбГУ, <b>ректор</b>')
+        fragment = snippet(text, ['спбгу', 'олимпиада'], window=6, marks=('[', ']'))
+        self.assertEqual(fragment, '...слово слово [Олимпиада] [СПбГУ], финал: [спбгу]!')
+        self.assertEqual(snippet('один два три', ['пять'], window=2), 'один два...')
+
+    def test_reader_snippets(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        records = [{'text': text, 'date': i} for i, text in enumerate(self.texts)]
+        data_file = os.path.join(tmp.name, 'data.npy')
+        np.save(data_file, np.array(records), allow_pickle=True)
+        path = os.path.join(tmp.name, 'index.idx')
+        IndexBuilder(data_file=data_file, store_block_size=4096, tokenizer='split').save(path)
+        with IndexReader(path) as reader:
+            result = reader.search('№7:')
+            self.assertEqual(reader.document(result['results'][0]), self.texts[7])
+            fragments = reader.snippets(result['results'], result['terms'], window=3)
+            self.assertTrue(all(fragment.startswith('Новости <b>№7:</b>') for fragment in fragments.values()))
+        path = os.path.join(tmp.name, 'bare.idx')
+        IndexBuilder(data_file=data_file, store_block_size=0).save(path)
+        with IndexReader(path) as reader:
+            with self.assertRaises(ValueError):
+                reader.document(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
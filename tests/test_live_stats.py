@@ -0,0 +1,65 @@
+# python -m pytest tests/test_live_stats.py — живая статистика сбора и HyperLogLog
+
+import unittest
+
+import web
+from fake_vk import FakeVkApi, make_posts, ts
+from live_stats import HyperLogLog, StatsAccumulator
+from post_store import PostStore
+from rate_limiter import TokenBucket
+
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_estimate_is_close(self):
+        for count in (10, 1000, 50000):
+            hll = HyperLogLog(precision=12)
+            hll.update(range(count))
+            self.assertLess(abs(hll.count() - count) / count, 0.05)
+
+    def test_duplicates_and_merge(self):
+        first, second = HyperLogLog(), HyperLogLog()
+        first.update(range(5000))
+        estimate = first.count()
+        first.update(range(5000))
+        self.assertEqual(first.count(), estimate)
+
+        second.update(range(2500, 7500))
+        first.merge(second)
+        self.assertLess(abs(first.count() - 7500) / 7500, 0.05)
+        self.assertEqual(len(first.registers), 4096)
+
+
+class TestStatsAccumulator(unittest.TestCase):
+    def test_matches_store_summary(self):
+        posts = make_posts("СПбГУ", 2000, ts(2023, 1, 1), ts(2023, 12, 31), seed=51)
+        accumulator = StatsAccumulator(granularity='month')
+        for page in range(0, len(posts), 100):
+            accumulator.add_posts(posts[page:page + 100])
+
+        store = PostStore()
+        store.append_posts("СПбГУ", posts)
+        expected = store.view("СПбГУ").summary()
+        snapshot = accumulator.snapshot()
+        for key in ('posts_count', 'likes_count', 'views_count', 'reposts_count', 'comments_count'):
+            self.assertEqual(snapshot[key], expected[key])
+        self.assertLess(abs(snapshot['authors_count'] - expected['authors_count']) / expected['authors_count'], 0.05)
+
+        monthly = store.counts_table('month').loc["СПбГУ"]
+        self.assertEqual(list(snapshot['histogram'].values()), [int(count) for count in monthly])
+
+    def test_collector_reports_progress(self):
+        posts = make_posts("МГУ", 3000, ts(2023, 1, 1), ts(2023, 12, 31, 23, 59), seed=52)
+        updates = []
+        collector = web.VKUniversityMentionsCollector(
+            "", api=FakeVkApi(posts), rate_limiter=TokenBucket(rate=10000), max_workers=2, use_execute=False,
+            on_progress=lambda university, snapshot: updates.append(snapshot['posts_count'])
+        )
+        collector.search_posts_adaptive("МГУ", ts(2023, 1, 1), ts(2023, 12, 31, 23, 59))
+
+        self.assertGreater(len(updates), 1)
+        self.assertEqual(updates, sorted(updates))
+        self.assertEqual(collector.live_snapshot()["МГУ"]['posts_count'], 3000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,15 @@
 # python -m unittest test_parser.py -v чтобы запустить тесты подробно
 
+import contextlib
+import io
 import unittest
 import os
-from parser import Parser
+import shutil
+import stat
+import tempfile
+import zipfile
+from unittest import mock
+from parser import Parser, detect_mime, normalize_link, normalize_links, EXTENSION_MIME, MIME_DJVU, MIME_DOCX, MIME_EPUB, MIME_HTML, MIME_ODT, MIME_PDF, MIME_RTF, MIME_TXT
 from colorama import Fore, Style, init
 import time
 import re
@@ -69,6 +76,39 @@ class TestParser(unittest.TestCase):
         self.print_status(successful_files, "извлечение текста из HTML", len(successful_files) > 0)
         self.assertGreater(len(successful_files), 0, "Ни один HTML-файл не был успешно обработан.")
 
+    def test_fast_html_matches_bs4(self):
+        """Тест: Потоковый HTML-экстрактор совпадает с BeautifulSoup и не пропускает script/style"""
+        if not self.test_files["html"]:
+            self.skipTest("Файлы .html не найдены.")
+
+        for filename in self.test_files["html"]:
+            file_path = os.path.join(self.test_folder, filename)
+            fast_text, links = self.parser.extract_html(file_path)
+            self.assertEqual(fast_text, self.parser.extract_text_from_html(file_path, fast=False), filename)
+            self.assertIsInstance(links, list)
+
+        self.print_status(self.test_files["html"], "потоковое извлечение текста из HTML", True)
+
+    def test_fast_html_chunk_boundaries(self):
+        """Тест: Слова на границе блоков чтения не разрываются (сравнение с BeautifulSoup)"""
+        if not self.test_files["html"]:
+            self.skipTest("Файлы .html не найдены.")
+
+        for chunk_size in (7, 1000):
+            with mock.patch("parser.HTML_READ_CHUNK_SIZE", chunk_size):
+                for filename in self.test_files["html"]:
+                    file_path = os.path.join(self.test_folder, filename)
+                    fast_text, _ = self.parser.extract_html(file_path)
+                    self.assertEqual(fast_text, self.parser.extract_text_from_html(file_path, fast=False),
+                                     f"{filename}, блок {chunk_size}")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            file_path = os.path.join(tmp, "long.html")
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write("<html><body><p>" + "слово " * 20000 + "</p></body></html>")
+            text, _ = Parser(tmp).extract_html(file_path)
+            self.assertEqual(text.split(), ["слово"] * 20000)
+
     def test_extract_text_from_pdf(self):
         """Тест: Извлечение текста из PDF"""
         if not self.test_files["pdf"]:
@@ -261,5 +301,323 @@ class TestParser(unittest.TestCase):
         print("="*60 + "\n")
 
 
+FAKE_DJVUTXT = """#!/bin/sh
+page=all
+for arg in "$@"; do
+    case "$arg" in
+        --page=*) page="${arg#--page=}" ;;
+        *) file="$arg" ;;
+    esac
+done
+echo "страница $page $(basename "$file")"
+"""
+
+FAKE_DJVUSED = """#!/bin/sh
+echo 3
+"""
+
+
+@unittest.skipIf(os.name == "nt", "Фиктивные утилиты DjVuLibre написаны на sh")
+class TestDjvuExtraction(unittest.TestCase):
+    """Тесты извлечения DjVu на фиктивных djvutxt/djvused"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.djvutxt = self.write_tool("djvutxt", FAKE_DJVUTXT)
+        self.files = []
+        for name in ("a.djvu", "b.djvu"):
+            path = os.path.join(self.tmp.name, name)
+            with open(path, "wb") as f:
+                f.write(b"AT&TFORM")
+            self.files.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_tool(self, name, script):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(script)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        return path
+
+    def test_explicit_executable_and_page(self):
+        parser = Parser(djvutxt_path=self.djvutxt)
+        self.assertEqual(parser.extract_text_from_djvu(self.files[0]), "страница all a.djvu")
+        self.assertEqual(parser.extract_text_from_djvu(self.files[0], page=2), "страница 2 a.djvu")
+
+    def test_batch_splits_by_pages(self):
+        self.write_tool("djvused", FAKE_DJVUSED)
+        parser = Parser(djvutxt_path=self.djvutxt, max_workers=2)
+        result = parser.extract_djvu_batch(self.files)
+        self.assertEqual(result[self.files[1]], "страница 1 b.djvu страница 2 b.djvu страница 3 b.djvu")
+
+    def test_batch_without_djvused(self):
+        parser = Parser(djvutxt_path=self.djvutxt)
+        parser.count_djvu_pages = lambda file_path: None
+        self.assertEqual(parser.extract_djvu_batch(self.files[:1]), {self.files[0]: "страница all a.djvu"})
+
+    def test_timeout(self):
+        slow = self.write_tool("slow_djvutxt", "#!/bin/sh\nsleep 5\n")
+        parser = Parser(djvutxt_path=slow, djvu_timeout=0.2)
+        with self.assertRaises(RuntimeError):
+            parser.extract_text_from_djvu(self.files[0])
+
+
+ODT_CONTENT = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"><office:body><office:text>'
+    '<text:h>Заголовок</text:h><text:p>Первый <text:span>абзац</text:span></text:p>'
+    '</office:text></office:body></office:document-content>'
+)
+
+EPUB_CONTAINER = (
+    '<?xml version="1.0"?><container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+    '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>'
+    '</container>'
+)
+
+EPUB_OPF = (
+    '<?xml version="1.0"?><package xmlns="http://www.idpf.org/2007/opf" version="3.0">'
+    '<manifest><item id="c2" href="ch2.xhtml"/><item id="c1" href="ch1.xhtml"/></manifest>'
+    '<spine><itemref idref="c1"/><itemref idref="c2"/></spine></package>'
+)
+
+
+class TestFormatDetection(unittest.TestCase):
+    """Тесты определения формата по сигнатуре и реестра извлекателей"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.parser = Parser(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        Parser.extractors.pop("text/x-test", None)
+        EXTENSION_MIME.pop(".xtest", None)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def write(self, name, data):
+        with open(self.path(name), "wb") as f:
+            f.write(data)
+        return self.path(name)
+
+    def write_zip(self, name, entries):
+        with zipfile.ZipFile(self.path(name), "w") as archive:
+            for entry, data in entries:
+                compression = zipfile.ZIP_STORED if entry == "mimetype" else zipfile.ZIP_DEFLATED
+                archive.writestr(entry, data, compress_type=compression)
+        return self.path(name)
+
+    def test_detects_corpus_formats_by_content(self):
+        expected = {".html": MIME_HTML, ".pdf": MIME_PDF, ".docx": MIME_DOCX, ".djvu": MIME_DJVU}
+        for filename in os.listdir("docs"):
+            extension = os.path.splitext(filename)[1]
+            self.assertEqual(detect_mime(os.path.join("docs", filename)), expected[extension], filename)
+
+    def test_wrong_extension(self):
+        shutil.copy(os.path.join("docs", "keks.html"), self.path("keks.pdf"))
+        shutil.copy(os.path.join("docs", "lizard2002.djvu"), self.path("lizard.djvu.html"))
+        self.assertEqual(detect_mime(self.path("keks.pdf")), MIME_HTML)
+        self.assertEqual(detect_mime(self.path("lizard.djvu.html")), MIME_DJVU)
+        self.assertTrue(self.parser.parse_document("keks.pdf"))
+
+    def test_txt_and_rtf(self):
+        self.write("notes", "Просто  текст\nв две строки".encode("utf-8"))
+        self.write("doc.rtf", rb"{\rtf1\ansi\ansicpg1251{\fonttbl{\f0 Arial;}}\f0 \'cf\'f0\'e8\'e2\'e5\'f2\par {\*\generator x;}\u1084?\u1080?\u1088?}")
+        self.assertEqual(detect_mime(self.path("notes")), MIME_TXT)
+        self.assertEqual(detect_mime(self.path("doc.rtf")), MIME_RTF)
+        self.assertEqual(self.parser.parse_document("notes"), "Просто текст в две строки")
+        self.assertEqual(self.parser.parse_document("doc.rtf"), "Привет мир")
+
+    def test_text_fallback_only_for_txt(self):
+        self.write("notes.txt", "Заметки".encode("utf-8"))
+        for name in ("script.py", "README.md", "data.json", "server.log"):
+            self.write(name, "print('Привет')".encode("utf-8"))
+            self.assertIsNone(detect_mime(self.path(name)), name)
+        self.assertEqual(detect_mime(self.path("notes.txt")), MIME_TXT)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(list(self.parser.process_documents()), ["notes.txt"])
+
+    def test_mime_type_is_detected_once_per_file(self):
+        self.write("notes", "Просто текст".encode("utf-8"))
+        shutil.copy(os.path.join("docs", "keks.html"), self.path("keks.html"))
+        with mock.patch("parser.detect_mime", wraps=detect_mime) as detect:
+            documents = self.parser.process_documents()
+            self.assertEqual(sorted(documents), ["keks.html", "notes"])
+            self.assertEqual(detect.call_count, 2)
+            self.write("notes", "<html><body>Новый текст</body></html>".encode("utf-8"))
+            self.assertEqual(self.parser.parse_document("notes"), "Новый текст")
+            self.assertEqual(detect.call_count, 3)
+
+    def test_unreadable_file_does_not_stop_folder_scan(self):
+        self.write("a.txt", "Первый".encode("utf-8"))
+        self.write("b.txt", "Второй".encode("utf-8"))
+        real_open = open
+
+        def failing_open(file, *args, **kwargs):
+            if str(file).endswith("a.txt"):
+                raise PermissionError(13, "Permission denied", file)
+            return real_open(file, *args, **kwargs)
+
+        output = io.StringIO()
+        with mock.patch("builtins.open", failing_open), contextlib.redirect_stdout(output):
+            documents = self.parser.process_documents()
+        self.assertEqual(list(documents), ["b.txt"])
+        self.assertIn("Ошибка при обработке файла a.txt", output.getvalue())
+
+    def test_odt_and_epub(self):
+        self.write_zip("doc.odt", [("mimetype", MIME_ODT), ("content.xml", ODT_CONTENT)])
+        self.write_zip("book.epub", [
+            ("mimetype", MIME_EPUB),
+            ("META-INF/container.xml", EPUB_CONTAINER),
+            ("OEBPS/content.opf", EPUB_OPF),
+            ("OEBPS/ch1.xhtml", "<html><body><p>Глава первая</p></body></html>"),
+            ("OEBPS/ch2.xhtml", "<html><body><p>Глава вторая</p><script>x()</script></body></html>"),
+        ])
+        self.assertEqual(detect_mime(self.path("doc.odt")), MIME_ODT)
+        self.assertEqual(detect_mime(self.path("book.epub")), MIME_EPUB)
+        self.assertEqual(self.parser.parse_document("doc.odt"), "Заголовок Первый абзац")
+        self.assertEqual(self.parser.parse_document("book.epub"), "Глава первая Глава вторая")
+
+    def test_register_extractor(self):
+        self.write("data.xtest", b"\x00\x01binary")
+        with self.assertRaises(RuntimeError):
+            self.parser.parse_document("data.xtest")
+
+        Parser.register_extractor("text/x-test", lambda parser, file_path: "ok", extensions=(".xtest",))
+        self.assertEqual(self.parser.parse_document("data.xtest"), "ok")
+        self.assertIn("data.xtest", self.parser.process_documents())
+
+
+DOCX_DOCUMENT = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><w:body>'
+    '<w:p><w:hyperlink r:id="rId1"><w:r><w:t>Сайт СПбГУ</w:t></w:r></w:hyperlink></w:p>'
+    '<w:p><w:r><w:t>См. www.msu.ru/news, а также https://spbu.ru/.</w:t></w:r></w:p>'
+    '</w:body></w:document>'
+)
+
+DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" TargetMode="External" Target="https://SPBU.ru/#top" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"/>'
+    '<Relationship Id="rId2" Target="styles.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/>'
+    '</Relationships>'
+)
+
+
+class TestLinkExtraction(unittest.TestCase):
+    """Тесты извлечения ссылок из разметки и текста"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.parser = Parser(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_normalize_link(self):
+        self.assertEqual(normalize_link("www.msu.ru/news,"), "http://www.msu.ru/news")
+        self.assertEqual(normalize_link("HTTPS://SPbU.ru#top"), "https://spbu.ru/")
+        self.assertIsNone(normalize_link("/relative/page.html"))
+        self.assertIsNone(normalize_link("mailto:rector@spbu.ru"))
+        self.assertEqual(normalize_links(["https://spbu.ru", "https://spbu.ru/.", "www.msu.ru"]),
+                         ["https://spbu.ru/", "http://www.msu.ru/"])
+
+    def test_html_links_from_markup_and_text(self):
+        with open(os.path.join(self.tmp.name, "page.html"), "w", encoding="utf-8") as f:
+            f.write('<html><body><a href="https://spbu.ru/">СПбГУ</a> и https://msu.ru. '
+                    '<a href="#top">наверх</a><script>var u = "https://tracker.example";</script></body></html>')
+        text, links = self.parser.parse_document_with_links("page.html")
+        self.assertEqual(text, "СПбГУ и https://msu.ru. наверх")
+        self.assertEqual(links, ["https://spbu.ru/", "https://msu.ru/"])
+
+    def test_html_text_links_across_chunk_boundaries(self):
+        with open(os.path.join(self.tmp.name, "page.html"), "w", encoding="utf-8") as f:
+            f.write('<p>Сайт университета: https://spbu.ru/news/2024/olympiad и www.msu.ru/abitur</p>')
+        for chunk_size in (5, 31, 40):
+            with mock.patch("parser.HTML_READ_CHUNK_SIZE", chunk_size):
+                _, links = self.parser.parse_document_with_links("page.html")
+            self.assertEqual(links, ["https://spbu.ru/news/2024/olympiad", "http://www.msu.ru/abitur"], chunk_size)
+
+    def test_docx_relationship_links(self):
+        with zipfile.ZipFile(os.path.join(self.tmp.name, "doc.docx"), "w") as archive:
+            archive.writestr("word/document.xml", DOCX_DOCUMENT)
+            archive.writestr("word/_rels/document.xml.rels", DOCX_RELS)
+        _, links = self.parser.parse_document_with_links("doc.docx")
+        self.assertEqual(links, ["https://spbu.ru/", "http://www.msu.ru/news"])
+
+    def test_link_graph(self):
+        with open(os.path.join(self.tmp.name, "a.txt"), "w", encoding="utf-8") as f:
+            f.write("см. https://spbu.ru и https://spbu.ru")
+        self.assertEqual(self.parser.build_link_graph(), {"a.txt": ["https://spbu.ru/"]})
+
+
+class TestChunking(unittest.TestCase):
+    """Тесты разбиения документов на фрагменты ограниченного размера"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.parser = Parser(self.tmp.name)
+        self.words = [f"слово{i}" for i in range(300)]
+        paragraphs = [" ".join(self.words[i:i + 30]) for i in range(0, 300, 30)]
+        with open(os.path.join(self.tmp.name, "long.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(paragraphs))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_window_chunks_with_overlap(self):
+        chunks = list(self.parser.iter_chunks("long.txt", size=200, overlap=40))
+        self.assertTrue(all(len(chunk) <= 200 for chunk in chunks))
+        for previous, current in zip(chunks, chunks[1:]):
+            first_word = current.split()[0]
+            self.assertIn(first_word, previous.split())
+        covered = []
+        for chunk in chunks:
+            covered.extend(word for word in chunk.split() if word not in covered[-20:])
+        self.assertEqual(covered, self.words)
+
+    def test_window_chunks_without_overlap(self):
+        chunks = list(self.parser.iter_chunks("long.txt", size=200, overlap=0))
+        self.assertEqual(" ".join(chunks).split(), self.words)
+
+    def test_paragraph_chunks(self):
+        chunks = list(self.parser.iter_chunks("long.txt", size=500, mode="paragraph"))
+        self.assertTrue(all(len(chunk) <= 500 for chunk in chunks))
+        self.assertEqual(" ".join(chunks), " ".join(self.words))
+        self.assertTrue(chunks[0].endswith(self.words[59]))
+
+    def test_html_chunks_match_full_text(self):
+        chunks = list(self.parser.iter_chunks(os.path.join("docs", "keks.html"), size=100, mode="paragraph", inner_text=True))
+        self.assertEqual(" ".join(chunks), self.parser.extract_text_from_html(os.path.join("docs", "keks.html")))
+
+    def test_html_paragraphs_across_chunk_boundaries(self):
+        file_path = os.path.join("docs", "Молибден.html")
+        paragraphs = list(self.parser.iter_html_paragraphs(file_path))
+        with mock.patch("parser.HTML_READ_CHUNK_SIZE", 7):
+            self.assertEqual(list(self.parser.iter_html_paragraphs(file_path)), paragraphs)
+        self.assertEqual(" ".join(paragraphs), self.parser.extract_text_from_html(file_path, fast=False))
+
+        with open(os.path.join(self.tmp.name, "long.html"), "w", encoding="utf-8") as f:
+            f.write("<p>" + " ".join(self.words) + "</p><p>конец</p>")
+        with mock.patch("parser.HTML_READ_CHUNK_SIZE", 13):
+            paragraphs = list(self.parser.iter_html_paragraphs(os.path.join(self.tmp.name, "long.html")))
+        self.assertEqual(paragraphs, [" ".join(self.words), "конец"])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            list(self.parser.iter_chunks("long.txt", size=100, overlap=100))
+        with self.assertRaises(ValueError):
+            list(self.parser.iter_chunks("long.txt", mode="sentence"))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
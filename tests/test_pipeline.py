@@ -0,0 +1,141 @@
+# python -m pytest tests/test_pipeline.py — конвейер сбор -> нормализация -> дубликаты -> индекс
+
+import os
+import tempfile
+import time
+import unittest
+
+import web
+from fake_vk import FakeVkApi, make_posts, ts
+from pipeline import Pipeline, build_pipeline, merge_segments, vk_source
+from rate_limiter import TokenBucket
+from search_index import IndexSearcher
+
+
+class SlowStage:
+    name = 'slow'
+
+    def __init__(self, delay=0.0, fail_on=None):
+        self.delay = delay
+        self.fail_on = fail_on
+        self.seen = 0
+
+    def process(self, batch):
+        time.sleep(self.delay)
+        self.seen += 1
+        if self.seen == self.fail_on:
+            raise RuntimeError("сбой стадии")
+        return batch
+
+    def finish(self):
+        return []
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.segments = os.path.join(self.tmp.name, 'segments')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_vk_to_index(self):
+        start, end = ts(2023, 1, 1), ts(2023, 12, 31, 23, 59)
+        posts = make_posts("СПбГУ", 1500, start, end, seed=71)
+        reposts = [dict(post, id=post['id'] + 10000, owner_id=-9) for post in posts[:300]]
+        collector = web.VKUniversityMentionsCollector("", api=FakeVkApi(posts + reposts),
+                                                      rate_limiter=TokenBucket(rate=10000))
+
+        pipeline = build_pipeline(self.segments, segment_size=400, queue_size=2)
+        stats = {stage.name: stage for stage in pipeline.run(vk_source(collector, ["СПбГУ"], start, end))}
+        self.assertEqual(stats['collect'].items_out, 1800)
+        self.assertEqual(stats['dedupe'].items_out, 1500)
+        self.assertEqual(stats['index'].items_in, 1500)
+        self.assertGreater(stats['dedupe'].busy_sec, 0)
+
+        output = os.path.join(self.tmp.name, 'index.idx')
+        merged = merge_segments(self.segments, output)
+        self.assertEqual(merged, {'documents': 1500, 'terms': 1503, 'segments': 4})
+
+        searcher = IndexSearcher(index_file=output)
+        self.assertEqual(searcher.search('спбгу', compressed=False)['count'], 1500)
+        # Запрос разбивается так же, как тексты в NormalizeStage
+        self.assertEqual(searcher.load_index().tokenizer, 'normalize')
+        self.assertEqual(searcher.search('СПбГУ:', compressed=False)['count'], 1500)
+        result = searcher.search('1', compressed=False)
+        self.assertEqual(result['count'], 1)
+        # results - номера записей конвейера, по ним читается таблица documents
+        self.assertEqual(searcher.load_index().metadata['documents'][result['results'][0]][2], 1)
+        # Тексты документов сохранены в индексе в порядке номеров документов
+        text = searcher.load_index().document(result['doc_ids'][0])
+        self.assertIn('1', text.split())
+        self.assertIn('<b>1</b>', searcher.snippets(result)[result['results'][0]])
+        searcher.close()
+
+    def test_rerun_into_same_directory(self):
+        start, end = ts(2023, 1, 1), ts(2023, 12, 31, 23, 59)
+        output = os.path.join(self.tmp.name, 'index.idx')
+
+        def run(university, count, seed, overwrite=False):
+            posts = make_posts(university, count, start, end, seed=seed)
+            collector = web.VKUniversityMentionsCollector("", api=FakeVkApi(posts),
+                                                          rate_limiter=TokenBucket(rate=10000))
+            pipeline = build_pipeline(self.segments, segment_size=400, overwrite=overwrite)
+            pipeline.run(vk_source(collector, [university], start, end))
+            return pipeline
+
+        run("МГУ", 1200, 5)
+        first_run = sorted(os.listdir(self.segments))
+        self.assertEqual(len(first_run), 6)
+        # Без overwrite сегменты прошлого запуска не трогаются, запуск не начинается
+        with self.assertRaises(FileExistsError):
+            run("СПбГУ", 300, 6)
+        self.assertEqual(sorted(os.listdir(self.segments)), first_run)
+
+        writer = run("СПбГУ", 300, 6, overwrite=True).stages[-1]
+        self.assertEqual(len(writer.segments), 1)
+        # Сегменты первого запуска (segment-00001.pkl, segment-00002.pkl) не попадают в индекс
+        self.assertEqual(sorted(os.listdir(self.segments)), ['segment-00000.pkl', 'texts-00000.pkl'])
+        for segments in (None, writer.segments):
+            merged = merge_segments(self.segments, output, segments=segments)
+            self.assertEqual(merged['documents'], 300)
+            self.assertEqual(merged['segments'], 1)
+
+        searcher = IndexSearcher(index_file=output)
+        self.assertEqual(searcher.search('спбгу', compressed=False)['count'], 300)
+        self.assertEqual(searcher.search('мгу', compressed=False)['count'], 0)
+        searcher.close()
+
+    def test_merge_does_not_depend_on_segment_size(self):
+        start, end = ts(2023, 1, 1), ts(2023, 12, 31, 23, 59)
+        posts = make_posts("МГУ", 700, start, end, seed=8)
+        indexes = []
+        for segment_size in (50, 1000):
+            collector = web.VKUniversityMentionsCollector("", api=FakeVkApi(posts),
+                                                          rate_limiter=TokenBucket(rate=10000))
+            segments = os.path.join(self.tmp.name, f'segments-{segment_size}')
+            output = os.path.join(self.tmp.name, f'index-{segment_size}.idx')
+            build_pipeline(segments, segment_size=segment_size).run(vk_source(collector, ["МГУ"], start, end))
+            merged = merge_segments(segments, output)
+            with open(output, 'rb') as f:
+                indexes.append(f.read())
+        self.assertEqual(merged['segments'], 1)
+        # Потоковое слияние 14 сегментов дает тот же файл, что и один сегмент
+        self.assertEqual(indexes[0], indexes[1])
+
+    def test_queues_are_bounded(self):
+        batches = [[{'text': str(i)}] for i in range(30)]
+        stats = Pipeline([SlowStage(delay=0.01)], queue_size=2).run(batches)
+        self.assertEqual(stats[1].items_in, 30)
+        # Источник ждал места в очереди, пока медленная стадия обрабатывала порции
+        self.assertGreater(stats[0].wait_output_sec, 0.1)
+
+    def test_stage_error_is_raised(self):
+        batches = ([{'text': str(i)}] for i in range(100))
+        pipeline = Pipeline([SlowStage(fail_on=3), SlowStage()], queue_size=1)
+        with self.assertRaises(RuntimeError):
+            pipeline.run(batches)
+
+
+if __name__ == '__main__':
+    unittest.main()
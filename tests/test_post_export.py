@@ -0,0 +1,81 @@
+# python -m pytest tests/test_post_export.py — потоковая выгрузка публикаций
+
+import csv
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from openpyxl import load_workbook
+
+import web
+from fake_vk import FakeVkApi, make_posts, ts
+from post_export import CsvPostWriter, ExcelPostWriter, PostWriter, open_post_writer
+from post_store import PostStore
+from rate_limiter import TokenBucket
+
+
+class TestPostExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = PostStore()
+        self.store.append_posts("СПбГУ", make_posts("СПбГУ", 120, ts(2024, 1, 1), ts(2024, 12, 31), seed=41))
+        self.store.append_posts("МГУ", make_posts("МГУ", 80, ts(2024, 1, 1), ts(2024, 12, 31), seed=42, owner_id=-2))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def export(self, path, batch_size=50, **options):
+        with open_post_writer(path, **options) as writer:
+            for batch in self.store.iter_dataframes(batch_size):
+                writer.write(batch)
+        return writer
+
+    def test_csv_batches_have_one_header(self):
+        writer = self.export(self.path("posts.csv"))
+        self.assertIsInstance(writer, CsvPostWriter)
+        with open(self.path("posts.csv"), encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 200)
+        self.assertEqual(rows[130]["university"], "МГУ")
+        self.assertEqual(rows[0]["post_url"], self.store[0]["post_url"])
+
+    def test_gzip_csv(self):
+        self.export(self.path("posts.csv.gz"))
+        with gzip.open(self.path("posts.csv.gz"), "rt", encoding="utf-8") as f:
+            self.assertEqual(len(f.read().splitlines()), 201)
+
+    def test_excel_splits_sheets_at_row_limit(self):
+        writer = self.export(self.path("posts.xlsx"), max_rows=90)
+        self.assertIsInstance(writer, ExcelPostWriter)
+        workbook = load_workbook(self.path("posts.xlsx"), read_only=True)
+        self.assertEqual(workbook.sheetnames, ["Публикации", "Публикации 2", "Публикации 3"])
+        self.assertEqual(sum(len(list(sheet.iter_rows())) - 1 for sheet in workbook.worksheets), 200)
+
+    def test_writer_must_implement_write(self):
+        with self.assertRaises(TypeError):
+            PostWriter(self.path("posts.txt"))
+
+    def test_unknown_extension(self):
+        with self.assertRaises(ValueError):
+            open_post_writer(self.path("posts.json"))
+
+    def test_collector_streams_while_collecting(self):
+        posts = make_posts("СПбГУ", 300, ts(2023, 1, 1), ts(2023, 12, 31, 23, 59), seed=43)
+        collector = web.VKUniversityMentionsCollector("", api=FakeVkApi(posts), rate_limiter=TokenBucket(rate=10000))
+        with redirect_stdout(io.StringIO()), open_post_writer(self.path("stream.csv")) as writer:
+            collector.collect_data(["СПбГУ"], year=2023, writer=writer)
+        self.assertEqual(writer.rows_written, 300)
+
+        with redirect_stdout(io.StringIO()):
+            collector.save_to_excel(self.path("summary.xlsx"), include_posts=False)
+        self.assertNotIn("Публикации", load_workbook(self.path("summary.xlsx"), read_only=True).sheetnames)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# python -m pytest tests/test_post_store.py — колоночное хранилище публикаций
+
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from fake_vk import make_posts, ts
+from post_store import PostStore
+
+
+class TestPostStore(unittest.TestCase):
+    def setUp(self):
+        self.start, self.end = ts(2023, 1, 1), ts(2023, 12, 31, 23, 59)
+        self.store = PostStore(capacity=4)
+        self.spbu = make_posts("СПбГУ", 30, self.start, self.end, seed=31)
+        self.msu = make_posts("МГУ", 20, self.start, self.end, seed=32, owner_id=-2)
+        self.store.append_posts("СПбГУ", self.spbu)
+        self.store.append_posts("МГУ", self.msu)
+
+    def test_records_match_posts(self):
+        self.assertEqual(len(self.store), 50)
+        record = self.store[30]
+        post = self.msu[0]
+        self.assertEqual(record["university"], "МГУ")
+        self.assertEqual(record["author_id"], post["from_id"])
+        self.assertEqual(record["date"], datetime.fromtimestamp(post["date"]))
+        self.assertEqual(record["likes"], post["likes"]["count"])
+        self.assertEqual(record["text"], post["text"])
+        self.assertEqual(record["post_url"], f"https://vk.com/wall-2_{post['id']}")
+        self.assertEqual(self.store.universities, ["СПбГУ", "МГУ"])
+        self.assertEqual(self.store.column("university").dtype, np.int16)
+
+    def test_view_is_a_filter_not_a_copy(self):
+        view = self.store.view("МГУ")
+        self.assertEqual(len(view), 20)
+        self.store.append_posts("МГУ", make_posts("МГУ", 5, self.start, self.end, seed=33, owner_id=-3))
+        self.assertEqual(len(view), 25)
+        self.assertEqual(view.summary()["likes_count"],
+                         sum(post["likes"]["count"] for post in self.msu) + int(view.column("likes")[-5:].sum()))
+        self.assertEqual([record["university"] for record in view], ["МГУ"] * 25)
+
+    def test_period_filter(self):
+        store = PostStore()
+        added = store.append_posts("СПбГУ", self.spbu, start_time=ts(2023, 7, 1))
+        self.assertEqual(added, sum(1 for post in self.spbu if post["date"] >= ts(2023, 7, 1)))
+        self.assertEqual(len(store.column("text")), added)
+
+    def test_dataframe_matches_records(self):
+        df = self.store.view("СПбГУ").to_dataframe()
+        self.assertEqual(len(df), 30)
+        self.assertEqual(df["date"].iloc[0].to_pydatetime(), self.store[0]["date"])
+        self.assertEqual(df["post_url"].iloc[0], self.store[0]["post_url"])
+        self.assertEqual(str(df["university"].dtype), "category")
+
+    def test_aggregate_matches_python_loop(self):
+        for granularity, key in [("month", lambda d: (d.year, d.month)), ("day", lambda d: d.date()),
+                                 ("hour", lambda d: (d.date(), d.hour))]:
+            expected = {}
+            for record in self.store:
+                bucket = (record["university"], key(record["date"]))
+                posts, likes = expected.get(bucket, (0, 0))
+                expected[bucket] = (posts + 1, likes + record["likes"])
+
+            result = self.store.aggregate(granularity)
+            nonzero = result[result["posts_count"] > 0]
+            self.assertEqual(len(nonzero), len(expected))
+            self.assertEqual(int(result["posts_count"].sum()), 50)
+            self.assertEqual(int(result["likes_count"].sum()), sum(likes for _, likes in expected.values()))
+
+    def test_counts_table_fills_empty_periods(self):
+        table = self.store.counts_table("month", datetime(2023, 1, 1), datetime(2023, 12, 31))
+        self.assertEqual(table.shape, (2, 12))
+        self.assertEqual(table.loc["МГУ"].sum(), 20)
+        weekly = self.store.view("СПбГУ").aggregate("week")
+        self.assertEqual(set(weekly.index.get_level_values("university")), {"СПбГУ"})
+        self.assertEqual(int(weekly["posts_count"].sum()), 30)
+
+    def test_parquet_round_trip(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest("pyarrow не установлен")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "posts.parquet")
+            self.store.to_parquet(path)
+            loaded = PostStore.from_parquet(path)
+        self.assertEqual(list(loaded), list(self.store))
+
+
+if __name__ == '__main__':
+    unittest.main()
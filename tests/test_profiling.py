@@ -0,0 +1,85 @@
+# python -m pytest tests/test_profiling.py — таймеры и счетчики стадий, флаг --profile
+
+import contextlib
+import io
+import json
+import os
+import pstats
+import tempfile
+import unittest
+
+import numpy as np
+
+from index import IndexBuilder, IndexReader
+from profiling import METRICS, Metrics, profile
+from fake_vk import ts
+
+
+class TestMetrics(unittest.TestCase):
+    def test_disabled_metrics_record_nothing(self):
+        metrics = Metrics()
+        self.assertIs(metrics.timer('a'), metrics.timer('b'))
+        with metrics.timer('a'):
+            metrics.count('b', 5)
+        self.assertEqual(metrics.report(), {'timers': {}, 'counters': {}})
+
+    def test_enabled_metrics(self):
+        metrics = Metrics()
+        metrics.enable()
+        for _ in range(3):
+            with metrics.timer('stage'):
+                metrics.count('items', 2)
+        report = metrics.report()
+        self.assertEqual(report['timers']['stage']['calls'], 3)
+        self.assertGreaterEqual(report['timers']['stage']['total_sec'], 0)
+        self.assertEqual(report['counters'], {'items': 6})
+        metrics.reset()
+        self.assertEqual(metrics.report()['counters'], {})
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        records = [{'text': f'ректор спбгу новости №{i}', 'date': ts(2024, 1, 1) + i} for i in range(500)]
+        self.data_file = os.path.join(self.tmp.name, 'data.npy')
+        np.save(self.data_file, np.array(records), allow_pickle=True)
+
+    def tearDown(self):
+        METRICS.reset()
+        self.tmp.cleanup()
+
+    def test_build_and_search_report(self):
+        prefix = os.path.join(self.tmp.name, 'profile')
+        path = os.path.join(self.tmp.name, 'index.idx')
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            with profile(prefix):
+                IndexBuilder(data_file=self.data_file).save(path)
+                with IndexReader(path) as reader:
+                    reader.search('ректор спбгу')
+                    reader.snippets([0, 1], ['ректор'])
+        self.assertIn('profile.json', output.getvalue())
+        self.assertFalse(METRICS.enabled)
+
+        with open(f'{prefix}.json', encoding='utf-8') as f:
+            report = json.load(f)
+        for stage in ('build.load_data', 'build.tokenize', 'build.postings', 'build.encode', 'build.write',
+                      'search.query', 'search.match'):
+            self.assertIn(stage, report['timers'])
+        counters = report['counters']
+        self.assertEqual(counters['build.documents'], 3000)
+        self.assertEqual(counters['build.postings_written'], 4 * 3000)
+        self.assertGreater(counters['build.bytes_encoded'], 0)
+        self.assertGreaterEqual(counters['search.terms_looked_up'], 2)
+        self.assertEqual(counters['store.blocks_decoded'], 1)
+        self.assertGreater(report['wall_sec'], 0)
+        self.assertGreater(pstats.Stats(f'{prefix}.pstats').total_calls, 0)
+
+    def test_profile_disabled(self):
+        with profile(None):
+            IndexBuilder(data_file=self.data_file).create_inverted_index()
+        self.assertEqual(METRICS.report(), {'timers': {}, 'counters': {}})
+        self.assertEqual(os.listdir(self.tmp.name), ['data.npy'])
+
+
+if __name__ == '__main__':
+    unittest.main()
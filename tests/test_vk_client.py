@@ -0,0 +1,104 @@
+# python -m pytest tests/test_vk_client.py — клиент vk_client.py против локального HTTP-сервера FakeVkServer
+
+import asyncio
+import io
+import time
+import unittest
+from contextlib import redirect_stdout
+
+import vk_api
+
+import web
+from fake_vk import FakeVkApi, FakeVkServer, make_posts, ts
+from rate_limiter import TokenBucket
+from vk_client import NETWORK_ERROR_CODE, AsyncVkClient, VkClient, VkNetworkError
+
+
+class TestAsyncVkClient(unittest.TestCase):
+    def setUp(self):
+        self.start, self.end = ts(2023, 1, 1), ts(2023, 12, 31, 23, 59)
+        self.posts = make_posts("СПбГУ", 300, self.start, self.end, seed=21)
+
+    def run_client(self, server, coroutine_factory, **options):
+        async def run():
+            async with AsyncVkClient("token", base_url=server.url, backoff=0, **options) as client:
+                return await coroutine_factory(client)
+        return asyncio.run(run())
+
+    def test_search_matches_fake_api(self):
+        api = FakeVkApi(self.posts)
+        with FakeVkServer(api) as server:
+            response = self.run_client(server, lambda client: client.newsfeed_search(
+                q="СПбГУ", start_time=self.start, end_time=self.end, count=100, offset=100))
+        self.assertEqual(response, api.search("СПбГУ", self.start, self.end, count=100, offset=100))
+        self.assertEqual(server.requests[0][1]["access_token"], "token")
+
+    def test_retries_error_codes_6_9_10(self):
+        with FakeVkServer(FakeVkApi(self.posts), errors=[6, 9, 10]) as server:
+            response = self.run_client(server, lambda client: client.newsfeed_search(q="СПбГУ", count=10))
+        self.assertEqual(len(response["items"]), 10)
+        self.assertEqual(len(server.requests), 4)
+
+    def test_other_errors_are_not_retried(self):
+        with FakeVkServer(FakeVkApi(self.posts), errors=[5, 6]) as server:
+            with self.assertRaises(vk_api.exceptions.ApiError) as raised:
+                self.run_client(server, lambda client: client.newsfeed_search(q="СПбГУ"))
+        self.assertEqual(raised.exception.code, 5)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_gives_up_after_max_retries(self):
+        with FakeVkServer(FakeVkApi(self.posts), errors=[6] * 5) as server:
+            with self.assertRaises(vk_api.exceptions.ApiError) as raised:
+                self.run_client(server, lambda client: client.newsfeed_search(q="СПбГУ"), max_retries=2)
+        self.assertEqual(raised.exception.code, 6)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_retries_connection_errors(self):
+        with FakeVkServer(FakeVkApi(self.posts), errors=['disconnect', 'HTTP 503']) as server:
+            response = self.run_client(server, lambda client: client.newsfeed_search(q="СПбГУ", count=10))
+        self.assertEqual(len(response["items"]), 10)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_network_error_after_max_retries_is_api_error(self):
+        with FakeVkServer(FakeVkApi(self.posts), errors=['disconnect'] * 3) as server:
+            with self.assertRaises(vk_api.exceptions.ApiError) as raised:
+                self.run_client(server, lambda client: client.newsfeed_search(q="СПбГУ"), max_retries=2)
+        self.assertIsInstance(raised.exception, VkNetworkError)
+        self.assertEqual(raised.exception.code, NETWORK_ERROR_CODE)
+        self.assertEqual(len(server.requests), 3)
+
+        with FakeVkServer(FakeVkApi(self.posts), errors=['HTTP 404']) as server:
+            with self.assertRaises(VkNetworkError):
+                self.run_client(server, lambda client: client.newsfeed_search(q="СПбГУ"))
+        self.assertEqual(len(server.requests), 1)
+
+    def test_concurrent_requests_overlap_latency(self):
+        async def search_all(client):
+            return await asyncio.gather(*[
+                client.newsfeed_search(q="СПбГУ", count=10, offset=offset) for offset in range(0, 100, 10)
+            ])
+
+        with FakeVkServer(FakeVkApi(self.posts, latency=0.1)) as server:
+            started = time.monotonic()
+            responses = self.run_client(server, search_all)
+            elapsed = time.monotonic() - started
+        self.assertEqual(len({post["id"] for response in responses for post in response["items"]}), 100)
+        self.assertLess(elapsed, 0.5)
+
+
+class TestVkClientWithCollector(unittest.TestCase):
+    def test_web_collector_over_http(self):
+        start, end = ts(2023, 1, 1), ts(2023, 12, 31, 23, 59)
+        posts = make_posts("МГУ", 2500, start, end, seed=22)
+        api = FakeVkApi(posts)
+        with FakeVkServer(api, errors=[6]) as server, VkClient("token", base_url=server.url, backoff=0) as client:
+            collector = web.VKUniversityMentionsCollector("token", api=client, rate_limiter=TokenBucket(rate=10000))
+            with redirect_stdout(io.StringIO()):
+                found = collector.search_posts_adaptive("МГУ", start, end)
+        self.assertEqual(len(found), 2500)
+        self.assertEqual(api.count_calls("newsfeed.search"), 0)
+        self.assertGreater(api.count_calls("execute"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
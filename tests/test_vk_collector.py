@@ -0,0 +1,282 @@
+# python -m pytest tests/test_vk_collector.py — офлайн-тесты сборщиков на заглушке VK API (без токена)
+
+import io
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+
+import vk
+import web
+from fake_vk import FakeVkApi, make_posts, ts
+from checkpoint import CollectionCheckpoint
+from rate_limiter import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_steady_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=3, clock=clock, sleep=clock.sleep)
+        waits = [bucket.acquire() for _ in range(6)]
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(clock.now, 1.0)
+
+    def test_refill_after_idle(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        bucket.acquire()
+        clock.now += 10
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertGreater(bucket.acquire(), 0.0)
+
+
+class TestConcurrentCollection(unittest.TestCase):
+    def assert_rate(self, call_times, rate, capacity):
+        call_times = sorted(call_times)
+        for i, start in enumerate(call_times):
+            in_second = sum(1 for t in call_times[i:] if t - start < 1.0)
+            self.assertLessEqual(in_second, capacity + rate)
+
+    def test_vk_collects_universities_concurrently(self):
+        # vk.py собирает публикации за последние 5 дней, не считая текущих суток
+        start, end = int(time.time()) - 5 * 86400 + 3600, int(time.time()) - 86400 - 3600
+        posts = make_posts("СПбГУ", 50, start, end, seed=1) + make_posts("МГУ", 30, start, end, seed=2, owner_id=-2)
+        api = FakeVkApi(posts, latency=0.02)
+        collector = vk.VKUniversityMentionsCollector("", api=api, rate_limiter=TokenBucket(rate=50))
+
+        with redirect_stdout(io.StringIO()):
+            collector.collect_data(["СПбГУ", "МГУ"])
+
+        self.assertEqual(collector.university_stats["СПбГУ"]["posts_count"], 50)
+        self.assertEqual(collector.university_stats["МГУ"]["posts_count"], 30)
+        self.assertEqual(len(collector.data), 80)
+        self.assertEqual([record["university"] for record in collector.data[:50]], ["СПбГУ"] * 50)
+
+    def test_web_collects_year_within_rate(self):
+        posts = make_posts("СПбГУ", 400, ts(2023, 1, 1), ts(2023, 12, 31, 23, 59), seed=3)
+        api = FakeVkApi(posts, latency=0.01)
+        collector = web.VKUniversityMentionsCollector("", api=api, rate_limiter=TokenBucket(rate=40, capacity=4), max_workers=8)
+
+        with redirect_stdout(io.StringIO()):
+            collector.collect_data(["СПбГУ"], year=2023)
+
+        self.assertEqual(collector.university_stats["СПбГУ"]["posts_count"], 400)
+        self.assert_rate(api.call_times(), rate=40, capacity=4)
+
+
+    def test_web_threads_are_limited_by_max_workers(self):
+        start, end = ts(2023, 1, 1), ts(2023, 12, 31, 23, 59)
+        universities = ["СПбГУ", "МГУ", "ИТМО"]
+        posts = [post for seed, university in enumerate(universities)
+                 for post in make_posts(university, 1500, start, end, seed=seed, owner_id=-seed - 1)]
+        api = FakeVkApi(posts, latency=0.01)
+        collector = web.VKUniversityMentionsCollector("", api=api, rate_limiter=TokenBucket(rate=10000),
+                                                      max_workers=4, use_execute=False)
+
+        with redirect_stdout(io.StringIO()):
+            collector.collect_data(universities, year=2023)
+
+        self.assertEqual([collector.university_stats[name]["posts_count"] for name in universities], [1500] * 3)
+        # Пулы окон университетов делят max_workers, а не создают по max_workers потоков каждый
+        self.assertLessEqual(api.max_in_flight, 4)
+
+
+class TestAdaptiveWindows(unittest.TestCase):
+    def setUp(self):
+        self.start, self.end = ts(2023, 1, 1), ts(2023, 12, 31, 23, 59)
+
+    def make_collector(self, posts):
+        api = FakeVkApi(posts)
+        collector = web.VKUniversityMentionsCollector("", api=api, rate_limiter=TokenBucket(rate=10000),
+                                                      max_workers=8, use_execute=False)
+        return api, collector
+
+    def test_small_period_is_not_split(self):
+        api, collector = self.make_collector(make_posts("МГУ", 250, self.start, self.end))
+        posts = collector.search_posts_adaptive("МГУ", self.start, self.end)
+        self.assertEqual(len(posts), 250)
+        # 1 запрос-разведка (он же первая страница) + 2 страницы
+        self.assertEqual(len(api.calls), 3)
+
+    def test_busy_period_is_split_past_1000_results(self):
+        api, collector = self.make_collector(make_posts("МГУ", 3500, self.start, self.end, seed=5))
+        baseline = collector.search_posts("МГУ", self.start, self.end)
+        self.assertEqual(len(baseline), 1000)
+
+        posts = collector.search_posts_adaptive("МГУ", self.start, self.end)
+        keys = {(post["owner_id"], post["id"]) for post in posts}
+        self.assertEqual(len(posts), 3500)
+        self.assertEqual(len(keys), 3500)
+
+        for start_time, end_time, total_count, _ in collector.plan_windows("МГУ", self.start, self.end):
+            self.assertLessEqual(total_count, 1000)
+
+    def test_unsplittable_window_is_truncated(self):
+        posts = make_posts("МГУ", 1200, self.start, self.start)
+        api, collector = self.make_collector(posts)
+        with redirect_stdout(io.StringIO()):
+            found = collector.search_posts_adaptive("МГУ", self.start, self.start + 30)
+        self.assertEqual(len(found), 1000)
+
+
+
+class TestExecuteBatching(unittest.TestCase):
+    def setUp(self):
+        self.start, self.end = ts(2023, 1, 1), ts(2023, 12, 31, 23, 59)
+        self.posts = make_posts("СПбГУ", 3500, self.start, self.end, seed=7)
+
+    def collect(self, api, use_execute=True):
+        collector = web.VKUniversityMentionsCollector("", api=api, rate_limiter=TokenBucket(rate=10000),
+                                                      max_workers=4, use_execute=use_execute)
+        with redirect_stdout(io.StringIO()):
+            return collector.search_posts_adaptive("СПбГУ", self.start, self.end)
+
+    def test_execute_matches_single_calls_with_fewer_round_trips(self):
+        single_api = FakeVkApi(self.posts)
+        batched_api = FakeVkApi(self.posts)
+        single = self.collect(single_api, use_execute=False)
+        batched = self.collect(batched_api)
+
+        self.assertEqual(batched, single)
+        self.assertEqual(len(batched), 3500)
+        self.assertEqual(batched_api.count_calls("newsfeed.search"), 0)
+        self.assertLess(len(batched_api.calls) * 5, len(single_api.calls))
+
+    def test_execute_code_is_limited_to_25_calls(self):
+        requests = [("СПбГУ", 0, 1, 100, offset) for offset in range(0, 2500, 100)]
+        code = web.VKUniversityMentionsCollector.build_execute_code(requests)
+        self.assertEqual(code.count("API.newsfeed.search("), 25)
+        self.assertIn('"q": "СПбГУ"', code)
+
+    def test_fallback_when_execute_fails(self):
+        api = FakeVkApi(self.posts, fail_execute=True)
+        self.assertEqual(len(self.collect(api)), 3500)
+        self.assertGreater(api.count_calls("newsfeed.search"), 0)
+
+    def test_fallback_for_failed_items(self):
+        api = FakeVkApi(self.posts, fail_items={0, 3})
+        self.assertEqual(len(self.collect(api)), 3500)
+        self.assertGreater(api.count_calls("newsfeed.search"), 0)
+
+
+
+class TestCheckpointedCollection(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.checkpoint = CollectionCheckpoint(os.path.join(self.tmp.name, "progress.sqlite"))
+        self.posts = make_posts("МГУ", 3500, ts(2023, 1, 1), ts(2023, 12, 31, 23, 59), seed=11)
+
+    def tearDown(self):
+        self.checkpoint.close()
+        self.tmp.cleanup()
+
+    def web_collector(self, api, max_workers=1):
+        return web.VKUniversityMentionsCollector("", api=api, rate_limiter=TokenBucket(rate=10000),
+                                                 max_workers=max_workers, use_execute=False)
+
+    def collect_year(self, api, **kwargs):
+        collector = self.web_collector(api)
+        with redirect_stdout(io.StringIO()):
+            collector.collect_data(["МГУ"], year=2023, checkpoint=self.checkpoint, **kwargs)
+        return collector
+
+    def test_checkpoint_belongs_to_one_collector(self):
+        path = os.path.join(self.tmp.name, "web.sqlite")
+        CollectionCheckpoint(path, collector="web").close()
+        CollectionCheckpoint(path, collector="web").close()
+        # Окна и отметка vk.py не смешиваются с прогрессом web.py в одном файле
+        with self.assertRaises(ValueError):
+            CollectionCheckpoint(path, collector="vk")
+
+    def test_web_resumes_after_crash(self):
+        full_api = FakeVkApi(self.posts)
+        self.web_collector(full_api).search_posts_adaptive("МГУ", ts(2023, 1, 1), ts(2023, 12, 31, 23, 59, 59))
+
+        with self.assertRaises(ConnectionError):
+            self.collect_year(FakeVkApi(self.posts, fail_after=len(full_api.calls) - 5))
+
+        resumed_api = FakeVkApi(self.posts)
+        collector = self.collect_year(resumed_api)
+        self.assertEqual(collector.university_stats["МГУ"]["posts_count"], 3500)
+        self.assertLess(len(resumed_api.calls), len(full_api.calls) // 2)
+
+    def test_web_failed_windows_are_not_marked_done(self):
+        full_api = FakeVkApi(self.posts)
+        self.collect_year(full_api)
+        last_call = len(full_api.calls) - 1
+        self.checkpoint.close()
+        self.checkpoint = CollectionCheckpoint(os.path.join(self.tmp.name, "retry.sqlite"))
+
+        # Вызов 1 - первый запрос половины года при разбиении, последний - страница окна
+        failed = self.collect_year(FakeVkApi(self.posts, fail_calls={1, last_call}))
+        self.assertLess(failed.university_stats["МГУ"]["posts_count"], 3500)
+        self.assertTrue(self.checkpoint.unfinished_periods("МГУ"))
+
+        resumed_api = FakeVkApi(self.posts)
+        collector = self.collect_year(resumed_api)
+        self.assertEqual(collector.university_stats["МГУ"]["posts_count"], 3500)
+        self.assertEqual(self.checkpoint.unfinished_periods("МГУ"), [])
+        self.assertLess(len(resumed_api.calls), len(full_api.calls))
+
+    def test_web_resumes_when_first_request_fails(self):
+        self.collect_year(FakeVkApi(self.posts, fail_calls={0}))
+        self.assertEqual(self.checkpoint.load_posts("МГУ"), [])
+        self.assertTrue(self.checkpoint.unfinished_periods("МГУ"))
+
+        collector = self.collect_year(FakeVkApi(self.posts))
+        self.assertEqual(collector.university_stats["МГУ"]["posts_count"], 3500)
+        self.assertEqual(self.checkpoint.unfinished_periods("МГУ"), [])
+
+    def test_web_since_last_run_fetches_only_new_posts(self):
+        self.collect_year(FakeVkApi(self.posts))
+
+        fresh = make_posts("МГУ", 20, ts(2024, 1, 1), ts(2024, 1, 2), seed=12, owner_id=-5)
+        api = FakeVkApi(self.posts + fresh)
+        collector = web.VKUniversityMentionsCollector("", api=api, rate_limiter=TokenBucket(rate=10000), use_execute=False)
+        found = collector.search_posts_adaptive("МГУ", ts(2023, 1, 1), ts(2024, 12, 31),
+                                                checkpoint=self.checkpoint, since_last_run=True)
+        self.assertEqual(len(found), 3520)
+        self.assertEqual(len(api.calls), 1)
+        self.assertGreater(api.calls[0][1]["start_time"], ts(2023, 12, 1))
+
+    def test_vk_resumes_from_next_from_cursor(self):
+        start, end = int(time.time()) - 5 * 86400 + 3600, int(time.time()) - 86400 - 3600
+        posts = make_posts("СПбГУ", 95, start, end, seed=13)
+
+        crashed = vk.VKUniversityMentionsCollector("", api=FakeVkApi(posts, fail_after=3),
+                                                   rate_limiter=TokenBucket(rate=10000))
+        crashed.search_posts = self.with_page_size(crashed.search_posts, 10)
+        with redirect_stdout(io.StringIO()), self.assertRaises(ConnectionError):
+            crashed.collect_data(["СПбГУ"], checkpoint=self.checkpoint)
+
+        api = FakeVkApi(posts)
+        collector = vk.VKUniversityMentionsCollector("", api=api, rate_limiter=TokenBucket(rate=10000))
+        collector.search_posts = self.with_page_size(collector.search_posts, 10)
+        with redirect_stdout(io.StringIO()):
+            collector.collect_data(["СПбГУ"], checkpoint=self.checkpoint)
+
+        self.assertEqual(collector.university_stats["СПбГУ"]["posts_count"], 95)
+        self.assertEqual(api.calls[0][1]["start_from"], "30")
+
+    @staticmethod
+    def with_page_size(search_posts, count):
+        return lambda query, start_time, end_time, count_=None, **kwargs: search_posts(
+            query, start_time, end_time, count=count, **kwargs)
+
+
+if __name__ == '__main__':
+    unittest.main()
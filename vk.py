@@ -4,22 +4,49 @@ from datetime import datetime, timedelta
 import time
 import calendar
 import configparser
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 import matplotlib.pyplot as plt
 import seaborn as sns
+from rate_limiter import TokenBucket
+from vk_client import VkClient
+from checkpoint import CollectionCheckpoint
+from post_store import PostStore
+from live_stats import StatsAccumulator
+from post_export import open_post_writer
 
 class VKUniversityMentionsCollector:
-    def __init__(self, access_token):
+    def __init__(self, access_token, api=None, rate_limiter=None, max_workers=4, on_progress=None):
+        """
+        :param access_token: Токен доступа VK API
+        :param api: Объект API с методом newsfeed.search (по умолчанию - асинхронный VkClient; в тестах - заглушка)
+        :param rate_limiter: Общий ограничитель частоты запросов (TokenBucket) для всех потоков
+        :param max_workers: Количество потоков для параллельного сбора по университетам
+        :param on_progress: Функция (университет, снимок статистики), вызываемая после каждой страницы
+        """
         self.access_token = access_token
-        self.vk_session = vk_api.VkApi(token=access_token)
-        self.vk = self.vk_session.get_api()
-        self.data = []
-        self.unique_authors = set()
+        self.vk = api if api is not None else VkClient(access_token)
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.max_workers = max_workers
+        self.data = PostStore()
         self.university_stats = {}
+        # Живая статистика по публикациям, загруженным в этом запуске (см. live_snapshot)
+        self.live_stats = {}
+        self._live_lock = threading.Lock()
+        self.on_progress = on_progress
+
+    def search_posts(self, query, start_time, end_time, count=200, checkpoint=None, start_from=None):
+        """
+        Поиск публикаций с пагинацией через next_from.
+        С checkpoint каждая страница сохраняется вместе с курсором следующей,
+        а результат берется из хранилища (включая страницы прошлых запусков).
+        """
+        if checkpoint is not None and checkpoint.is_window_done(query, start_time, end_time):
+            return checkpoint.load_posts(query, start_time, end_time)
 
-    def search_posts(self, query, start_time, end_time, count=200):
         posts_found = []
-        start_from = None
 
         while True:
             params = {
@@ -32,27 +59,69 @@ class VKUniversityMentionsCollector:
                 params['start_from'] = start_from
 
             try:
+                self.rate_limiter.acquire()
                 response = self.vk.newsfeed.search(**params)
             except vk_api.exceptions.ApiError as e:
                 print(f"API Error: {e}")
                 break
 
             items = response.get('items', [])
-            if not items:
-                break
+            start_from = response.get('next_from') if items else None
+            if checkpoint is not None:
+                if start_from:
+                    checkpoint.save_cursor(query, start_time, end_time, start_from, items)
+                else:
+                    checkpoint.mark_window_done(query, start_time, end_time, items)
 
             posts_found.extend(items)
-            start_from = response.get('next_from')
+            self._record_posts(query, items)
             if not start_from:
                 break
 
-            time.sleep(0.34)
-
+        if checkpoint is not None:
+            return checkpoint.load_posts(query, start_time, end_time)
         return posts_found
 
-    def collect_data(self, universities):
+    def _record_posts(self, university, posts):
+        # Обновление живой статистики университета по только что загруженной странице
+        with self._live_lock:
+            accumulator = self.live_stats.setdefault(university, StatsAccumulator())
+        accumulator.add_posts(posts)
+        if self.on_progress is not None:
+            self.on_progress(university, accumulator.snapshot())
+
+    def live_snapshot(self):
+        """
+        Текущая статистика сбора, пока он идет (можно вызывать из другого потока)
+        :return: Словарь {университет: снимок StatsAccumulator.snapshot()}
+        """
+        with self._live_lock:
+            accumulators = dict(self.live_stats)
+        return {university: accumulator.snapshot() for university, accumulator in accumulators.items()}
+
+    def _search_with_checkpoint(self, university, start_ts, end_ts, checkpoint, since_last_run):
+        """
+        Возобновление прерванной пагинации и загрузка нового периода;
+        в режиме since_last_run запрашиваются только публикации новее сохраненных
+        """
+        for window_start, window_end, next_from in checkpoint.pending_cursors(university):
+            self.search_posts(university, window_start, window_end, checkpoint=checkpoint, start_from=next_from)
+
+        fetch_start = start_ts
+        if since_last_run:
+            high_water_mark = checkpoint.high_water_mark(university)
+            if high_water_mark is not None:
+                fetch_start = max(start_ts, high_water_mark + 1)
+        if fetch_start <= end_ts:
+            self.search_posts(university, fetch_start, end_ts, checkpoint=checkpoint)
+        return checkpoint.load_posts(university, start_ts, end_ts)
+
+    def collect_data(self, universities, checkpoint=None, since_last_run=False, writer=None):
         """
         Сбор данных о публикациях за последние 5 дней
+        :param checkpoint: CollectionCheckpoint для возобновления сбора после сбоя
+        :param since_last_run: Загружать только публикации новее сохраненных в checkpoint
+        :param writer: PostWriter, в который публикации каждого университета пишутся сразу после сбора
         """
         end_date = datetime.now() - timedelta(days=1)
         start_date = end_date - timedelta(days=5)
@@ -62,48 +131,30 @@ class VKUniversityMentionsCollector:
 
         print(f"Сбор данных за период с {start_date.strftime('%d.%m.%Y')} по {end_date.strftime('%d.%m.%Y')}")
 
-        for university in universities:
+        # Запросы по всем университетам идут параллельно, частоту ограничивает self.rate_limiter
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            if checkpoint is not None:
+                futures = [
+                    executor.submit(self._search_with_checkpoint, university, start_ts, end_ts,
+                                    checkpoint, since_last_run)
+                    for university in universities
+                ]
+            else:
+                futures = [
+                    executor.submit(self.search_posts, university, start_ts, end_ts)
+                    for university in universities
+                ]
+
+        for university, future in zip(universities, futures):
             print(f"\nПоиск упоминаний: {university}")
-            university_posts = []
-            university_authors = set()
-            stats = {'likes': 0, 'views': 0, 'reposts': 0, 'comments': 0}
-
-            posts = self.search_posts(university, start_ts, end_ts)
+            posts = future.result()
             print(f"  найдено {len(posts)} постов")
 
-            for post in posts:
-                dt = datetime.fromtimestamp(post.get('date', 0))
-                date_str = dt.strftime('%Y-%m-%d')
-                record = {
-                    'university': university,
-                    'post_id': post.get('id'),
-                    'owner_id': post.get('owner_id'),
-                    'author_id': post.get('from_id', post.get('owner_id')),
-                    'date': dt,
-                    'text': post.get('text', ''),
-                    'likes': post.get('likes', {}).get('count', 0),
-                    'views': post.get('views', {}).get('count', 0),
-                    'reposts': post.get('reposts', {}).get('count', 0),
-                    'comments': post.get('comments', {}).get('count', 0),
-                    'post_url': f"https://vk.com/wall{post.get('owner_id')}_{post.get('id')}"
-                }
-                self.data.append(record)
-                university_posts.append(record)
-                university_authors.add(record['author_id'])
-                stats['likes'] += record['likes']
-                stats['views'] += record['views']
-                stats['reposts'] += record['reposts']
-                stats['comments'] += record['comments']
-
-            self.university_stats[university] = {
-                'posts_count': len(university_posts),
-                'authors_count': len(university_authors),
-                'likes_count': stats['likes'],
-                'views_count': stats['views'],
-                'reposts_count': stats['reposts'],
-                'comments_count': stats['comments'],
-                'posts_data': university_posts
-            }
+            added = self.data.append_posts(university, posts)
+            if writer is not None:
+                writer.write(self.data.to_dataframe(slice(len(self.data) - added, len(self.data))))
+            university_posts = self.data.view(university)
+            self.university_stats[university] = {**university_posts.summary(), 'posts_data': university_posts}
             self.print_university_stats(university)
 
     def print_university_stats(self, university):
@@ -129,18 +180,11 @@ class VKUniversityMentionsCollector:
 
         plt.figure(figsize=(12, 7))
         sns.set_style("whitegrid")
-        daily_data = {}
-
-        for university, stats in self.university_stats.items():
-            daily_data[university] = {}
-            for post in stats['posts_data']:
-                date_str = post['date'].strftime('%Y-%m-%d')
-                daily_data[university][date_str] = daily_data[university].get(date_str, 0) + 1
-
-        all_dates = sorted({d for u in daily_data.values() for d in u.keys()})
-        for university, date_counts in daily_data.items():
-            y = [date_counts.get(date, 0) for date in all_dates]
-            plt.plot(all_dates, y, marker='o', linestyle='-', label=university)
+        # Количество публикаций университет x день за один проход по хранилищу
+        daily_data = self.data.counts_table('day').reindex(list(self.university_stats), fill_value=0)
+        all_dates = [period.strftime('%Y-%m-%d') for period in daily_data.columns]
+        for university, counts in daily_data.iterrows():
+            plt.plot(all_dates, counts.to_numpy(), marker='o', linestyle='-', label=university)
 
         plt.title('Количество публикаций по дням (последние 5 дней)', fontsize=16)
         plt.xlabel('Дата', fontsize=14)
@@ -152,11 +196,40 @@ class VKUniversityMentionsCollector:
         print(f"График сохранен в файл: {filename}")
         plt.show()
 
+
+def print_live_stats(university, snapshot):
+    print(f"  [{university}] загружено {snapshot['posts_count']} публикаций, "
+          f"~{snapshot['authors_count']} авторов, {snapshot['likes_count']} лайков")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Сбор упоминаний университетов во ВКонтакте за последние 5 дней')
+    parser.add_argument('--checkpoint', type=str, default='vk_checkpoint.sqlite',
+                        help='Файл SQLite с прогрессом сбора этого сборщика (пустая строка - без сохранения прогресса)')
+    parser.add_argument('--since-last-run', action='store_true',
+                        help='Загрузить только публикации новее сохраненных при прошлом запуске')
+    parser.add_argument('--live-stats', action='store_true',
+                        help='Печатать статистику университета по мере загрузки публикаций')
+    parser.add_argument('--export', type=str, default=None,
+                        help='Потоковая выгрузка публикаций по мере сбора (.csv, .csv.gz, .parquet или .xlsx)')
+    args = parser.parse_args()
+    if args.since_last_run and not args.checkpoint:
+        parser.error('--since-last-run требует --checkpoint')
+    try:
+        checkpoint = CollectionCheckpoint(args.checkpoint, collector='vk') if args.checkpoint else None
+    except ValueError as e:
+        parser.error(str(e))
+
     config = configparser.ConfigParser()
     config.read('config.ini')
     vk_token = config['vk']['access_token']
-    collector = VKUniversityMentionsCollector(vk_token)
+    collector = VKUniversityMentionsCollector(vk_token, on_progress=print_live_stats if args.live_stats else None)
     universities = ["СПбГУ", "МГУ"]
-    collector.collect_data(universities)
+    if args.export:
+        with open_post_writer(args.export) as writer:
+            collector.collect_data(universities, checkpoint=checkpoint, since_last_run=args.since_last_run,
+                                   writer=writer)
+        print(f"Публикации выгружены в файл: {args.export}")
+    else:
+        collector.collect_data(universities, checkpoint=checkpoint, since_last_run=args.since_last_run)
     collector.plot_daily_posts(filename="университеты_по_дням.png")
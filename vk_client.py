@@ -0,0 +1,203 @@
+import asyncio
+import threading
+
+import aiohttp
+import vk_api
+
+from rate_limiter import TokenBucket
+
+VK_API_URL = "https://api.vk.com/method/"
+VK_API_VERSION = "5.199"
+
+# Коды ошибок VK, после которых запрос имеет смысл повторить:
+# 6 - слишком много запросов в секунду, 9 - flood control, 10 - внутренняя ошибка сервера
+RETRY_ERROR_CODES = (6, 9, 10)
+
+# HTTP-статусы, после которых запрос повторяется: перегрузка и ошибки сервера
+RETRY_HTTP_STATUSES = (429, 500, 502, 503, 504)
+
+# error_code у VkNetworkError: у ошибок VK API коды положительные
+NETWORK_ERROR_CODE = -1
+
+
+class VkNetworkError(vk_api.exceptions.ApiError):
+    """
+    Сетевая ошибка или ошибка HTTP при вызове VK API (обрыв соединения, таймаут,
+    ответ 5xx), оставшаяся после всех повторов. Подкласс ApiError с кодом
+    NETWORK_ERROR_CODE, поэтому сборщики обрабатывают ее так же, как ошибки API;
+    исходное исключение доступно в __cause__.
+    """
+
+    def __init__(self, method, values, exception):
+        super().__init__(None, method, values, True, {
+            'error_code': NETWORK_ERROR_CODE,
+            'error_msg': f"Сетевая ошибка: {type(exception).__name__}: {exception}",
+        })
+
+
+def _is_transient(exception):
+    # Обрыв соединения и таймаут повторяются, из ответов HTTP - только RETRY_HTTP_STATUSES
+    if isinstance(exception, aiohttp.ClientResponseError):
+        return exception.status in RETRY_HTTP_STATUSES
+    return isinstance(exception, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class AsyncVkClient:
+    """
+    Асинхронный клиент VK API на aiohttp с пулом keep-alive соединений.
+
+    Реализует подмножество методов, которое используют сборщики
+    (newsfeed.search и execute). Ошибки с кодами из RETRY_ERROR_CODES, обрывы
+    соединения, таймауты и ответы HTTP из RETRY_HTTP_STATUSES повторяются с
+    экспоненциальной задержкой. Остальные ошибки API поднимаются как
+    vk_api.exceptions.ApiError - так же, как у vk_api, а сетевые - как ее
+    подкласс VkNetworkError. Адрес API задается
+    параметром base_url, поэтому клиент можно направить на локальный сервер-заглушку.
+    """
+
+    def __init__(self, access_token, base_url=VK_API_URL, version=VK_API_VERSION, rate_limiter=None,
+                 max_connections=10, max_retries=5, backoff=0.5, timeout=30):
+        """
+        :param access_token: Токен доступа VK API
+        :param base_url: Адрес, к которому добавляется имя метода
+        :param version: Версия VK API (параметр v)
+        :param rate_limiter: Ограничитель частоты запросов (TokenBucket); None - без ограничения
+        :param max_connections: Размер пула соединений
+        :param max_retries: Сколько раз повторять запрос при ошибках 6/9/10 и сетевых ошибках
+        :param backoff: Задержка перед первым повтором в секундах (удваивается с каждой попыткой)
+        :param timeout: Таймаут одного HTTP-запроса в секундах
+        """
+        self.access_token = access_token
+        self.base_url = base_url if base_url.endswith('/') else base_url + '/'
+        self.version = version
+        self.rate_limiter = rate_limiter
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @staticmethod
+    def _form_value(value):
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, (list, tuple)):
+            return ','.join(str(item) for item in value)
+        return str(value)
+
+    async def call(self, method, **params):
+        """
+        Вызов метода VK API
+        :param method: Имя метода, например 'newsfeed.search'
+        :param params: Параметры метода (None пропускаются)
+        :return: Содержимое поля response ответа
+        """
+        data = {key: self._form_value(value) for key, value in params.items() if value is not None}
+        data['access_token'] = self.access_token
+        data['v'] = self.version
+
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+            try:
+                async with self._get_session().post(self.base_url + method, data=data) as response:
+                    response.raise_for_status()
+                    payload = await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not _is_transient(e) or attempt >= self.max_retries:
+                    raise VkNetworkError(method, params, e) from e
+            else:
+                error = payload.get('error')
+                if error is None:
+                    return payload['response']
+                if error.get('error_code') not in RETRY_ERROR_CODES or attempt >= self.max_retries:
+                    raise vk_api.exceptions.ApiError(None, method, params, True, error)
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
+
+    async def newsfeed_search(self, **params):
+        return await self.call('newsfeed.search', **params)
+
+    async def execute(self, code):
+        return await self.call('execute', code=code)
+
+
+class _Newsfeed:
+    def __init__(self, client):
+        self._client = client
+
+    def search(self, **params):
+        return self._client.call('newsfeed.search', **params)
+
+
+class VkClient:
+    """
+    Синхронная обертка над AsyncVkClient с интерфейсом vk_api (api.newsfeed.search(...), api.execute(...)).
+
+    Цикл событий работает в отдельном фоновом потоке, поэтому вызовы из
+    нескольких рабочих потоков сборщика выполняются одновременно и делят один
+    пул соединений. Передается в сборщики вместо vk_api.VkApi(...).get_api().
+    """
+
+    def __init__(self, access_token, **client_options):
+        """
+        :param access_token: Токен доступа VK API
+        :param client_options: Параметры AsyncVkClient (base_url, max_retries, backoff, ...)
+        """
+        self.client = AsyncVkClient(access_token, **client_options)
+        self.newsfeed = _Newsfeed(self)
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='vk-client', daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def call(self, method, **params):
+        future = asyncio.run_coroutine_threadsafe(self.client.call(method, **params), self._ensure_loop())
+        return future.result()
+
+    def execute(self, code):
+        return self.call('execute', code=code)
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self.client.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
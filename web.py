@@ -1,4 +1,5 @@
 import vk_api
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import time
@@ -8,19 +9,55 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import calendar
 import configparser
+import argparse
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from rate_limiter import TokenBucket
+from vk_client import VkClient
+from checkpoint import CollectionCheckpoint
+from post_store import PostStore
+from live_stats import StatsAccumulator
+from post_export import EXCEL_MAX_ROWS, open_post_writer
+
+# Максимум результатов, которые newsfeed.search отдает по одному запросу (с учетом offset)
+MAX_SEARCH_RESULTS = 1000
+
+# Максимум вызовов API внутри одного запроса execute
+EXECUTE_BATCH_SIZE = 25
+
+# Окна короче этого не дробятся, даже если в них больше MAX_SEARCH_RESULTS публикаций
+MIN_WINDOW_SECONDS = 60
+
+# total_count окна в сохраненном плане, если первый запрос окна завершился ошибкой:
+# при продолжении сбора такое окно разбивается заново
+UNPLANNED_WINDOW = -1
+
 
 class VKUniversityMentionsCollector:
-    def __init__(self, access_token):
+    def __init__(self, access_token, api=None, rate_limiter=None, max_workers=4, use_execute=True, on_progress=None):
         """
         Инициализация сборщика данных о упоминаниях университетов
         :param access_token: Токен доступа VK API
+        :param api: Объект API с методом newsfeed.search (по умолчанию - асинхронный VkClient; в тестах - заглушка)
+        :param rate_limiter: Общий ограничитель частоты запросов (TokenBucket) для всех потоков
+        :param max_workers: Количество потоков для параллельного сбора
+        :param use_execute: Упаковывать запросы newsfeed.search в execute (до 25 вызовов за запрос)
+        :param on_progress: Функция (университет, снимок статистики), вызываемая после каждого загруженного окна
         """
         self.access_token = access_token
-        self.vk_session = vk_api.VkApi(token=access_token)
-        self.vk = self.vk_session.get_api()
-        self.data = []
-        self.unique_authors = set()
+        self.vk = api if api is not None else VkClient(access_token)
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.max_workers = max_workers
+        # Потоков пула окон одного запроса; collect_data делит max_workers между университетами
+        self.window_workers = max_workers
+        self.use_execute = use_execute
+        self.data = PostStore()
         self.university_stats = {}
+        # Живая статистика по публикациям, загруженным в этом запуске (см. live_snapshot)
+        self.live_stats = {}
+        self._live_lock = threading.Lock()
+        self.on_progress = on_progress
 
     def search_posts(self, query, start_time, end_time, count=100):
         """
@@ -35,41 +72,330 @@ class VKUniversityMentionsCollector:
         offset = 0
         total_count = 1  # Начальное значение для входа в цикл
         
-        while offset < total_count and offset < 1000:  # API ограничение - максимум 1000 записей
-            try:
-                
-                response = self.vk.newsfeed.search(
-                    q=query,
-                    start_time=start_time,
-                    end_time=end_time,
-                    count=count,
-                    offset=offset
-                )
-                
-                # Устанавливаем общее количество найденных записей
-                if offset == 0:
-                    total_count = min(response['total_count'], 1000)
-                
-                # Добавляем найденные записи
-                if 'items' in response:
-                    posts_found.extend(response['items'])
-                
-                offset += count
-                
-                # Задержка для избежания превышения лимита запросов
-                time.sleep(0.5)
-                
-            except vk_api.exceptions.ApiError as e:
-                print(f"Ошибка API: {e}")
+        while offset < total_count and offset < MAX_SEARCH_RESULTS:  # API ограничение - максимум 1000 записей
+            response = self._search_page(query, start_time, end_time, count, offset)
+            if response is None:
                 break
+            
+            # Устанавливаем общее количество найденных записей
+            if offset == 0:
+                total_count = min(response['total_count'], MAX_SEARCH_RESULTS)
+            
+            # Добавляем найденные записи
+            if 'items' in response:
+                posts_found.extend(response['items'])
+            
+            offset += count
                 
         return posts_found
 
-    def collect_data(self, universities, year=2024):
+    def _search_page(self, query, start_time, end_time, count, offset):
+        """
+        Один запрос newsfeed.search с учетом общего ограничителя частоты
+        :return: Ответ API или None при ошибке
+        """
+        try:
+            self.rate_limiter.acquire()
+            return self.vk.newsfeed.search(
+                q=query,
+                start_time=start_time,
+                end_time=end_time,
+                count=count,
+                offset=offset
+            )
+        except vk_api.exceptions.ApiError as e:
+            print(f"Ошибка API: {e}")
+            return None
+
+    @staticmethod
+    def build_execute_code(requests):
+        """
+        Код VKScript для метода execute, выполняющий несколько поисковых запросов
+        :param requests: Список кортежей (query, start_time, end_time, count, offset)
+        :return: Строка кода, возвращающая массив ответов в порядке запросов
+        """
+        calls = ",".join(
+            "API.newsfeed.search({})".format(json.dumps({
+                'q': query,
+                'start_time': start_time,
+                'end_time': end_time,
+                'count': count,
+                'offset': offset,
+            }, ensure_ascii=False))
+            for query, start_time, end_time, count, offset in requests
+        )
+        return f"return [{calls}];"
+
+    def _execute_batch(self, requests):
+        """
+        Выполнение до EXECUTE_BATCH_SIZE поисковых запросов одним вызовом execute.
+        Если execute завершился ошибкой или отдельный вызов вернул false,
+        соответствующие запросы повторяются по одному
+        :param requests: Список кортежей (query, start_time, end_time, count, offset)
+        :return: Список ответов (None для запросов, завершившихся ошибкой)
+        """
+        try:
+            self.rate_limiter.acquire()
+            responses = self.vk.execute(code=self.build_execute_code(requests))
+        except vk_api.exceptions.ApiError as e:
+            print(f"Ошибка execute, повтор отдельными запросами: {e}")
+            responses = None
+
+        if not isinstance(responses, list) or len(responses) != len(requests):
+            responses = [None] * len(requests)
+
+        return [
+            response if response else self._search_page(*request)
+            for request, response in zip(requests, responses)
+        ]
+
+    def _search_many(self, requests, executor):
+        """
+        Выполнение набора поисковых запросов: пакетами через execute
+        или параллельными одиночными вызовами, если use_execute выключен
+        :param requests: Список кортежей (query, start_time, end_time, count, offset)
+        :param executor: Пул потоков для параллельной отправки
+        :return: Список ответов в порядке запросов
+        """
+        if not self.use_execute:
+            return list(executor.map(lambda request: self._search_page(*request), requests))
+
+        futures = [
+            executor.submit(self._execute_batch, requests[i:i + EXECUTE_BATCH_SIZE])
+            for i in range(0, len(requests), EXECUTE_BATCH_SIZE)
+        ]
+        return [response for future in futures for response in future.result()]
+
+    def plan_windows(self, query, start_time, end_time, count=100, failed=None):
+        """
+        Адаптивное разбиение периода на окна, в каждом из которых не больше
+        MAX_SEARCH_RESULTS публикаций. Окно, в котором API сообщает больше
+        результатов, чем можно пролистать, делится пополам; окна одного уровня
+        опрашиваются параллельно. Первая страница каждого итогового окна
+        сохраняется, чтобы не запрашивать ее повторно.
+        :param query: Поисковый запрос
+        :param start_time: Начало периода
+        :param end_time: Конец периода
+        :param count: Размер страницы
+        :param failed: Список, в который добавляются окна (начало, конец), не разбитые
+            из-за ошибки API (без него такие окна пропускаются)
+        :return: Список кортежей (начало, конец, total_count, публикации первой страницы)
+        """
+        leaves = []
+        frontier = [(start_time, end_time)]
+        with ThreadPoolExecutor(max_workers=self.window_workers) as executor:
+            while frontier:
+                responses = self._search_many(
+                    [(query, window_start, window_end, count, 0) for window_start, window_end in frontier],
+                    executor
+                )
+                next_frontier = []
+                for (window_start, window_end), response in zip(frontier, responses):
+                    if response is None:
+                        if failed is not None:
+                            failed.append((window_start, window_end))
+                        continue
+                    total_count = response.get('total_count', 0)
+                    if total_count > MAX_SEARCH_RESULTS and window_end - window_start > MIN_WINDOW_SECONDS:
+                        middle = (window_start + window_end) // 2
+                        next_frontier.append((window_start, middle))
+                        next_frontier.append((middle + 1, window_end))
+                    else:
+                        if total_count > MAX_SEARCH_RESULTS:
+                            print(f"Окно {window_start}-{window_end}: найдено {total_count}, "
+                                  f"доступно только {MAX_SEARCH_RESULTS}")
+                        leaves.append((window_start, window_end, total_count, response.get('items', [])))
+                frontier = next_frontier
+        return sorted(leaves, key=lambda leaf: leaf[0])
+
+    def search_posts_adaptive(self, query, start_time, end_time, count=100, checkpoint=None, since_last_run=False):
+        """
+        Поиск всех публикаций за период в обход ограничения в 1000 результатов:
+        период делится на окна (plan_windows), оставшиеся страницы всех окон
+        загружаются параллельно (пакетами execute, если use_execute включен),
+        дубликаты удаляются по (owner_id, post_id)
+        :param query: Поисковый запрос
+        :param start_time: Время начала периода поиска
+        :param end_time: Время окончания периода поиска
+        :param count: Максимальное количество записей в одном запросе
+        :param checkpoint: CollectionCheckpoint для сохранения прогресса; при повторном
+            запуске загружаются только незавершенные окна сохраненного плана
+        :param since_last_run: Загружать только публикации новее самой свежей сохраненной
+            (требует checkpoint); результат все равно содержит весь период из хранилища
+        :return: Список публикаций
+        """
+        if checkpoint is None:
+            return self._fetch_windows(query, self.plan_windows(query, start_time, end_time, count), count)
+
+        fetch_start = start_time
+        if since_last_run:
+            # Сначала дозагружаем прерванные периоды, иначе отметка окажется выше пропущенных окон
+            for period_start, period_end in checkpoint.unfinished_periods(query):
+                self._fetch_period(query, period_start, period_end, count, checkpoint)
+            high_water_mark = checkpoint.high_water_mark(query)
+            if high_water_mark is not None:
+                fetch_start = max(start_time, high_water_mark + 1)
+
+        if fetch_start <= end_time:
+            self._fetch_period(query, fetch_start, end_time, count, checkpoint)
+        return checkpoint.load_posts(query, start_time, end_time)
+
+    def _fetch_period(self, query, start_time, end_time, count, checkpoint):
+        """
+        Загрузка периода с сохранением прогресса: план окон сохраняется один раз,
+        каждое окно после загрузки всех страниц отмечается завершенным вместе со
+        своими публикациями. Окна, не разбитые или не загруженные из-за ошибок API,
+        остаются незавершенными и загружаются при следующем запуске
+        """
+        period = (start_time, end_time)
+        plan = checkpoint.load_plan(query, start_time, end_time)
+        if plan:
+            leaves = []
+            for start, end, total_count, done in plan:
+                if done:
+                    continue
+                if total_count == UNPLANNED_WINDOW:
+                    leaves.extend(self._plan_period(query, start, end, count, checkpoint, period, replan=True))
+                else:
+                    # Первая страница незавершенных окон не сохранялась - загружаем окна с начала
+                    leaves.append((start, end, total_count, None))
+        else:
+            leaves = self._plan_period(query, start_time, end_time, count, checkpoint, period)
+
+        for group in self._window_groups(leaves, count):
+            for window_start, window_end, window_posts, complete in self._fetch_window_pages(query, group, count):
+                if not complete:
+                    print(f"Окно {window_start}-{window_end}: не все страницы загружены, "
+                          f"окно будет загружено при следующем запуске")
+                    continue
+                checkpoint.mark_window_done(query, window_start, window_end, window_posts, period=period)
+                self._record_posts(query, window_posts)
+
+    def _plan_period(self, query, start_time, end_time, count, checkpoint, period, replan=False):
+        """
+        Разбиение окна на окна plan_windows с сохранением в план периода period;
+        окна, не разбитые из-за ошибки API, сохраняются с total_count UNPLANNED_WINDOW
+        :param replan: Окно уже есть в плане с total_count UNPLANNED_WINDOW; если оно
+            разбито на меньшие окна, оно отмечается завершенным
+        :return: Окна из plan_windows
+        """
+        failed = []
+        leaves = self.plan_windows(query, start_time, end_time, count, failed=failed)
+        checkpoint.save_plan(query, *period, [leaf[:3] for leaf in leaves] +
+                             [(start, end, UNPLANNED_WINDOW) for start, end in failed])
+        window = (start_time, end_time)
+        if replan and window not in failed and all(leaf[:2] != window for leaf in leaves):
+            checkpoint.mark_window_done(query, start_time, end_time, period=period)
+        return leaves
+
+    def _window_groups(self, leaves, count):
+        """
+        Разбиение окон на группы не больше одной "волны" запросов пула,
+        чтобы прогресс и живая статистика обновлялись по ходу сбора
+        :return: Список групп окон
+        """
+        group_limit = self.window_workers * (EXECUTE_BATCH_SIZE if self.use_execute else 1)
+        groups, group_requests = [[]], 0
+        for leaf in leaves:
+            leaf_requests = len(self._page_offsets(leaf, count))
+            if groups[-1] and group_requests + leaf_requests > group_limit:
+                groups.append([])
+                group_requests = 0
+            groups[-1].append(leaf)
+            group_requests += leaf_requests
+        return groups
+
+    @staticmethod
+    def _page_offsets(leaf, count):
+        # Смещения страниц, которые еще нужно загрузить для окна
+        _, _, total_count, first_items = leaf
+        first_offset = 0 if first_items is None else count
+        return range(first_offset, min(total_count, MAX_SEARCH_RESULTS), count)
+
+    def _fetch_window_pages(self, query, leaves, count):
+        """
+        Параллельная загрузка недостающих страниц окон
+        :param leaves: Окна из plan_windows (first_items=None - первая страница не загружена)
+        :return: Список кортежей (начало, конец, публикации окна, все ли страницы загружены)
+        """
+        requests = []
+        for leaf in leaves:
+            window_start, window_end, _, _ = leaf
+            requests.extend(
+                (query, window_start, window_end, count, offset)
+                for offset in self._page_offsets(leaf, count)
+            )
+        with ThreadPoolExecutor(max_workers=self.window_workers) as executor:
+            responses = iter(self._search_many(requests, executor))
+
+        windows = []
+        for leaf in leaves:
+            window_start, window_end, _, first_items = leaf
+            window_posts = list(first_items or [])
+            complete = True
+            for _ in self._page_offsets(leaf, count):
+                response = next(responses)
+                if response is None:
+                    complete = False
+                else:
+                    window_posts.extend(response.get('items', []))
+            windows.append((window_start, window_end, window_posts, complete))
+        return windows
+
+    def _fetch_windows(self, query, leaves, count):
+        # Загрузка всех окон без сохранения прогресса, с удалением дубликатов
+        posts_found = []
+        for window_posts in self._iter_window_posts(query, leaves, count):
+            posts_found.extend(window_posts)
+        return posts_found
+
+    def _iter_window_posts(self, query, leaves, count):
+        # Публикации окон по мере загрузки групп окон, без повторов по (owner_id, post_id)
+        seen = set()
+        for group in self._window_groups(leaves, count):
+            for _, _, window_posts, _ in self._fetch_window_pages(query, group, count):
+                new_posts = []
+                for post in window_posts:
+                    key = (post.get('owner_id'), post.get('id'))
+                    if key not in seen:
+                        seen.add(key)
+                        new_posts.append(post)
+                self._record_posts(query, new_posts)
+                yield new_posts
+
+    def iter_posts(self, query, start_time, end_time, count=100):
+        """
+        Потоковый вариант search_posts_adaptive: публикации отдаются порциями
+        (по одному окну) сразу после загрузки, не дожидаясь всего периода
+        :return: Генератор списков публикаций
+        """
+        yield from self._iter_window_posts(query, self.plan_windows(query, start_time, end_time, count), count)
+
+    def _record_posts(self, university, posts):
+        # Обновление живой статистики университета по только что загруженным публикациям
+        with self._live_lock:
+            accumulator = self.live_stats.setdefault(university, StatsAccumulator())
+        accumulator.add_posts(posts)
+        if self.on_progress is not None:
+            self.on_progress(university, accumulator.snapshot())
+
+    def live_snapshot(self):
+        """
+        Текущая статистика сбора, пока он идет (можно вызывать из другого потока)
+        :return: Словарь {университет: снимок StatsAccumulator.snapshot()}
+        """
+        with self._live_lock:
+            accumulators = dict(self.live_stats)
+        return {university: accumulator.snapshot() for university, accumulator in accumulators.items()}
+
+    def collect_data(self, universities, year=2024, checkpoint=None, since_last_run=False, writer=None):
         """
         Сбор данных о упоминаниях университетов за указанный год
         :param universities: Список университетов для поиска
         :param year: Год, за который собираются данные
+        :param checkpoint: CollectionCheckpoint для возобновления сбора после сбоя
+        :param since_last_run: Загружать только публикации новее сохраненных в checkpoint
+        :param writer: PostWriter, в который публикации каждого университета пишутся сразу после сбора
         """
         # Устанавливаем период поиска: весь указанный год
         start_date = datetime(year, 1, 1)
@@ -81,14 +407,33 @@ class VKUniversityMentionsCollector:
         
         start_timestamp = int(start_date.timestamp())
         end_timestamp = int(end_date.timestamp())
+        year_start = int(datetime(year, 1, 1).timestamp())
+        year_end = int(datetime(year + 1, 1, 1).timestamp()) - 1
         
         print(f"Период поиска: с {start_date.strftime('%d.%m.%Y')} по {end_date.strftime('%d.%m.%Y')}")
         
+        # Запросы по всем университетам и временным окнам идут параллельно,
+        # суммарную частоту ограничивает общий self.rate_limiter. Потоки делятся:
+        # university_workers университетов по window_workers потоков окон, всего
+        # не больше max_workers одновременных запросов
+        university_workers = max(1, min(self.max_workers, len(universities)))
+        self.window_workers = max(1, self.max_workers // university_workers)
+        try:
+            with ThreadPoolExecutor(max_workers=university_workers) as executor:
+                futures = {
+                    university: executor.submit(
+                        self.search_posts_adaptive, university, start_timestamp, end_timestamp,
+                        checkpoint=checkpoint, since_last_run=since_last_run
+                    )
+                    for university in universities
+                }
+        finally:
+            self.window_workers = self.max_workers
+        
         for university in universities:
             print(f"\nПоиск упоминаний: {university}")
             
-            # Ищем публикации для каждого университета
-            posts = self.search_posts(university, start_timestamp, end_timestamp)
+            posts = futures[university].result()
             
             if not posts:
                 print(f"Публикации для '{university}' не найдены")
@@ -96,14 +441,6 @@ class VKUniversityMentionsCollector:
             
             print(f"Найдено {len(posts)} публикаций для '{university}'")
             
-            # Переменные для статистики по текущему университету
-            university_posts = []
-            university_authors = set()
-            university_likes = 0
-            university_views = 0
-            university_reposts = 0
-            university_comments = 0
-
             for i, post in enumerate(posts):
                 timestamp = post.get('date', 0)
                 date = datetime.fromtimestamp(timestamp)
@@ -112,54 +449,16 @@ class VKUniversityMentionsCollector:
                 else:
                     break
 
-            for post in tqdm(posts, desc=f"Обработка публикаций {university}"):
-                try:
-                    # Извлекаем необходимые данные из публикации
-                    post_data = {
-                        'university': university,
-                        'post_id': post.get('id', ''),
-                        'owner_id': post.get('owner_id', ''),
-                        'author_id': post.get('from_id', post.get('owner_id', '')),
-                        'date': datetime.fromtimestamp(post.get('date', 0)),
-                        'text': post.get('text', ''),
-                        'likes': post.get('likes', {}).get('count', 0),
-                        'views': post.get('views', {}).get('count', 0) if 'views' in post else 0,
-                        'reposts': post.get('reposts', {}).get('count', 0),
-                        'comments': post.get('comments', {}).get('count', 0),
-                        'post_url': f"https://vk.com/wall{post.get('owner_id', '')}_{post.get('id', '')}"
-                    }
-                    
-                    # Проверяем, что публикация относится к указанному году
-                    post_year = post_data['date'].year
-                    if post_year != year:
-                        continue
-                    
-                    # Добавляем данные в общий список
-                    self.data.append(post_data)
-                    university_posts.append(post_data)
-                    
-                    # Обновляем множество всех авторов
-                    self.unique_authors.add(post_data['author_id'])
-                    university_authors.add(post_data['author_id'])
-                    
-                    # Накапливаем статистику
-                    university_likes += post_data['likes']
-                    university_views += post_data['views']
-                    university_reposts += post_data['reposts']
-                    university_comments += post_data['comments']
-                    
-                except Exception as e:
-                    print(f"Ошибка при обработке публикации: {e}")
-            
+            # В хранилище попадают только публикации указанного года
+            added = self.data.append_posts(university, posts, start_time=year_start, end_time=year_end)
+            if writer is not None:
+                writer.write(self.data.to_dataframe(slice(len(self.data) - added, len(self.data))))
+            university_posts = self.data.view(university)
+
             # Сохраняем статистику по университету
             self.university_stats[university] = {
-                'posts_count': len(university_posts),
-                'authors_count': len(university_authors),
-                'likes_count': university_likes,
-                'views_count': university_views,
-                'reposts_count': university_reposts,
-                'comments_count': university_comments,
-                'posts_data': university_posts  # Сохраняем данные для построения графика
+                **university_posts.summary(),
+                'posts_data': university_posts  # Представление хранилища для построения графика
             }
             
             # Выводим статистику по текущему университету
@@ -186,6 +485,15 @@ class VKUniversityMentionsCollector:
         print(f"Общее количество комментариев: {stats['comments_count']}")
         print("=" * 50)
     
+    def monthly_counts(self, year=2024):
+        """
+        Количество публикаций по месяцам указанного года
+        :param year: Год
+        :return: DataFrame: строки - университеты из university_stats, колонки - 12 месяцев
+        """
+        table = self.data.counts_table('month', datetime(year, 1, 1), datetime(year, 12, 31, 23, 59, 59))
+        return table.reindex(list(self.university_stats), fill_value=0)
+
     def plot_monthly_posts(self, year=2024, filename="monthly_posts.png"):
         """
         Построение графика количества публикаций по месяцам
@@ -199,19 +507,8 @@ class VKUniversityMentionsCollector:
         plt.figure(figsize=(12, 7))
         sns.set_style("whitegrid")
         
-        # Словарь для хранения данных по месяцам для каждого университета
-        monthly_data = {}
-        
-        # Для каждого университета подготавливаем данные
-        for university, stats in self.university_stats.items():
-            monthly_data[university] = [0] * 12  # Создаем список из 12 нулей для каждого месяца
-            
-            # Подсчитываем публикации по месяцам
-            for post in stats['posts_data']:
-                post_date = post['date']
-                if post_date.year == year:
-                    month_idx = post_date.month - 1  # Индексы от 0 до 11
-                    monthly_data[university][month_idx] += 1
+        # Количество публикаций университет x месяц за один проход по хранилищу
+        monthly_data = self.monthly_counts(year)
         
         # Получаем список названий месяцев
         months = [calendar.month_name[i+1] for i in range(12)]
@@ -220,8 +517,8 @@ class VKUniversityMentionsCollector:
         x = list(range(12))
         
         # Строим график для каждого университета
-        for university, counts in monthly_data.items():
-            plt.plot(x, counts, marker='o', linestyle='-', label=university)
+        for university, counts in monthly_data.iterrows():
+            plt.plot(x, counts.to_numpy(), marker='o', linestyle='-', label=university)
         
         # Настраиваем оси и заголовок
         plt.title(f'Количество публикаций по месяцам ({year} год)', fontsize=16)
@@ -238,42 +535,41 @@ class VKUniversityMentionsCollector:
         # Показываем график
         plt.show()
     
-    def save_to_excel(self, filename='university_mentions.xlsx'):
+    def save_to_excel(self, filename='university_mentions.xlsx', include_posts=True):
         """
-        Сохранение собранных данных в Excel файл
+        Сохранение сводной статистики (и, если помещаются на лист, публикаций) в Excel файл.
+        Для полной выгрузки большого числа публикаций используйте export_posts (CSV/Parquet)
         :param filename: Имя выходного файла
+        :param include_posts: Добавить лист со всеми публикациями
         """
         if not self.data:
             print("Нет данных для сохранения")
             return
         
-        df = pd.DataFrame(self.data)
-        
         # Добавляем статистику
         stats = {
             'total_posts': len(self.data),
-            'unique_authors': len(self.unique_authors)
+            'unique_authors': self.unique_authors_count()
         }
         
-        # Группировка по университетам для Excel
-        university_stats_df = df.groupby('university').agg({
-            'post_id': 'count',
-            'author_id': 'nunique',
-            'likes': 'sum',
-            'views': 'sum',
-            'reposts': 'sum',
-            'comments': 'sum'
-        }).reset_index()
+        # Статистика по университетам уже посчитана при сборе
+        university_stats_df = pd.DataFrame([
+            {
+                'Университет': university,
+                'Количество публикаций': university_stats['posts_count'],
+                'Количество авторов': university_stats['authors_count'],
+                'Всего лайков': university_stats['likes_count'],
+                'Всего просмотров': university_stats['views_count'],
+                'Всего репостов': university_stats['reposts_count'],
+                'Всего комментариев': university_stats['comments_count'],
+            }
+            for university, university_stats in self.university_stats.items()
+        ])
         
-        university_stats_df.columns = [
-            'Университет', 
-            'Количество публикаций', 
-            'Количество авторов', 
-            'Всего лайков', 
-            'Всего просмотров', 
-            'Всего репостов', 
-            'Всего комментариев'
-        ]
+        if include_posts and len(self.data) > EXCEL_MAX_ROWS:
+            print(f"Публикаций больше, чем строк на листе Excel ({EXCEL_MAX_ROWS}): "
+                  f"лист с публикациями пропущен, используйте export_posts")
+            include_posts = False
         
         # Создаем объект writer
         with pd.ExcelWriter(filename, engine='openpyxl') as writer:
@@ -282,60 +578,57 @@ class VKUniversityMentionsCollector:
             university_stats_df.to_excel(writer, sheet_name='Статистика по университетам', index=False)
             
             # Сохраняем полные данные
-            df_for_export = df[['university', 'date', 'text', 'likes', 'views', 'reposts', 'comments', 'post_url']]
-            df_for_export.columns = [
-                'Университет', 
-                'Дата публикации', 
-                'Текст публикации', 
-                'Лайки', 
-                'Просмотры', 
-                'Репосты', 
-                'Комментарии',
-                'Ссылка на публикацию'
-            ]
-            df_for_export.to_excel(writer, sheet_name='Публикации', index=False)
+            if include_posts:
+                df_for_export = self.data.to_dataframe()[
+                    ['university', 'date', 'text', 'likes', 'views', 'reposts', 'comments', 'post_url']
+                ]
+                df_for_export.columns = [
+                    'Университет', 
+                    'Дата публикации', 
+                    'Текст публикации', 
+                    'Лайки', 
+                    'Просмотры', 
+                    'Репосты', 
+                    'Комментарии',
+                    'Ссылка на публикацию'
+                ]
+                df_for_export.to_excel(writer, sheet_name='Публикации', index=False)
             
             # Добавляем лист с помесячной статистикой
             self.save_monthly_stats_to_excel(writer, year=2024)
         
         print(f"\nДанные сохранены в файл: {filename}")
     
+    def export_posts(self, path, batch_size=50000):
+        """
+        Потоковая выгрузка всех публикаций порциями в CSV, CSV.gz, Parquet или Excel (write-only)
+        :param path: Путь к файлу; формат определяется по расширению
+        :param batch_size: Количество публикаций в порции
+        """
+        with open_post_writer(path) as writer:
+            for batch in self.data.iter_dataframes(batch_size):
+                writer.write(batch)
+        print(f"\nПубликации ({writer.rows_written}) выгружены в файл: {path}")
+
     def save_monthly_stats_to_excel(self, writer, year=2024):
         """
         Сохранение статистики по месяцам в Excel
         :param writer: Excel writer объект
         :param year: Год для статистики
         """
-        # Словарь для хранения данных по месяцам для каждого университета
-        monthly_data = {}
-        
-        # Для каждого университета подготавливаем данные
-        for university, stats in self.university_stats.items():
-            monthly_data[university] = [0] * 12  # Создаем список из 12 нулей для каждого месяца
-            
-            # Подсчитываем публикации по месяцам
-            for post in stats['posts_data']:
-                post_date = post['date']
-                if post_date.year == year:
-                    month_idx = post_date.month - 1  # Индексы от 0 до 11
-                    monthly_data[university][month_idx] += 1
-        
-        # Получаем список названий месяцев
-        months = [calendar.month_name[i+1] for i in range(12)]
-        
-        # Создаем DataFrame для сохранения
-        monthly_df = pd.DataFrame(columns=['Университет'] + months)
-        
-        # Заполняем данные
-        for university, counts in monthly_data.items():
-            row_data = {'Университет': university}
-            for i, month in enumerate(months):
-                row_data[month] = counts[i]
-            monthly_df = pd.concat([monthly_df, pd.DataFrame([row_data])], ignore_index=True)
+        monthly_df = self.monthly_counts(year)
+        monthly_df.columns = [calendar.month_name[period.month] for period in monthly_df.columns]
+        monthly_df = monthly_df.rename_axis('Университет').reset_index()
         
         # Сохраняем в Excel
         monthly_df.to_excel(writer, sheet_name='Статистика по месяцам', index=False)
 
+    def unique_authors_count(self):
+        """
+        Количество уникальных авторов по всем университетам
+        """
+        return len(np.unique(self.data.column('author_id')))
+
     def print_overall_stats(self):
         """
         Вывод общей статистики по всем университетам
@@ -344,23 +637,52 @@ class VKUniversityMentionsCollector:
         print(f"ОБЩАЯ СТАТИСТИКА ПО ВСЕМ УНИВЕРСИТЕТАМ")
         print("*" * 60)
         print(f"Общее количество публикаций: {len(self.data)}")
-        print(f"Общее количество уникальных авторов: {len(self.unique_authors)}")
+        print(f"Общее количество уникальных авторов: {self.unique_authors_count()}")
         print("*" * 60)
 
+
+def print_live_stats(university, snapshot):
+    print(f"  [{university}] загружено {snapshot['posts_count']} публикаций, "
+          f"~{snapshot['authors_count']} авторов, {snapshot['likes_count']} лайков")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Сбор упоминаний университетов во ВКонтакте за год')
+    parser.add_argument('--checkpoint', type=str, default='web_checkpoint.sqlite',
+                        help='Файл SQLite с прогрессом сбора этого сборщика (пустая строка - без сохранения прогресса)')
+    parser.add_argument('--since-last-run', action='store_true',
+                        help='Загрузить только публикации новее сохраненных при прошлом запуске')
+    parser.add_argument('--live-stats', action='store_true',
+                        help='Печатать статистику университета по мере загрузки публикаций')
+    parser.add_argument('--export', type=str, default=None,
+                        help='Потоковая выгрузка публикаций по мере сбора (.csv, .csv.gz, .parquet или .xlsx)')
+    args = parser.parse_args()
+    if args.since_last_run and not args.checkpoint:
+        parser.error('--since-last-run требует --checkpoint')
+    try:
+        checkpoint = CollectionCheckpoint(args.checkpoint, collector='web') if args.checkpoint else None
+    except ValueError as e:
+        parser.error(str(e))
+
     # Получаем токен из переменной окружения или запрашиваем у пользователя
     config = configparser.ConfigParser()
     config.read('config.ini')
     vk_token = config['vk']['access_token']
     
     # Создаем экземпляр сборщика данных
-    collector = VKUniversityMentionsCollector(vk_token)
+    collector = VKUniversityMentionsCollector(vk_token, on_progress=print_live_stats if args.live_stats else None)
     
     # Список университетов для поиска
     universities = ["СПбГУ", "МГУ"]
     
     # Собираем данные за 2024 год
-    collector.collect_data(universities, year=2024)
+    if args.export:
+        with open_post_writer(args.export) as writer:
+            collector.collect_data(universities, year=2024, checkpoint=checkpoint,
+                                   since_last_run=args.since_last_run, writer=writer)
+        print(f"Публикации выгружены в файл: {args.export}")
+    else:
+        collector.collect_data(universities, year=2024, checkpoint=checkpoint, since_last_run=args.since_last_run)
     
     # Выводим общую статистику
     collector.print_overall_stats()
@@ -369,4 +691,4 @@ if __name__ == "__main__":
     collector.plot_monthly_posts(year=2024, filename="университеты_публикации_по_месяцам_2024.png")
     
     # Сохраняем данные в Excel файл
-    collector.save_to_excel("университеты_упоминания_2024.xlsx")
\ No newline at end of file
+    collector.save_to_excel("университеты_упоминания_2024.xlsx", include_posts=not args.export)
\ No newline at end of file